@@ -0,0 +1,216 @@
+"""
+Async LLM Service — Concurrent summarization with httpx + asyncio.
+
+Same prompts, cache and result dicts as `services.llm_service.call_llm`, but
+many requests can overlap (bounded by a semaphore, by default the server's
+slot count). Each item has its own timeout, and a failure only affects that
+item.
+
+Usage:
+    import asyncio
+    from services.async_llm_service import summarize_many
+    results = asyncio.run(summarize_many(texts, "Concise"))
+
+    # Results as they finish
+    async for i, result in summarize_as_completed(texts, "Concise"):
+        ...
+
+Requirements:
+    pip install httpx
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from services import llm_service
+from services.llm_service import (
+    _build_payload, _cache_lookup, _cache_store, _result, _usage_from, _user_message,
+    build_system_prompt, estimate_tokens, fit_max_tokens,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGE = "Auto (same as input)"
+
+
+# Errors that mean "this server is down" (timeouts are not retried elsewhere)
+_BACKEND_ERRORS = (httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+# ──────────────────────────────────────────────────────────────
+# Single request
+# ──────────────────────────────────────────────────────────────
+
+async def _apost(client: httpx.AsyncClient, path: str, payload: dict) -> httpx.Response:
+    """
+    POST `payload` to `path` on the least-loaded backend, failing over to the
+    next one on connection errors and `FAILOVER_STATUS` replies (same policy
+    as `llm_service.with_failover`).
+    """
+    router = llm_service.router()
+    tried: set[str] = set()
+    while True:
+        backend = router.acquire(exclude=tried)
+        failed = False
+        try:
+            resp = await client.post(f"{backend.url}{path}", json=payload)
+            if resp.status_code in llm_service.FAILOVER_STATUS:
+                resp.raise_for_status()
+            return resp
+        except (*_BACKEND_ERRORS, httpx.HTTPStatusError) as exc:
+            failed = True
+            tried.add(backend.url)
+            if len(tried) == len(router):
+                raise
+            logger.warning("LLM backend %s failed (%s) — failing over", backend.url, exc)
+        finally:
+            router.release(backend, ok=not failed)
+
+
+async def _acount_tokens(client: httpx.AsyncClient, text: str) -> int:
+    """Exact token count via `/tokenize`, heuristic if the server can't answer."""
+    try:
+        resp = await _apost(client, "/tokenize", {"content": text, "add_special": False})
+        resp.raise_for_status()
+        return len(resp.json()["tokens"])
+    except (httpx.HTTPError, ValueError, KeyError):
+        return estimate_tokens(text)
+
+
+async def acall_llm(
+    client: httpx.AsyncClient,
+    text: str,
+    system_prompt: str,
+    temperature: float,
+    max_tokens: int,
+    use_cache: bool = True,
+) -> dict:
+    """
+    Async counterpart of `call_llm` (non-streaming).
+
+    Returns:
+        The same result dict as `call_llm`.
+
+    Raises:
+        ContextOverflowError: If the prompt alone does not fit in the context.
+        httpx.HTTPError: On connection / HTTP errors (after trying every backend).
+    """
+    cache, key, hit = _cache_lookup(text, system_prompt, temperature, max_tokens, use_cache)
+    if hit is not None:
+        return hit
+    prompt_tokens = await _acount_tokens(client, f"{system_prompt}\n{_user_message(text)}")
+    fitted = fit_max_tokens(prompt_tokens, max_tokens)
+    # No slot pinning: batch items are all different, let llama.cpp spread them
+    payload = _build_payload(text, system_prompt, temperature, fitted, stream=False)
+    t0 = time.time()
+    resp = await _apost(client, llm_service.CHAT_PATH, payload)
+    elapsed = time.time() - t0
+    resp.raise_for_status()
+    data = resp.json()
+    result = _result(data["choices"][0]["message"]["content"], elapsed, elapsed,
+                     _usage_from(data), data.get("timings"))
+    return _cache_store(cache, key, result, temperature)
+
+
+def _error_result(message: str, elapsed: float) -> dict:
+    """A `call_llm`-shaped result for an item that failed."""
+    return {
+        "summary": "", "elapsed": elapsed, "ttft": elapsed, "tokens_per_sec": 0.0,
+        "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+        "cached": False, "cache_safe": False, "error": message,
+    }
+
+
+# ──────────────────────────────────────────────────────────────
+# Batches
+# ──────────────────────────────────────────────────────────────
+
+async def summarize_as_completed(
+    texts: list[str],
+    style: str,
+    language: str = DEFAULT_LANGUAGE,
+    extra: str = "",
+    temperature: float = 0.3,
+    max_tokens: int = 1024,
+    concurrency: Optional[int] = None,
+    timeout: float = llm_service.REQUEST_TIMEOUT,
+) -> AsyncIterator[tuple[int, dict]]:
+    """
+    Summarize `texts` concurrently and yield `(index, result)` as each finishes.
+
+    Args:
+        texts:       Documents to summarize.
+        style, language, extra:
+                     Passed to `build_system_prompt` (shared by every item).
+        temperature, max_tokens:
+                     Generation settings.
+        concurrency: Max requests in flight (default: the server's slot count).
+        timeout:     Per-item timeout in seconds.
+
+    Failed or timed-out items yield a result with an `error` message and an
+    empty `summary`; the rest of the batch is unaffected.
+    """
+    if not texts:
+        return
+    system_prompt = build_system_prompt(style, language, extra)
+    # Read /props off the event loop once; later lookups hit the cache
+    await asyncio.to_thread(llm_service.server_props)
+    if concurrency is None:
+        concurrency = llm_service.server_slots()
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    limits = httpx.Limits(max_connections=max(concurrency, 1) * 2,
+                          max_keepalive_connections=max(concurrency, 1) * 2)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+
+        async def run(i: int, text: str) -> tuple[int, dict]:
+            async with semaphore:
+                t0 = time.time()
+                try:
+                    result = await asyncio.wait_for(
+                        acall_llm(client, text, system_prompt, temperature, max_tokens),
+                        timeout,
+                    )
+                except asyncio.TimeoutError:
+                    result = _error_result(f"Timed out after {timeout:.0f}s", time.time() - t0)
+                except Exception as exc:
+                    logger.warning("Batch item %d failed: %s", i, exc)
+                    result = _error_result(str(exc) or type(exc).__name__, time.time() - t0)
+                return i, result
+
+        tasks = [asyncio.create_task(run(i, t)) for i, t in enumerate(texts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def summarize_many(
+    texts: list[str],
+    style: str,
+    language: str = DEFAULT_LANGUAGE,
+    extra: str = "",
+    temperature: float = 0.3,
+    max_tokens: int = 1024,
+    concurrency: Optional[int] = None,
+    timeout: float = llm_service.REQUEST_TIMEOUT,
+) -> list[dict]:
+    """
+    Summarize `texts` concurrently and return the results in input order.
+
+    See `summarize_as_completed` for the arguments and error handling.
+    """
+    results: list[dict] = [{} for _ in texts]
+    async for i, result in summarize_as_completed(
+        texts, style, language, extra, temperature, max_tokens, concurrency, timeout,
+    ):
+        results[i] = result
+    return results
@@ -0,0 +1,168 @@
+"""
+Cache Service — Persistent, content-addressed cache of LLM summaries (SQLite).
+
+Entries are keyed on a hash of the normalized input text, the system prompt,
+temperature, max_tokens and model name, and evicted least-recently-used once
+the cache grows past `MAX_BYTES`, or when older than `MAX_AGE`.
+
+Usage:
+    from services.cache_service import get_cache, cache_key
+    key = cache_key(text, system_prompt, 0.3, 1024, "local-model")
+    hit = get_cache().get(key)          # dict or None
+    get_cache().put(key, result, deterministic=False)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get(
+    "SUMMARY_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "summarize-ai"),
+)
+MAX_BYTES = 64 * 1024 * 1024      # total stored result size before LRU eviction
+MAX_AGE   = 30 * 24 * 3600        # s — entries older than this are dropped
+SERVE_NONDETERMINISTIC = False    # also serve temperature > 0 entries (re-runs never resample)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key           TEXT PRIMARY KEY,
+    result        TEXT NOT NULL,
+    deterministic INTEGER NOT NULL,
+    size          INTEGER NOT NULL,
+    created       REAL NOT NULL,
+    accessed      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_accessed ON summaries (accessed);
+"""
+
+
+# ──────────────────────────────────────────────────────────────
+# Keys
+# ──────────────────────────────────────────────────────────────
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivial edits still hit."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(text: str, system_prompt: str, temperature: float,
+              max_tokens: int, model: str) -> str:
+    """SHA-256 over every input that influences the generated summary."""
+    material = json.dumps(
+        [normalize_text(text), system_prompt, round(float(temperature), 4),
+         int(max_tokens), model],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+# ──────────────────────────────────────────────────────────────
+# Cache
+# ──────────────────────────────────────────────────────────────
+
+class SummaryCache:
+    """SQLite-backed LRU cache of `call_llm` result dicts (thread-safe)."""
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_BYTES,
+                 max_age: float = MAX_AGE):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "summaries.sqlite3")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str, allow_nondeterministic: bool = True) -> Optional[dict]:
+        """Return the cached result for `key`, or None (counted as a miss)."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result, deterministic, created FROM summaries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row and now - row[2] > self.max_age:
+                self._db.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self._db.commit()
+                self._stats["evictions"] += 1
+                row = None
+            if row is None or not (row[1] or allow_nondeterministic):
+                self._stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE summaries SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self._stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: dict, deterministic: bool) -> None:
+        """Store `result`, then evict expired and least-recently-used entries."""
+        blob = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, blob, int(deterministic), len(blob.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float) -> None:
+        cur = self._db.execute("DELETE FROM summaries WHERE created < ?",
+                               (now - self.max_age,))
+        evicted = cur.rowcount
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total > self.max_bytes:
+            for key, size in self._db.execute(
+                "SELECT key, size FROM summaries ORDER BY accessed ASC"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+        self._stats["evictions"] += evicted
+
+    def stats(self) -> dict:
+        """Counters (`hits`, `misses`, `evictions`) plus current `entries` / `bytes`."""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries"
+            ).fetchone()
+            return {**self._stats, "entries": entries, "bytes": size}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM summaries")
+            self._db.commit()
+
+
+_cache: Optional[SummaryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[SummaryCache]:
+    """Return the process-wide cache, or None if `CACHE_DIR` is unusable."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = SummaryCache(CACHE_DIR)
+                except (OSError, sqlite3.Error) as exc:
+                    logger.warning("Summary cache disabled (%s): %s", CACHE_DIR, exc)
+                    return None
+    return _cache
@@ -0,0 +1,303 @@
+"""
+Extractive Service — Local sentence ranking and summaries, no LLM involved.
+
+`compress` keeps the most central sentences of a document, in their original
+order, until a token budget is met, so long inputs reach llama.cpp with fewer
+prompt tokens. Sentences are ranked by TextRank over TF-IDF cosine similarity
+(biased towards TF-IDF centrality), computed with NumPy without materialising
+the sentence × sentence matrix. spaCy's rule-based sentencizer is used for
+segmentation when installed, otherwise the regex splitter from
+`longdoc_service`.
+
+`summarize_extractive` is the offline fallback when llama.cpp is down or
+overloaded: it picks sentences by TF-IDF centrality with maximal marginal
+relevance (MMR) so near-duplicates are skipped, sized by summary style. It
+returns a result dict shaped like `call_llm`'s, in milliseconds.
+
+Usage:
+    from services.extractive_service import compress, summarize_extractive
+    result = compress(text, budget=1536)
+    result["text"], result["ratio"], result["tokens_saved"]
+    summary = summarize_extractive(text, "Bullet Points")["summary"]
+
+Requirements:
+    pip install numpy
+    pip install spacy        # optional — better sentence boundaries
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+try:
+    import spacy
+except ImportError:  # optional — fall back to the regex splitter
+    spacy = None
+
+from services.llm_service import estimate_tokens
+from services.longdoc_service import split_sentences as _regex_sentences
+
+logger = logging.getLogger(__name__)
+
+COMPRESS_BUDGET = int(os.environ.get("COMPRESS_BUDGET", 1536))  # tokens kept for the LLM
+MIN_SENTENCES   = 6     # shorter documents are never compressed
+MAX_FEATURES    = 4096  # vocabulary cap for the TF-IDF matrix
+DAMPING         = 0.85  # TextRank random-jump damping
+MAX_ITERATIONS  = 60
+TOLERANCE       = 1e-6
+MMR_LAMBDA      = 0.7   # relevance vs. novelty trade-off for extractive summaries
+DUPLICATE_SIM   = 0.9   # cosine similarity above which a sentence is a repeat
+
+# Summary length per style: (fraction of the document's sentences, min, max)
+STYLE_LENGTH = {
+    "Concise":               (0.10, 2, 5),
+    "Detailed":              (0.30, 4, 15),
+    "Bullet Points":         (0.15, 3, 8),
+    "Academic":              (0.20, 3, 10),
+    "ELI5":                  (0.08, 2, 4),
+    "OCR Clean + Summarize": (0.10, 2, 5),
+}
+
+# Terms: words of 2+ characters, or single CJK / kana / hangul characters
+_TERM = re.compile(r"[^\W\u3000-\U0010ffff]{2,}|(?=\w)[\u3000-\U0010ffff]")
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+# ──────────────────────────────────────────────────────────────
+# Segmentation
+# ──────────────────────────────────────────────────────────────
+
+def _sentencizer():
+    """Blank multilingual spaCy pipeline with a sentencizer, or None."""
+    global _nlp
+    if spacy is None:
+        return None
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                nlp = spacy.blank("xx")
+                nlp.add_pipe("sentencizer")
+                nlp.max_length = 10_000_000
+                _nlp = nlp
+    return _nlp
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split text into sentences, with spaCy when available."""
+    nlp = _sentencizer()
+    if nlp is None:
+        return _regex_sentences(text)
+    sentences = []
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        sentences += [s.text.strip() for s in nlp(paragraph).sents if s.text.strip()]
+    return sentences
+
+
+# ──────────────────────────────────────────────────────────────
+# Ranking
+# ──────────────────────────────────────────────────────────────
+
+def _terms(sentence: str) -> list[str]:
+    """Lower-cased word tokens; CJK runs are split into characters."""
+    return _TERM.findall(sentence.lower())
+
+
+def tfidf_matrix(sentences: list[str]) -> np.ndarray:
+    """
+    L2-normalised TF-IDF rows, one per sentence.
+
+    Terms used by a single sentence cannot make two sentences similar, so
+    only terms shared by at least two sentences are kept (the `MAX_FEATURES`
+    most frequent of them), which keeps the matrix small on long documents.
+    """
+    docs = [_terms(s) for s in sentences]
+    df: dict[str, int] = {}
+    for terms in docs:
+        for term in set(terms):
+            df[term] = df.get(term, 0) + 1
+    shared = sorted((t for t, n in df.items() if n > 1), key=lambda t: -df[t])
+    vocab = {t: j for j, t in enumerate(shared[:MAX_FEATURES])}
+    width = max(len(vocab), 1)
+    cells = [i * width + vocab[t] for i, terms in enumerate(docs) for t in terms if t in vocab]
+    tf = np.bincount(np.asarray(cells, dtype=np.int64), minlength=len(docs) * width)
+    tf = tf.reshape(len(docs), width).astype(np.float32)
+    counts = np.array([df[t] for t in vocab] or [1], dtype=np.float32)
+    idf = np.log((1.0 + len(docs)) / (1.0 + counts)) + 1.0
+    matrix = np.log1p(tf) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def centrality(matrix: np.ndarray) -> np.ndarray:
+    """Cosine-like similarity of each row to the document centroid (>= 0)."""
+    if matrix.shape[0] == 0:
+        return np.zeros(0)
+    return np.maximum(matrix @ matrix.mean(axis=0), 0.0)
+
+
+def textrank(matrix: np.ndarray) -> np.ndarray:
+    """
+    TextRank scores for the rows of a normalised TF-IDF matrix.
+
+    The similarity graph is W = X·Xᵀ without its diagonal; every product
+    with W is done as X·(Xᵀ·v) so memory stays O(sentences × features).
+    Random jumps land on each sentence in proportion to its TF-IDF
+    centrality (similarity to the document centroid), so a small cluster of
+    digressions cannot collect as much rank as the main topic.
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    self_sim = np.einsum("ij,ij->i", matrix, matrix)
+    degree = matrix @ matrix.sum(axis=0) - self_sim
+    degree = np.maximum(degree, 1e-12)
+    teleport = centrality(matrix)
+    teleport = teleport / teleport.sum() if teleport.sum() > 0 else np.full(n, 1.0 / n)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        v = scores / degree
+        new = (1.0 - DAMPING) * teleport + DAMPING * (matrix @ (matrix.T @ v) - self_sim * v)
+        done = np.abs(new - scores).sum() < TOLERANCE
+        scores = new
+        if done:
+            break
+    return scores
+
+
+def rank_sentences(sentences: list[str]) -> np.ndarray:
+    """TextRank score of each sentence (higher = more central)."""
+    return textrank(tfidf_matrix(sentences))
+
+
+# ──────────────────────────────────────────────────────────────
+# Compression
+# ──────────────────────────────────────────────────────────────
+
+def compress(text: str, budget: Optional[int] = None,
+             count: Callable[[str], int] = estimate_tokens) -> dict:
+    """
+    Trim `text` to about `budget` tokens by keeping its most central sentences.
+
+    Kept sentences stay in document order. Text that already fits, or that
+    has fewer than `MIN_SENTENCES` sentences, is returned unchanged.
+    Returns text, compressed, tokens_before, tokens_after, tokens_saved,
+    ratio (tokens_after / tokens_before), sentences_kept and sentences_total.
+    """
+    budget = budget or COMPRESS_BUDGET
+    before = count(text)
+    sentences = split_sentences(text)
+    result = {
+        "text": text, "compressed": False,
+        "tokens_before": before, "tokens_after": before, "tokens_saved": 0,
+        "ratio": 1.0,
+        "sentences_kept": len(sentences), "sentences_total": len(sentences),
+    }
+    if before <= budget or len(sentences) < MIN_SENTENCES:
+        return result
+
+    scores = rank_sentences(sentences)
+    # Sentences that share no terms with the rest score 0 — never worth a slot
+    # unless nothing is connected at all.
+    floor = 0.0 if scores.max() > 0 else -1.0
+    keep, used = [], 0
+    for i in np.argsort(-scores, kind="stable"):
+        if scores[i] <= floor:
+            break
+        tokens = count(sentences[i])
+        if used + tokens <= budget:
+            keep.append(int(i))
+            used += tokens
+    if not keep:
+        return result
+    keep.sort()
+    kept = " ".join(sentences[i] for i in keep)
+    after = count(kept)
+    result.update(
+        text=kept, compressed=True, tokens_after=after,
+        tokens_saved=max(before - after, 0), ratio=round(after / max(before, 1), 3),
+        sentences_kept=len(keep),
+    )
+    logger.info("Pre-compressed %d → %d tokens (%d/%d sentences)",
+                before, after, len(keep), len(sentences))
+    return result
+
+
+# ──────────────────────────────────────────────────────────────
+# Offline summaries
+# ──────────────────────────────────────────────────────────────
+
+def summary_length(style: str, n_sentences: int) -> int:
+    """Number of sentences an extractive summary of `style` should keep."""
+    fraction, low, high = STYLE_LENGTH.get(style, STYLE_LENGTH["Concise"])
+    return min(max(round(fraction * n_sentences), low), high, n_sentences)
+
+
+def mmr_select(matrix: np.ndarray, relevance: np.ndarray, k: int,
+               lam: float = MMR_LAMBDA) -> list[int]:
+    """
+    Pick `k` rows by maximal marginal relevance, returned in document order.
+
+    Each step takes the sentence maximising
+    lam · relevance − (1 − lam) · (max similarity to those already picked).
+    Repeats of a picked sentence (similarity >= `DUPLICATE_SIM`) are never
+    taken, nor are zero-relevance sentences while relevant ones remain.
+    """
+    n = matrix.shape[0]
+    top = relevance.max() if n else 0.0
+    rel = relevance / top if top > 0 else relevance
+    redundancy = np.zeros(n, dtype=np.float64)
+    available = np.ones(n, dtype=bool)
+    chosen = []
+    for _ in range(min(k, n)):
+        gain = lam * rel - (1.0 - lam) * redundancy
+        gain[~available | (redundancy >= DUPLICATE_SIM)] = -np.inf
+        if top > 0:
+            gain[rel <= 0] = -np.inf
+        if not np.isfinite(gain).any():
+            break
+        j = int(np.argmax(gain))
+        chosen.append(j)
+        available[j] = False
+        redundancy = np.maximum(redundancy, matrix @ matrix[j])
+    return sorted(chosen)
+
+
+def summarize_extractive(text: str, style: str = "Concise") -> dict:
+    """
+    Summarize `text` by picking its most representative, non-redundant sentences.
+
+    Returns the same keys as `call_llm` (token counts are 0 — no model ran)
+    plus extractive=True, sentences_kept and sentences_total. Bullet-point
+    style puts one sentence per "•" line; other styles join them as prose.
+    """
+    t0 = time.perf_counter()
+    sentences = split_sentences(text)
+    matrix = tfidf_matrix(sentences)
+    picked = mmr_select(matrix, centrality(matrix), summary_length(style, len(sentences)))
+    chosen = [sentences[i] for i in picked]
+    if style == "Bullet Points":
+        summary = "\n".join(f"• {s}" for s in chosen)
+    else:
+        summary = " ".join(chosen)
+    elapsed = time.perf_counter() - t0
+    return {
+        "summary":           summary,
+        "elapsed":           elapsed,
+        "ttft":              elapsed,
+        "tokens_per_sec":    0.0,
+        "prompt_tokens":     0,
+        "completion_tokens": 0,
+        "total_tokens":      0,
+        "extractive":        True,
+        "sentences_kept":    len(chosen),
+        "sentences_total":   len(sentences),
+    }
@@ -0,0 +1,199 @@
+"""
+Health Service — Background monitor of the llama.cpp server(s).
+
+A single daemon thread per process probes every backend every
+`PROBE_INTERVAL` seconds; every Streamlit session reads the last result
+instead of probing on each rerun, so the UI never waits on a health check.
+Each probe result is also reported to the backend router, so dead servers
+stop receiving traffic and recovered ones get it back.
+
+Usage:
+    from services.health_service import get_monitor
+    status = get_monitor().status()
+    status["online"], status["latency"], status["slots_idle"]
+    status["backends"]   # per-server probe results
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import requests
+
+from services import llm_service
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = 5.0   # s — time between probes
+PROBE_TIMEOUT  = 2.0   # s — per-request timeout of a probe
+STATUS_TTL     = 15.0  # s — a result older than this is reported offline
+
+
+# ──────────────────────────────────────────────────────────────
+# Probing
+# ──────────────────────────────────────────────────────────────
+
+def _slot_counts(url: str, health: dict) -> tuple[Optional[int], Optional[int], Optional[list]]:
+    """
+    Return (idle, total, idle slot ids) from `/slots`, or the counts alone
+    from `/health` on old servers.
+    """
+    try:
+        resp = llm_service.http_request("GET", f"{url}/slots",
+                                        retries=0, timeout=PROBE_TIMEOUT)
+        slots = resp.json() if resp.status_code == 200 else None
+        if isinstance(slots, list):
+            idle = [s.get("id", i) for i, s in enumerate(slots)
+                    if not s.get("is_processing", s.get("state", 0))]
+            return len(idle), len(slots), idle
+    except (requests.exceptions.RequestException, ValueError):
+        pass
+    if "slots_idle" in health:
+        idle = int(health["slots_idle"])
+        return idle, idle + int(health.get("slots_processing", 0)), None
+    return None, None, None
+
+
+def probe(url: Optional[str] = None) -> dict:
+    """Probe one server (default: the first backend) and return a status dict."""
+    url = url or llm_service.backend_urls()[0]
+    t0 = time.time()
+    status = {
+        "url": url, "online": False, "status": "offline", "latency": None,
+        "slots_idle": None, "slots_total": None, "idle_slots": None, "checked_at": t0,
+    }
+    try:
+        resp = llm_service.http_request("GET", f"{url}/health",
+                                        retries=0, timeout=PROBE_TIMEOUT)
+    except requests.exceptions.RequestException:
+        return status
+    status["latency"] = time.time() - t0
+    try:
+        health = resp.json()
+    except ValueError:
+        health = {}
+    if resp.status_code == 503:
+        status["status"] = "loading"  # model still loading
+        return status
+    if resp.status_code != 200:
+        status["status"] = "error"
+        return status
+    status["online"] = True
+    status["status"] = "ok"
+    status["slots_idle"], status["slots_total"], status["idle_slots"] = _slot_counts(url, health)
+    return status
+
+
+def _merge(results: list[dict]) -> dict:
+    """Combine per-backend probes: online if any is, slots summed."""
+    online = [r for r in results if r["online"]]
+    if online:
+        state = "ok"
+    elif any(r["status"] == "loading" for r in results):
+        state = "loading"
+    else:
+        state = results[0]["status"]
+
+    def total(key: str) -> Optional[int]:
+        values = [r[key] for r in online if r[key] is not None]
+        return sum(values) if values else None
+
+    latencies = [r["latency"] for r in online]
+    return {
+        "online": bool(online), "status": state,
+        "latency": min(latencies) if latencies else None,
+        "slots_idle": total("slots_idle"), "slots_total": total("slots_total"),
+        "checked_at": min(r["checked_at"] for r in results),
+        "backends": results,
+    }
+
+
+def probe_all() -> dict:
+    """Probe every backend concurrently, update the router, return the merged status."""
+    urls = llm_service.backend_urls()
+    with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+        results = list(pool.map(probe, urls))
+    router = llm_service.router()
+    for r in results:
+        router.report_health(r["url"], r["online"], r["slots_total"], r["idle_slots"])
+    return _merge(results)
+
+
+# ──────────────────────────────────────────────────────────────
+# Monitor
+# ──────────────────────────────────────────────────────────────
+
+class HealthMonitor:
+    """Probes the backends on a background thread and caches the result."""
+
+    def __init__(self, interval: float = PROBE_INTERVAL, ttl: float = STATUS_TTL):
+        self.interval = interval
+        self.ttl = ttl
+        self._status: dict = {
+            "online": False, "status": "unknown", "latency": None,
+            "slots_idle": None, "slots_total": None, "checked_at": None,
+            "backends": [],
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "HealthMonitor":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="llama-health",
+                                             daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + PROBE_TIMEOUT * 2)
+
+    def refresh(self) -> dict:
+        """Probe every backend now (blocking) and store the merged result."""
+        new = probe_all()
+        with self._lock:
+            was_online = self._status["online"]
+            self._status = new
+        if new["online"] and not was_online:
+            # Server (re)started — its slot count / context size may have changed
+            llm_service.server_props(refresh=True)
+        return new
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:  # never let the monitor thread die
+                logger.exception("Health probe failed")
+            self._stop.wait(self.interval)
+
+    def status(self) -> dict:
+        """Last known status (non-blocking). Stale results count as offline."""
+        with self._lock:
+            status = dict(self._status)
+        checked = status["checked_at"]
+        status["stale"] = checked is not None and time.time() - checked > self.ttl
+        if status["stale"]:
+            status["online"] = False
+        return status
+
+
+_monitor: Optional[HealthMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_monitor() -> HealthMonitor:
+    """Return the process-wide monitor, starting it on first use."""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = HealthMonitor().start()
+    return _monitor
@@ -0,0 +1,792 @@
+"""
+LLM Service — Talks to the local llama.cpp server (OpenAI-compatible API).
+
+Usage:
+    from services.llm_service import call_llm
+    result = call_llm(text, system_prompt, temperature=0.3, max_tokens=1024)
+
+    # Streaming — `on_delta` receives the summary generated so far
+    result = call_llm(text, system_prompt, 0.3, 1024, on_delta=print)
+
+Identical requests made at the same time (same text and settings, e.g. from
+several Streamlit sessions) share a single generation; see `coalesce_stats`.
+
+Requirements:
+    pip install requests
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from services.cache_service import SERVE_NONDETERMINISTIC, cache_key, get_cache
+from services.router_service import Backend, BackendRouter, get_router
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# ──────────────────────────────────────────────────────────────
+# Server configuration
+# ──────────────────────────────────────────────────────────────
+
+LLAMA_URL  = "http://127.0.0.1:8080"
+# Several llama.cpp servers, comma-separated (overrides LLAMA_URL when set)
+LLAMA_URLS = [u.strip() for u in os.environ.get("LLAMA_URLS", "").split(",") if u.strip()]
+CHAT_PATH  = "/v1/chat/completions"
+MODEL      = "local-model"
+
+FAILOVER_STATUS = (502, 503, 504)  # backend-side errors retried on another server
+
+REQUEST_TIMEOUT = 600  # s — for streaming this is the max gap between chunks
+
+TOKENIZE_CACHE_SIZE = 1024  # memoized /tokenize results
+FAILURE_TTL         = 30.0  # s — a failed /props or /tokenize call is not retried sooner
+CONTEXT_MARGIN      = 32    # tokens reserved for the chat template
+MIN_COMPLETION      = 16    # refuse requests that leave less room than this
+
+SLOT_AFFINITY = True  # pin each style's requests to one llama.cpp slot while it is idle
+COALESCE      = True  # identical concurrent requests share one generation
+
+POOL_SIZE     = 16   # keep-alive connections kept per host
+POOL_RETRIES  = 2    # extra attempts after a connection reset / refusal
+POOL_BACKOFF  = 0.2  # s — doubled after every failed attempt
+
+
+# ──────────────────────────────────────────────────────────────
+# Shared keep-alive HTTP client (one per process)
+# ──────────────────────────────────────────────────────────────
+
+_stats_lock = threading.Lock()
+_pool_stats = {"requests": 0, "connects": 0, "retries": 0}
+
+
+def _bump(counter: str) -> None:
+    with _stats_lock:
+        _pool_stats[counter] += 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        _bump("connects")  # every TCP connect is a pool miss
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        _bump("connects")
+        super().connect()
+
+
+class _CountingHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools count new TCP connections."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPPool, "https": _CountingHTTPSPool,
+        }
+
+    def send(self, request, **kwargs):
+        _bump("requests")
+        return super().send(request, **kwargs)
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide keep-alive session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = _PooledAdapter(pool_connections=4, pool_maxsize=POOL_SIZE,
+                                         pool_block=False)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def reset_session() -> None:
+    """Close the shared session so the next call rebuilds it (e.g. new POOL_SIZE)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def pool_stats() -> dict:
+    """Connection-pool counters: `requests`, `hits` (reused), `misses` (new), `retries`."""
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    stats["misses"] = stats.pop("connects")
+    stats["hits"] = max(stats["requests"] - stats["misses"], 0)
+    return stats
+
+
+def http_request(method: str, url: str, retries: Optional[int] = None,
+                 **kwargs) -> requests.Response:
+    """
+    Send a request through the shared session.
+
+    Connection resets / refusals are retried up to `retries` times
+    (default `POOL_RETRIES`) with exponential backoff; other errors
+    propagate unchanged.
+    """
+    retries = POOL_RETRIES if retries is None else retries
+    delay = POOL_BACKOFF
+    for attempt in range(retries + 1):
+        try:
+            return get_session().request(method, url, **kwargs)
+        except requests.exceptions.ConnectionError as exc:
+            if attempt == retries or isinstance(exc, requests.exceptions.ConnectTimeout):
+                raise
+            _bump("retries")
+            logger.info("Connection to %s failed (%s) — retrying in %.1fs", url, exc, delay)
+            time.sleep(delay)
+            delay *= 2
+
+
+# ──────────────────────────────────────────────────────────────
+# Backend routing & failover
+# ──────────────────────────────────────────────────────────────
+
+class BackendUnavailableError(requests.exceptions.HTTPError):
+    """A backend answered with a server-side error (`FAILOVER_STATUS`)."""
+    pass
+
+
+# Errors that mean "this server is down", as opposed to "this request is bad"
+_BACKEND_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    BackendUnavailableError,
+)
+
+
+def backend_urls() -> list[str]:
+    return LLAMA_URLS or [LLAMA_URL]
+
+
+def router() -> BackendRouter:
+    """The process-wide router over `backend_urls()`."""
+    return get_router(backend_urls())
+
+
+def check_backend_response(resp: requests.Response) -> None:
+    """`raise_for_status`, raising `BackendUnavailableError` for failover statuses."""
+    if resp.status_code in FAILOVER_STATUS:
+        raise BackendUnavailableError(
+            f"{resp.status_code} from LLM backend {resp.url}", response=resp)
+    resp.raise_for_status()
+
+
+def with_failover(send: Callable[[Backend], T], affinity: Optional[str] = None) -> T:
+    """
+    Run `send(backend)` on the least-loaded backend, moving on to the next one
+    whenever it fails with a connection error or a `FAILOVER_STATUS` reply.
+
+    Raises:
+        The last backend error once every backend has been tried; any other
+        exception from `send` immediately.
+    """
+    r = router()
+    tried: set[str] = set()
+    while True:
+        backend = r.acquire(exclude=tried, affinity=affinity)
+        failed = False
+        try:
+            return send(backend)
+        except _BACKEND_ERRORS as exc:
+            failed = True
+            tried.add(backend.url)
+            if len(tried) == len(r):
+                raise
+            logger.warning("LLM backend %s failed (%s) — failing over", backend.url, exc)
+        finally:
+            r.release(backend, ok=not failed)
+
+
+# ──────────────────────────────────────────────────────────────
+# Prompt & token helpers
+# ──────────────────────────────────────────────────────────────
+
+def estimate_tokens(t: str) -> int:
+    return int((len(t.split()) if t else 0) * 1.33)
+
+def build_system_prompt(style: str, language: str, extra: str) -> str:
+    if style == "OCR Clean + Summarize":
+        prompt = (
+            "You are an expert AI assistant.\n\n"
+            "The following text was extracted via OCR from an image. "
+            "It may contain spelling errors, broken words, or formatting issues.\n\n"
+            "Your tasks:\n"
+            "1. Correct obvious OCR errors.\n"
+            "2. Remove noise and duplicated fragments.\n"
+            "3. Preserve important names, numbers, and dates.\n"
+            "4. Provide a clear, structured summary.\n\n"
+            "Base your summary strictly on the cleaned text."
+        )
+    else:
+        styles = {
+            "Concise":       "Produce a short, concise summary capturing only the key points.",
+            "Detailed":      "Produce a thorough summary preserving important nuances.",
+            "Bullet Points": "Produce a clear, well-organized bullet-point summary.",
+            "Academic":      "Produce a formal, academic-style summary suitable for scholarly work.",
+            "ELI5":          "Explain the text simply, as if for a five-year-old.",
+        }
+        prompt = f"You are an expert text summarizer.\n{styles.get(style, styles['Concise'])}"
+    if language != "Auto (same as input)":
+        prompt += f"\nWrite the summary in {language}."
+    if extra and extra.strip():
+        prompt += f"\nAdditional instructions: {extra.strip()}"
+    return prompt
+
+
+# ──────────────────────────────────────────────────────────────
+# Server introspection
+# ──────────────────────────────────────────────────────────────
+
+_props_cache: dict = {}
+_failed_at: dict = {}  # endpoint -> time of its last failed call
+
+
+def _recently_failed(endpoint: str) -> bool:
+    """True while a failure of `endpoint` is less than `FAILURE_TTL` old."""
+    return time.time() - _failed_at.get(endpoint, 0.0) < FAILURE_TTL
+
+
+def server_props(refresh: bool = False) -> dict:
+    """
+    Return llama.cpp's `/props` (slot count, context size…), cached after the
+    first successful read. Returns `{}` when no server is reachable or it has
+    no `/props`; that answer is kept for `FAILURE_TTL`, so servers without
+    the endpoint are not asked again on every call. `refresh` (used when the
+    health monitor sees a server come online) forgets both answers, and any
+    `/tokenize` failure. All backends are assumed to serve the same model.
+    """
+    if refresh:
+        _failed_at.clear()
+    elif _props_cache:
+        return _props_cache
+    elif _recently_failed("props"):
+        return {}
+
+    def fetch(backend: Backend) -> dict:
+        resp = http_request("GET", f"{backend.url}/props", retries=0, timeout=3)
+        check_backend_response(resp)
+        return resp.json()
+
+    try:
+        props = with_failover(fetch)
+    except (requests.exceptions.RequestException, ValueError):
+        _failed_at["props"] = time.time()
+        return {}
+    _props_cache.clear()
+    _props_cache.update(props)
+    return _props_cache
+
+
+def backend_slots(backend: Backend) -> int:
+    """Parallel slots of one backend (from its health probes, else `/props`)."""
+    return backend.slots or max(int(server_props().get("total_slots") or 1), 1)
+
+
+def server_slots() -> int:
+    """Parallel generation slots (`--parallel`) summed over healthy backends."""
+    r = router()
+    return sum(backend_slots(b) for b in (r.healthy() or r.backends))
+
+
+def context_size() -> int:
+    """Per-slot context window (`n_ctx`) reported by the server, 0 if unknown."""
+    props = server_props()
+    n_ctx = (props.get("default_generation_settings") or {}).get("n_ctx") or props.get("n_ctx")
+    return int(n_ctx or 0)
+
+
+# ──────────────────────────────────────────────────────────────
+# Exact token counting (llama.cpp tokenizer)
+# ──────────────────────────────────────────────────────────────
+
+class ContextOverflowError(Exception):
+    """Raised when a prompt cannot fit in the model's context window."""
+    pass
+
+
+_token_cache: "OrderedDict[bytes, int]" = OrderedDict()
+_token_lock = threading.Lock()
+
+
+def count_tokens_exact(text: str) -> Optional[int]:
+    """
+    Count tokens with the server's `/tokenize` endpoint (memoized per text).
+
+    Returns None when the server cannot be reached or has no `/tokenize`,
+    without asking it again for `FAILURE_TTL`.
+    """
+    digest = hashlib.sha1(text.encode("utf-8")).digest()
+    with _token_lock:
+        if digest in _token_cache:
+            _token_cache.move_to_end(digest)
+            return _token_cache[digest]
+    if _recently_failed("tokenize"):
+        return None
+
+    def tokenize(backend: Backend) -> int:
+        resp = http_request("POST", f"{backend.url}/tokenize", retries=0, timeout=10,
+                            json={"content": text, "add_special": False})
+        check_backend_response(resp)
+        return len(resp.json()["tokens"])
+
+    try:
+        n = with_failover(tokenize)
+    except (requests.exceptions.RequestException, ValueError, KeyError):
+        _failed_at["tokenize"] = time.time()
+        return None
+    with _token_lock:
+        _token_cache[digest] = n
+        while len(_token_cache) > TOKENIZE_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return n
+
+
+def count_tokens(text: str) -> int:
+    """Exact token count when the server is up, `estimate_tokens` otherwise."""
+    exact = count_tokens_exact(text) if text else 0
+    return estimate_tokens(text) if exact is None else exact
+
+
+def fit_max_tokens(prompt_tokens: int, max_tokens: int) -> int:
+    """
+    Clamp `max_tokens` to the room left in the context window.
+
+    Raises:
+        ContextOverflowError: If the prompt leaves less than `MIN_COMPLETION`
+            tokens for the answer.
+    """
+    n_ctx = context_size()
+    if not n_ctx:
+        return max_tokens
+    room = n_ctx - prompt_tokens - CONTEXT_MARGIN
+    if room < MIN_COMPLETION:
+        raise ContextOverflowError(
+            f"Input needs {prompt_tokens:,} tokens but the model context is "
+            f"{n_ctx:,} tokens — shorten the text."
+        )
+    return min(max_tokens, room)
+
+
+# ──────────────────────────────────────────────────────────────
+# Request helpers
+# ──────────────────────────────────────────────────────────────
+
+def _user_message(text: str) -> str:
+    return f"Summarize the following text:\n\n{text}"
+
+
+def prompt_key(text: str, system_prompt: str) -> str:
+    """Stable hash of a prompt, used for backend and slot affinity."""
+    return hashlib.sha1(f"{system_prompt}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def slot_for(system_prompt: str, slots: Optional[int] = None) -> int:
+    """
+    Slot whose KV cache starts with this system prompt (`-1` = let the server
+    choose). Every request of a style lands on the same slot, so llama.cpp
+    skips the shared system-prompt prefix across documents, and the whole
+    prompt when the same document is re-run. `call_llm` only pins a request
+    to it while the slot is idle (see `BackendRouter.claim_slot`).
+
+    `slots` is the slot count of the target backend (default: `server_slots()`).
+    """
+    slots = slots or server_slots()
+    if not SLOT_AFFINITY or slots <= 1:
+        return -1
+    digest = hashlib.sha1(system_prompt.encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % slots
+
+
+def _build_payload(text: str, system_prompt: str, temperature: float,
+                   max_tokens: int, stream: bool, slot: int = -1) -> dict:
+    # The system prompt comes first and is byte-identical for a given style,
+    # and `slot_for` sends a style to one slot, so llama.cpp can reuse that
+    # prefix's KV cache across documents (`cache_prompt`).
+    payload = {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user",   "content": _user_message(text)},
+        ],
+        "temperature": temperature,
+        "max_tokens":  max_tokens,
+        "stream":      stream,
+        "cache_prompt": True,
+        "id_slot":     slot,
+    }
+    if stream:
+        # Ask for a final usage chunk (ignored by servers that don't support it)
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+
+def _iter_sse(resp: requests.Response) -> Iterator[dict]:
+    """Yield the JSON events of a server-sent-event response until `[DONE]`."""
+    for raw in resp.iter_lines():
+        if not raw:
+            continue
+        line = raw.decode("utf-8", errors="replace")
+        if not line.startswith("data:"):
+            continue  # comments / keep-alives / `event:` lines
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            yield json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning("Skipping malformed SSE chunk: %.80s", data)
+
+
+def _usage_from(event: dict) -> dict:
+    """Extract token usage from `usage` or, failing that, llama.cpp `timings`."""
+    usage = event.get("usage") or {}
+    if usage:
+        return usage
+    timings = event.get("timings") or {}
+    if timings:
+        prompt, completion = timings.get("prompt_n", 0), timings.get("predicted_n", 0)
+        return {
+            "prompt_tokens":     prompt,
+            "completion_tokens": completion,
+            "total_tokens":      prompt + completion,
+        }
+    return {}
+
+
+def _result(summary: str, elapsed: float, ttft: float, usage: dict,
+            timings: Optional[dict] = None) -> dict:
+    completion = usage.get("completion_tokens", 0)
+    prompt     = usage.get("prompt_tokens", 0)
+    # Generation rate excludes prompt processing when we know when it ended
+    gen_time   = elapsed - ttft if elapsed > ttft else elapsed
+    timings    = timings or {}
+    # Prompt tokens served from the slot's KV cache instead of being evaluated
+    reused = timings.get("cache_n")
+    if reused is None:
+        reused = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+    return {
+        "summary":              summary,
+        "elapsed":              elapsed,
+        "ttft":                 ttft,
+        "tokens_per_sec":       completion / gen_time if gen_time > 0 else 0.0,
+        "prompt_tokens":        prompt,
+        "completion_tokens":    completion,
+        "total_tokens":         usage.get("total_tokens", prompt + completion),
+        "timings":              timings,
+        "prompt_cached_tokens": reused,
+        "prompt_eval_ms":       timings.get("prompt_ms", 0.0),
+        "prompt_saved_ms":      reused * timings.get("prompt_per_token_ms", 0.0),
+    }
+
+
+# ──────────────────────────────────────────────────────────────
+# Single-flight (coalescing of identical concurrent requests)
+# ──────────────────────────────────────────────────────────────
+
+class _Flight:
+    """One in-progress generation that identical concurrent requests wait on."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.partial = ""   # summary streamed so far by the leader
+        self.version = 0    # bumped on every partial update
+        self.done = False
+        self.result: Optional[dict] = None
+        self.error: Optional[Exception] = None
+
+    def publish(self, partial: str) -> None:
+        with self.cond:
+            self.partial = partial
+            self.version += 1
+            self.cond.notify_all()
+
+    def finish(self, result: Optional[dict] = None,
+               error: Optional[Exception] = None) -> None:
+        """End the flight; with neither a result nor an error, followers retry."""
+        with self.cond:
+            self.result, self.error, self.done = result, error, True
+            self.cond.notify_all()
+
+    def follow(self, on_delta: Optional[Callable[[str], None]]) -> Optional[dict]:
+        """
+        Wait for the leader, forwarding its streamed output to `on_delta`.
+
+        Returns None when the leader left without finishing (its session was
+        stopped), in which case the caller should run the request itself.
+        """
+        t0 = time.time()
+        ttft = None
+        seen = 0
+        while True:
+            with self.cond:
+                while not self.done and self.version == seen:
+                    self.cond.wait()
+                partial, seen, done = self.partial, self.version, self.done
+            if on_delta and partial and not done:
+                ttft = ttft if ttft is not None else time.time() - t0
+                on_delta(partial)
+            if done:
+                break
+        if self.error is not None:
+            raise self.error
+        if self.result is None:
+            return None
+        elapsed = time.time() - t0
+        if on_delta:
+            on_delta(self.result["summary"])
+        return {**self.result, "elapsed": elapsed,
+                "ttft": ttft if ttft is not None else elapsed, "coalesced": True}
+
+
+_flights: dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+_coalesce_stats = {"generations": 0, "coalesced": 0}
+
+
+def coalesce_stats() -> dict:
+    """`generations` started vs `coalesced` requests that joined one instead."""
+    with _flights_lock:
+        return {**_coalesce_stats, "in_flight": len(_flights)}
+
+
+def _join_flight(key: str) -> tuple[_Flight, bool]:
+    """Return `(flight, is_leader)` for `key`, creating the flight if needed."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        if flight is not None:
+            _coalesce_stats["coalesced"] += 1
+            return flight, False
+        flight = _flights[key] = _Flight()
+        _coalesce_stats["generations"] += 1
+        return flight, True
+
+
+def _leave_flight(key: str, flight: _Flight) -> None:
+    with _flights_lock:
+        if _flights.get(key) is flight:
+            del _flights[key]
+
+
+# ──────────────────────────────────────────────────────────────
+# Main call
+# ──────────────────────────────────────────────────────────────
+
+def call_llm(
+    text: str,
+    system_prompt: str,
+    temperature: float,
+    max_tokens: int,
+    on_delta: Optional[Callable[[str], None]] = None,
+    use_cache: bool = True,
+    pin_slot: bool = True,
+) -> dict:
+    """
+    Summarize `text` with the local llama.cpp server.
+
+    Args:
+        text:          Input text to summarize.
+        system_prompt: System prompt (see `build_system_prompt` in the app).
+        temperature:   Sampling temperature.
+        max_tokens:    Generation limit.
+        on_delta:      Optional callback. When given, the response is streamed
+                       and the callback receives the full summary generated so
+                       far after each chunk.
+        use_cache:     Look the request up in (and store it to) the persistent
+                       summary cache.
+        pin_slot:      Send the request to its style's slot (`slot_for`) when
+                       that slot is idle, so it reuses the slot's prompt cache.
+                       Batch callers pass False to let the server spread work
+                       across slots.
+
+    Returns:
+        Dict with `summary`, `elapsed`, `ttft` (time to first token),
+        `tokens_per_sec`, `prompt_tokens`, `completion_tokens`, `total_tokens`,
+        `cached` (served from the cache) and `cache_safe` (temperature 0, so a
+        cached answer is exactly what the model would generate again). Cache
+        hits keep the token usage of the original generation.
+        llama.cpp's `timings` block is passed through, along with
+        `prompt_cached_tokens` (prompt tokens reused from the KV cache),
+        `prompt_eval_ms` and `prompt_saved_ms` (estimated time saved).
+        Requests that joined an identical in-flight generation have
+        `coalesced=True`; their `elapsed` / `ttft` are their own wait times.
+        If the leading request is stopped before it finishes, they retry.
+
+    `max_tokens` is clamped to the room left in the server's context window.
+
+    Raises:
+        ContextOverflowError: If the prompt alone does not fit in the context.
+        requests.exceptions.RequestException: On connection / HTTP errors.
+    """
+    cache, key, hit = _cache_lookup(text, system_prompt, temperature, max_tokens, use_cache)
+    if hit is not None:
+        if on_delta:
+            on_delta(hit["summary"])
+        return hit
+    if not COALESCE:
+        result = _generate(text, system_prompt, temperature, max_tokens, on_delta, pin_slot)
+        return _cache_store(cache, key, result, temperature)
+
+    flight_key = key or cache_key(text, system_prompt, temperature, max_tokens, MODEL)
+    while True:
+        flight, leader = _join_flight(flight_key)
+        if leader:
+            break
+        result = flight.follow(on_delta)
+        if result is not None:
+            return result
+        # The leader was interrupted — join (or lead) a fresh flight
+
+    callback = [on_delta]
+
+    def relay(partial: str) -> None:
+        # Followers see the leader's stream (if it streams) via `publish`. A
+        # failing callback belongs to the leader's caller alone, so it is
+        # dropped rather than allowed to abort the shared generation.
+        flight.publish(partial)
+        if callback[0]:
+            try:
+                callback[0](partial)
+            except Exception:
+                logger.warning("on_delta failed — no longer streaming to it", exc_info=True)
+                callback[0] = None
+
+    outcome: dict = {}
+    try:
+        result = _generate(text, system_prompt, temperature, max_tokens,
+                           relay if on_delta else None, pin_slot)
+        result = _cache_store(cache, key, result, temperature)
+        outcome["result"] = result
+    except Exception as exc:
+        outcome["error"] = exc
+        raise
+    finally:
+        # Leave before waking followers, so retrying ones start a new flight.
+        # Anything that is not an `Exception` (e.g. Streamlit's rerun / stop
+        # signals) only concerns the leader's session: followers just retry.
+        _leave_flight(flight_key, flight)
+        flight.finish(**outcome)
+    return result
+
+
+def _generate(text, system_prompt, temperature, max_tokens, on_delta, pin_slot) -> dict:
+    """Fit the request into the context and run it on a backend (with failover)."""
+    prompt_tokens = count_tokens(f"{system_prompt}\n{_user_message(text)}")
+    max_tokens = fit_max_tokens(prompt_tokens, max_tokens)
+    affinity = prompt_key(text, system_prompt) if pin_slot else None
+
+    def send(backend: Backend) -> dict:
+        slot = -1
+        if pin_slot:
+            slot = router().claim_slot(backend, slot_for(system_prompt, backend_slots(backend)))
+        url = f"{backend.url}{CHAT_PATH}"
+        try:
+            if on_delta is None:
+                return _call_blocking(url, text, system_prompt, temperature, max_tokens, slot)
+            return _call_streaming(url, text, system_prompt, temperature, max_tokens,
+                                   on_delta, slot)
+        finally:
+            router().release_slot(backend, slot)
+
+    return with_failover(send, affinity)
+
+
+def _cache_lookup(text, system_prompt, temperature, max_tokens, use_cache):
+    """Return `(cache, key, hit)`; `hit` is a ready-to-return result or None."""
+    if not use_cache or (cache := get_cache()) is None:
+        return None, None, None
+    t0 = time.time()
+    key = cache_key(text, system_prompt, temperature, max_tokens, MODEL)
+    hit = cache.get(key, allow_nondeterministic=SERVE_NONDETERMINISTIC)
+    if hit is None:
+        return cache, key, None
+    lookup = time.time() - t0
+    return cache, key, {**hit, "elapsed": lookup, "ttft": lookup, "cached": True}
+
+
+def _cache_store(cache, key, result: dict, temperature: float) -> dict:
+    """Tag a fresh result with its cache flags and store it."""
+    deterministic = temperature == 0
+    result.update(cached=False, cache_safe=deterministic)
+    if cache is not None and result["summary"]:
+        cache.put(key, result, deterministic=deterministic)
+    return result
+
+
+def _call_blocking(url, text, system_prompt, temperature, max_tokens, slot=-1) -> dict:
+    payload = _build_payload(text, system_prompt, temperature, max_tokens, stream=False,
+                             slot=slot)
+    t0 = time.time()
+    resp = http_request("POST", url, json=payload, timeout=REQUEST_TIMEOUT)
+    elapsed = time.time() - t0
+    check_backend_response(resp)
+    data = resp.json()
+    # Without streaming the first token arrives together with the last one
+    return _result(data["choices"][0]["message"]["content"], elapsed, elapsed,
+                   _usage_from(data), data.get("timings"))
+
+
+def _call_streaming(url, text, system_prompt, temperature, max_tokens, on_delta,
+                    slot=-1) -> dict:
+    payload = _build_payload(text, system_prompt, temperature, max_tokens, stream=True,
+                             slot=slot)
+    t0 = time.time()
+    ttft = None
+    summary = ""
+    chunks = 0
+    usage: dict = {}
+    timings: dict = {}
+    with http_request("POST", url, json=payload, timeout=REQUEST_TIMEOUT,
+                      stream=True) as resp:
+        check_backend_response(resp)
+        for event in _iter_sse(resp):
+            usage = _usage_from(event) or usage
+            timings = event.get("timings") or timings
+            for choice in event.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content")
+                if not delta:
+                    continue
+                if ttft is None:
+                    ttft = time.time() - t0
+                chunks += 1
+                summary += delta
+                on_delta(summary)
+    elapsed = time.time() - t0
+    if not usage.get("completion_tokens"):
+        # llama.cpp emits one token per chunk — a good fallback count
+        usage = {**usage, "completion_tokens": chunks}
+    return _result(summary, elapsed, ttft if ttft is not None else elapsed, usage, timings)
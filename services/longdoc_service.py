@@ -0,0 +1,239 @@
+"""
+Long-Document Service — Map-reduce summarization for inputs larger than the
+model's context window.
+
+The text is cut into sentence-aligned chunks of at most `CHUNK_TOKENS`
+tokens (less if the server's context window is smaller). Each chunk is
+summarized concurrently (one request per llama.cpp slot), then the partial
+summaries are merged by a final reduce pass that uses the same
+`build_system_prompt` style and language.
+
+Usage:
+    from services.longdoc_service import summarize_long, needs_chunking
+    if needs_chunking(text, system_prompt, max_tokens=1024):
+        result = summarize_long(text, "Concise", "English", "", 0.3, 1024)
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from services import llm_service
+from services.llm_service import (
+    CONTEXT_MARGIN, build_system_prompt, count_tokens, count_tokens_exact, estimate_tokens,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS   = 2048  # input budget per map request
+MAP_MAX_TOKENS = 384   # generation budget for each partial summary
+PROMPT_TOKENS  = 160   # room kept for the system prompt around each chunk
+MAX_REDUCE_DEPTH = 4   # safety net for the hierarchical reduce
+
+MAP_NOTE = (
+    "\nThe text is part {part} of {total} of a longer document. "
+    "Summarize only this part; it will be merged with the others later."
+)
+REDUCE_NOTE = (
+    "\nThe text consists of partial summaries of consecutive sections of one "
+    "document. Merge them into a single coherent summary without repeating points."
+)
+
+# Sentence ends: Latin / Arabic punctuation followed by whitespace, CJK
+# full-width punctuation (no space needed), or blank lines.
+_SENTENCE_END = re.compile(r"(?<=[.!?؟])\s+|(?<=[。！？])|\n\s*\n")
+
+
+# ──────────────────────────────────────────────────────────────
+# Chunking
+# ──────────────────────────────────────────────────────────────
+
+def split_sentences(text: str) -> list[str]:
+    """Split text into sentences (keeps punctuation, drops empty pieces)."""
+    return [s.strip() for s in _SENTENCE_END.split(text.strip()) if s and s.strip()]
+
+
+def _split_oversized(sentence: str, budget: int,
+                     count: Callable[[str], int]) -> list[str]:
+    """Cut a single sentence that exceeds `budget` at word (or char) boundaries."""
+    words = sentence.split()
+    if len(words) <= 1:
+        # No spaces (e.g. CJK) — cut by characters proportionally
+        step = max(len(sentence) * budget // max(count(sentence), 1), 1)
+        return [sentence[i:i + step] for i in range(0, len(sentence), step)]
+    pieces, current = [], []
+    for word in words:
+        if current and count(" ".join(current + [word])) > budget:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_text(text: str, budget: int = CHUNK_TOKENS,
+               count: Callable[[str], int] = estimate_tokens) -> list[str]:
+    """
+    Group sentences into chunks of at most `budget` tokens.
+
+    Sentences are never split unless a single one is larger than the budget.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    used = 0
+    for sentence in split_sentences(text):
+        tokens = count(sentence)
+        if tokens > budget:
+            if current:
+                chunks.append(" ".join(current))
+                current, used = [], 0
+            chunks.extend(_split_oversized(sentence, budget, count))
+            continue
+        if current and used + tokens > budget:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+        current.append(sentence)
+        used += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def chunk_budget() -> int:
+    """`CHUNK_TOKENS`, shrunk to fit the server's context window if needed."""
+    n_ctx = llm_service.context_size()
+    if not n_ctx:
+        return CHUNK_TOKENS
+    room = n_ctx - MAP_MAX_TOKENS - PROMPT_TOKENS - CONTEXT_MARGIN
+    return max(min(CHUNK_TOKENS, room), 64)
+
+
+def calibrated_counter(text: str) -> Callable[[str], int]:
+    """
+    Token counter for pieces of `text` that costs a single `/tokenize` call.
+
+    The exact count of the whole text gives a tokens-per-character ratio for
+    this document (and its script), which is then applied to each sentence.
+    Falls back to `estimate_tokens` when the server is offline.
+    """
+    exact = count_tokens_exact(text) if text else None
+    if not exact:
+        return estimate_tokens
+    ratio = exact / len(text)
+    return lambda piece: int(len(piece) * ratio + 0.999)
+
+
+def needs_chunking(text: str, system_prompt: str = "", max_tokens: int = 0,
+                   n_ctx: Optional[int] = None) -> bool:
+    """
+    True when `text` does not fit in a single request: system prompt, text,
+    `max_tokens` and `CONTEXT_MARGIN` together exceed the context window.
+
+    When the window is unknown (`/props` unavailable), texts longer than
+    `CHUNK_TOKENS` are chunked to stay on the safe side.
+    """
+    n_ctx = llm_service.context_size() if n_ctx is None else n_ctx
+    if not n_ctx:
+        return count_tokens(text) > CHUNK_TOKENS
+    system = count_tokens(system_prompt) if system_prompt else 0
+    return system + count_tokens(text) + max_tokens + CONTEXT_MARGIN > n_ctx
+
+
+# ──────────────────────────────────────────────────────────────
+# Map-reduce
+# ──────────────────────────────────────────────────────────────
+
+def _map(chunks: list[str], style: str, language: str, extra: str,
+         temperature: float, parallel: int,
+         on_progress: Optional[Callable[[int, int], None]]) -> list[dict]:
+    """Summarize every chunk, `parallel` requests at a time, preserving order."""
+    base = build_system_prompt(style, language, extra)
+    total = len(chunks)
+    done = 0
+
+    def run(i: int) -> dict:
+        prompt = base + MAP_NOTE.format(part=i + 1, total=total)
+        return llm_service.call_llm(chunks[i], prompt, temperature, MAP_MAX_TOKENS,
+                                    pin_slot=False)
+
+    results: list[dict] = []
+    with ThreadPoolExecutor(max_workers=max(min(parallel, total), 1)) as pool:
+        for result in pool.map(run, range(total)):
+            results.append(result)
+            done += 1
+            if on_progress:
+                on_progress(done, total)
+    return results
+
+
+def summarize_long(
+    text: str,
+    style: str,
+    language: str,
+    extra: str,
+    temperature: float,
+    max_tokens: int,
+    on_delta: Optional[Callable[[str], None]] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    parallel: Optional[int] = None,
+    budget: Optional[int] = None,
+) -> dict:
+    """
+    Summarize a document of any length with map-reduce.
+
+    Args:
+        text, style, language, extra, temperature, max_tokens:
+                     Same meaning as for `call_llm` / `build_system_prompt`.
+        on_delta:    Streaming callback for the final (reduce) pass.
+        on_progress: Called as `on_progress(done, total)` after each map chunk.
+        parallel:    Concurrent map requests (default: the server's slot count).
+        budget:      Token budget per chunk (default: `chunk_budget()`).
+
+    Returns:
+        The `call_llm` result dict of the final pass, with token counts summed
+        over all requests, `elapsed` covering the whole run, and `chunks` set
+        to the number of map chunks.
+
+    Raises:
+        requests.exceptions.RequestException: If any request fails.
+    """
+    t0 = time.time()
+    parallel = parallel or llm_service.server_slots()
+    budget = budget or chunk_budget()
+    partials = chunk_text(text, budget, calibrated_counter(text))
+    usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    n_chunks = len(partials)
+    logger.info("Map-reduce: %d chunks, %d parallel requests", n_chunks, parallel)
+
+    # Map (and, if the partials are still too long, map them again)
+    for depth in range(MAX_REDUCE_DEPTH):
+        results = _map(partials, style, language, extra, temperature, parallel,
+                       on_progress if depth == 0 else None)
+        for r in results:
+            for k in usage:
+                usage[k] += r[k]
+        partials = [r["summary"] for r in results]
+        merged = "\n\n".join(partials)
+        count = calibrated_counter(merged)
+        if count(merged) <= budget:
+            break
+        partials = chunk_text(merged, budget, count)
+
+    # Reduce
+    t_reduce = time.time()
+    system = build_system_prompt(style, language, extra) + REDUCE_NOTE
+    final = llm_service.call_llm(merged, system, temperature, max_tokens, on_delta=on_delta)
+    for k in usage:
+        usage[k] += final[k]
+    return {
+        **final,
+        **usage,
+        "elapsed": time.time() - t0,
+        "ttft":    (t_reduce - t0) + final["ttft"],
+        "chunks":  n_chunks,
+    }
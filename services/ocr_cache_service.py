@@ -0,0 +1,278 @@
+"""
+OCR Cache Service — Persistent cache of OCR results (SQLite).
+
+Each entry is the JSON of one OCR result (the languages used and every
+detected block), keyed on a hash of the raw image bytes, the language tuple
+and the preprocessing parameters, and evicted least-recently-used once the
+cache grows past `MAX_BYTES`. With `perceptual=True`, a miss on the exact
+bytes falls back to a 64-bit difference hash (dHash) of the image, so a
+re-encoded, re-compressed or resized copy of a cached image still hits.
+A dHash alone cannot tell apart two text pages with the same layout, so
+every dHash candidate is confirmed by its aspect ratio and a comparison of
+64×64 grayscale thumbnails before its result is returned.
+
+Usage:
+    from services.ocr_cache_service import get_ocr_cache
+    cache = get_ocr_cache()
+    data = cache.get(image_bytes, ["en"], params)      # JSON str or None
+    cache.put(image_bytes, ["en"], params, json.dumps(result))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from services.cache_service import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+MAX_BYTES      = 32 * 1024 * 1024  # total stored result + thumbnail size before LRU eviction
+PERCEPTUAL     = os.environ.get("OCR_CACHE_PERCEPTUAL", "").lower() in ("1", "true", "yes")
+PHASH_DISTANCE = 4                 # max differing dHash bits for a perceptual candidate
+THUMB_SIZE     = 64                # side of the grayscale thumbnail that confirms it
+THUMB_MATCH    = 0.98              # min thumbnail correlation (re-encoded copies: > 0.99)
+ASPECT_TOLERANCE = 0.03            # max relative aspect-ratio difference
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_results (
+    key      TEXT PRIMARY KEY,
+    variant  TEXT NOT NULL,
+    phash    INTEGER,
+    aspect   REAL,
+    thumb    BLOB,
+    text     TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_accessed ON ocr_results (accessed);
+CREATE INDEX IF NOT EXISTS idx_ocr_variant ON ocr_results (variant);
+"""
+
+
+# ──────────────────────────────────────────────────────────────
+# Keys
+# ──────────────────────────────────────────────────────────────
+
+def variant_key(langs: list[str], params: dict) -> str:
+    """Hash of everything but the image: language tuple + preprocessing params."""
+    material = json.dumps([sorted(langs), params], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def image_key(image: bytes, langs: list[str], params: dict) -> str:
+    """SHA-256 over the raw image bytes and the variant."""
+    h = hashlib.sha256(image)
+    h.update(variant_key(langs, params).encode("ascii"))
+    return h.hexdigest()
+
+
+def _dhash_bits(gray: Image.Image, size: int = 8) -> int:
+    """
+    64-bit difference hash: shrink to (size+1)×size, one bit per horizontal
+    gradient sign. Stable under re-encoding and resizing.
+    """
+    small = gray.resize((size + 1, size), Image.BILINEAR)
+    px = np.asarray(small, dtype=np.int16)
+    bits = (px[:, 1:] > px[:, :-1]).flatten()
+    # Stored in SQLite's signed 64-bit INTEGER
+    return int(np.packbits(bits).view(">i8")[0])
+
+
+def fingerprint(image: bytes) -> Optional[tuple[int, float, bytes]]:
+    """
+    `(dhash, aspect ratio, THUMB_SIZE² grayscale thumbnail)` of an image,
+    from a single (draft) decode. None if the bytes cannot be decoded.
+    """
+    try:
+        img = Image.open(io.BytesIO(image))
+        width, height = img.size
+        img.draft("L", (THUMB_SIZE * 2, THUMB_SIZE * 2))
+        gray = img.convert("L")
+        thumb = gray.resize((THUMB_SIZE, THUMB_SIZE), Image.BILINEAR).tobytes()
+        return _dhash_bits(gray), width / max(height, 1), thumb
+    except Exception:
+        return None
+
+
+def same_page(a: bytes, b: bytes) -> bool:
+    """True when two thumbnails show the same image (correlation >= `THUMB_MATCH`)."""
+    x = np.frombuffer(a, dtype=np.uint8).astype(np.float32)
+    y = np.frombuffer(b, dtype=np.uint8).astype(np.float32)
+    if x.shape != y.shape or abs(x.mean() - y.mean()) > 16:
+        return False
+    x -= x.mean()
+    y -= y.mean()
+    nx, ny = float(np.sqrt((x * x).sum())), float(np.sqrt((y * y).sum()))
+    if nx < 1e-3 or ny < 1e-3:
+        return nx < 1e-3 and ny < 1e-3  # both flat, same brightness
+    return float((x * y).sum()) / (nx * ny) >= THUMB_MATCH
+
+
+def _hamming(a: np.ndarray, b: int) -> np.ndarray:
+    x = np.bitwise_xor(a, np.int64(b)).view(np.uint8)
+    return np.unpackbits(x).reshape(len(a), 64).sum(axis=1)
+
+
+# ──────────────────────────────────────────────────────────────
+# Cache
+# ──────────────────────────────────────────────────────────────
+
+class OCRCache:
+    """SQLite-backed LRU cache of OCR results (thread- and process-safe)."""
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_BYTES,
+                 perceptual: bool = PERCEPTUAL, max_distance: int = PHASH_DISTANCE):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "ocr.sqlite3")
+        self.max_bytes = max_bytes
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._migrate()
+        self._stats = {"hits": 0, "perceptual_hits": 0, "misses": 0, "evictions": 0}
+
+    def _migrate(self) -> None:
+        """Add the confirmation columns to caches created before they existed."""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(ocr_results)")}
+        for name, kind in (("aspect", "REAL"), ("thumb", "BLOB")):
+            if name not in columns:
+                try:
+                    self._db.execute(f"ALTER TABLE ocr_results ADD COLUMN {name} {kind}")
+                except sqlite3.OperationalError:
+                    pass  # added concurrently by another process
+        self._db.commit()
+
+    def get(self, image: bytes, langs: list[str], params: dict) -> Optional[str]:
+        """
+        Return the cached OCR result (the JSON stored by `put`) for this image
+        and settings, or None (a miss).
+        """
+        key = image_key(image, langs, params)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT key, text FROM ocr_results WHERE key = ?", (key,)
+            ).fetchone()
+            stat = "hits"
+            if row is None and self.perceptual:
+                row = self._nearest(image, variant_key(langs, params))
+                stat = "perceptual_hits"
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE ocr_results SET accessed = ? WHERE key = ?",
+                             (now, row[0]))
+            self._db.commit()
+            self._stats[stat] += 1
+        return row[1]
+
+    def _nearest(self, image: bytes, variant: str) -> Optional[tuple[str, str]]:
+        """
+        Entry of the same variant within `max_distance` dHash bits whose
+        aspect ratio and thumbnail also match (closest first), or None.
+        Entries stored without a thumbnail never match perceptually.
+        """
+        probe = fingerprint(image)
+        if probe is None:
+            return None
+        target, aspect, thumb = probe
+        rows = self._db.execute(
+            "SELECT key, phash FROM ocr_results "
+            "WHERE variant = ? AND phash IS NOT NULL AND thumb IS NOT NULL",
+            (variant,),
+        ).fetchall()
+        if not rows:
+            return None
+        distances = _hamming(np.array([r[1] for r in rows], dtype=np.int64), target)
+        for i in np.argsort(distances, kind="stable"):
+            if distances[i] > self.max_distance:
+                break
+            row = self._db.execute(
+                "SELECT key, text, aspect, thumb FROM ocr_results WHERE key = ?",
+                (rows[i][0],),
+            ).fetchone()
+            if row is None or abs(row[2] - aspect) > ASPECT_TOLERANCE * aspect:
+                continue
+            if same_page(row[3], thumb):
+                return row[0], row[1]
+        return None
+
+    def put(self, image: bytes, langs: list[str], params: dict, data: str) -> None:
+        """
+        Store `data` (the JSON of an OCR result), then evict least-recently-used
+        entries over `max_bytes`.
+        """
+        key = image_key(image, langs, params)
+        # Always stored, so perceptual mode can be turned on later
+        phash, aspect, thumb = fingerprint(image) or (None, None, None)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO ocr_results "
+                "(key, variant, phash, aspect, thumb, text, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, variant_key(langs, params), phash, aspect, thumb, data,
+                 len(data.encode("utf-8")) + len(thumb or b""), now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM ocr_results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM ocr_results ORDER BY accessed ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM ocr_results WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        """Counters (`hits`, `perceptual_hits`, `misses`, `evictions`) plus `entries` / `bytes`."""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_results"
+            ).fetchone()
+            return {**self._stats, "entries": entries, "bytes": size}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM ocr_results")
+            self._db.commit()
+
+
+_cache: Optional[OCRCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """Return the process-wide OCR cache, or None if `CACHE_DIR` is unusable."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = OCRCache(CACHE_DIR)
+                except (OSError, sqlite3.Error) as exc:
+                    logger.warning("OCR cache disabled (%s): %s", CACHE_DIR, exc)
+                    return None
+    return _cache
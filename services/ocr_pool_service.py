@@ -0,0 +1,417 @@
+"""
+OCR Pool Service — Persistent worker processes for EasyOCR.
+
+Each worker process keeps its own `_reader_cache`, with the configured
+readers built at start-up. OCR therefore runs outside the Streamlit
+script thread and does not compete for the GIL. Each worker gets an equal
+share of the OCR thread budget (`ocr_service.OCR_THREADS`, half the cores
+by default, and of `OCR_CPU_AFFINITY` if set), so throughput grows with the
+number of workers while the rest of the host stays free for llama.cpp.
+
+Jobs are submitted as raw image bytes. At most `max_pending` jobs can be
+queued or running; `submit` blocks beyond that (backpressure) and raises
+`OCRBusyError` if no room frees up in time. A worker that crashes or hangs
+is restarted, and its job is retried once on the fresh worker.
+
+Usage:
+    from services.ocr_pool_service import get_pool
+    pool = get_pool()                       # None if OCR_WORKERS=0
+    result = pool.submit(image_bytes).result()  # ocr_service.ocr_image dict
+    for i, text, error in pool.extract_many(pages):
+        ...
+
+    # App start-up (opt-in with OCR_WARMUP=1), then poll readiness
+    start_warmup()
+    engine_status()                         # "warming" → "ready"
+
+Requirements:
+    pip install easyocr Pillow
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from services import ocr_service
+from services.ocr_service import DEFAULT_LANGS, OCRError
+
+logger = logging.getLogger(__name__)
+
+# Worker processes (0 = OCR in the calling process). Each loads its own models.
+POOL_WORKERS     = int(os.environ.get("OCR_WORKERS", max(min((os.cpu_count() or 1) // 2, 4), 1)))
+QUEUE_PER_WORKER = 2      # queued + running jobs allowed per worker before submit blocks
+JOB_TIMEOUT      = 300.0  # s — a worker silent for this long is considered hung
+MAX_ATTEMPTS     = 2      # a job is retried once after its worker crashed
+SUBMIT_TIMEOUT   = 60.0   # s — how long `submit` waits for queue room
+RESTART_BACKOFF  = 1.0    # s — pause before restarting a worker that died on start-up
+
+
+class OCRBusyError(OCRError):
+    """Raised when the OCR queue stays full for longer than the submit timeout."""
+    pass
+
+
+# ──────────────────────────────────────────────────────────────
+# Worker process
+# ──────────────────────────────────────────────────────────────
+
+def _ocr_job(image: bytes, langs: list[str]) -> dict:
+    """Default job: the in-process OCR path (with its cache), run inside the worker."""
+    from services.ocr_service import ocr_image
+    return ocr_image(image, langs)
+
+
+def _warm(langs: list[str]) -> None:
+    """Build the reader for `langs` (plus a dummy inference) before the first job."""
+    from services.ocr_service import warm_up
+    warm_up(langs)
+
+
+def _worker_main(conn, handler: Callable[[bytes, list[str]], Union[str, dict]],
+                 warm_langs: Optional[list[str]], threads: int, cpus: list[int]) -> None:
+    """
+    Worker loop: receive `(image, langs, precision)`, reply `("ok", result)` /
+    `("error", message)`. `precision` is the parent's `precision_settings()`.
+    """
+    # Before torch is imported (by EasyOCR, lazily): this worker's share of the budget
+    ocr_service.apply_thread_budget(threads, cpus=cpus)
+    if warm_langs:
+        _warm(warm_langs)  # failures are logged; jobs will report the real error
+    conn.send(("ready", os.getpid(), ocr_service.thread_settings()))
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if job is None:
+            return
+        image, langs, precision = job
+        try:
+            ocr_service.apply_precision_settings(precision)
+            conn.send(("ok", handler(image, langs)))
+        except Exception as exc:
+            conn.send(("error", str(exc) or type(exc).__name__))
+
+
+# ──────────────────────────────────────────────────────────────
+# Pool
+# ──────────────────────────────────────────────────────────────
+
+class _Worker:
+    """Parent-side handle of one worker process."""
+
+    def __init__(self, ctx, handler, warm_langs, threads, cpus):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child, handler, warm_langs, threads, cpus),
+            name="ocr-worker", daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.ready = False
+        self.threads: Optional[dict] = None  # effective settings, reported when ready
+
+    def stop(self, timeout: float = 2.0) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout)
+        self.conn.close()
+
+
+class OCRPool:
+    """A fixed set of OCR worker processes fed from one bounded job queue."""
+
+    def __init__(
+        self,
+        workers: int = POOL_WORKERS,
+        langs: Optional[list[str]] = None,
+        max_pending: Optional[int] = None,
+        warm: bool = True,
+        handler: Callable[[bytes, list[str]], Union[str, dict]] = _ocr_job,
+        job_timeout: float = JOB_TIMEOUT,
+    ):
+        if workers < 1:
+            raise ValueError("OCRPool needs at least one worker")
+        self.langs = langs or DEFAULT_LANGS
+        self.handler = handler
+        self.job_timeout = job_timeout
+        self.max_pending = max_pending or workers * QUEUE_PER_WORKER
+        self._warm_langs = self.langs if warm else None
+        # The OCR thread budget (and CPU set, if pinned) is split between workers
+        self._torch_threads = max(ocr_service.OCR_THREADS // workers, 1)
+        cpus = ocr_service.CPU_AFFINITY
+        self._cpus = [cpus[i * len(cpus) // workers:(i + 1) * len(cpus) // workers] or cpus
+                      for i in range(workers)]
+        # spawn: torch / OpenMP state does not survive fork reliably
+        self._ctx = mp.get_context("spawn")
+        self._room = threading.BoundedSemaphore(self.max_pending)
+        self._jobs: queue.Queue = queue.Queue()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "restarts": 0}
+        self._workers = [self._spawn(i) for i in range(workers)]
+        self._threads = [
+            threading.Thread(target=self._serve, args=(i,), name=f"ocr-pool-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ── Public API ──
+
+    def submit(self, image: bytes, langs: Optional[list[str]] = None,
+               timeout: Optional[float] = SUBMIT_TIMEOUT) -> Future:
+        """
+        Queue one image for OCR and return a Future of the handler's result
+        (the `ocr_service.ocr_image` dict for the default job).
+
+        Blocks while `max_pending` jobs are queued or running.
+
+        Raises:
+            OCRBusyError: If no room frees up within `timeout` seconds.
+        """
+        if self._closed:
+            raise OCRError("OCR pool is closed")
+        langs = list(langs or self.langs)
+        future: Future = Future()
+        if self.handler is _ocr_job:
+            hit = ocr_service.cached_ocr(bytes(image), langs)
+            if hit is not None:  # no round trip to a worker
+                future.set_result(hit)
+                return future
+        if not self._room.acquire(timeout=timeout):
+            raise OCRBusyError(f"OCR queue full ({self.max_pending} jobs pending)")
+        future.add_done_callback(lambda _: self._room.release())
+        with self._stats_lock:
+            self._stats["submitted"] += 1
+        self._jobs.put((bytes(image), langs, ocr_service.precision_settings(), future, 1))
+        return future
+
+    def extract_many(self, images: Iterable[bytes], langs: Optional[list[str]] = None,
+                     structured: bool = False,
+                     ) -> Iterator[tuple[int, Union[str, dict], Optional[OCRError]]]:
+        """
+        Pool counterpart of `ocr_service.extract_text_from_images`: yields
+        `(index, text, error)` in input order, never more than `max_pending`
+        images ahead of the consumer. With `structured`, the full
+        `ocr_image` dicts are yielded instead of their text.
+        """
+        empty = ocr_service.filter_blocks([]) if structured else ""
+        pending: deque = deque()
+        images = iter(enumerate(images))
+
+        def fill():
+            while len(pending) < self.max_pending:
+                nxt = next(images, None)
+                if nxt is None:
+                    return
+                try:
+                    future = self.submit(nxt[1], langs)
+                except OCRBusyError as exc:
+                    future = Future()
+                    future.set_exception(exc)
+                pending.append((nxt[0], future))
+
+        fill()
+        while pending:
+            i, future = pending.popleft()
+            try:
+                result = future.result()
+            except OCRError as exc:
+                yield i, empty, exc
+            else:
+                if isinstance(result, dict) and not structured:
+                    result = result["text"]
+                yield i, result, None
+            fill()
+
+    def stats(self) -> dict:
+        """Job counters, worker restarts, the queue depth and each worker's effective `threads`."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["workers"] = len(self._workers)
+        stats["alive"] = sum(w.process.is_alive() for w in self._workers)
+        stats["queued"] = self._jobs.qsize()
+        stats["threads"] = [w.threads for w in self._workers]
+        return stats
+
+    def close(self) -> None:
+        """Stop the workers; queued jobs fail with `OCRError`."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._jobs.put(None)
+        for t in self._threads:
+            t.join(timeout=self.job_timeout)
+        for w in self._workers:
+            w.stop()
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[3].set_exception(OCRError("OCR pool closed"))
+
+    # ── Internals ──
+
+    def _spawn(self, i: int) -> _Worker:
+        return _Worker(self._ctx, self.handler, self._warm_langs, self._torch_threads,
+                       self._cpus[i])
+
+    def _restart(self, i: int, reason: str) -> None:
+        logger.warning("OCR worker %d %s — restarting", i, reason)
+        self._workers[i].stop(timeout=0.5)
+        self._workers[i] = self._spawn(i)
+        with self._stats_lock:
+            self._stats["restarts"] += 1
+
+    def _await_reply(self, worker: _Worker, deadline: Optional[float]):
+        """Next message from `worker`, or None if it died or went silent."""
+        while True:
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.time())
+            if wait <= 0 or self._closed:
+                return None
+            try:
+                if worker.conn.poll(wait):
+                    return worker.conn.recv()
+            except (EOFError, OSError):
+                return None
+            if not worker.process.is_alive():
+                return None
+
+    def ready_workers(self) -> int:
+        """Workers that finished start-up (readers built and warmed)."""
+        return sum(w.ready and w.process.is_alive() for w in self._workers)
+
+    def _serve(self, i: int) -> None:
+        """Feed jobs to worker `i`, restarting it when it crashes or hangs."""
+        while True:
+            worker = self._workers[i]
+            if not worker.ready:
+                # Start-up (model load) is not bounded by the job timeout
+                reply = self._await_reply(worker, None)
+                if reply is None or reply[0] != "ready":
+                    if self._closed:
+                        return
+                    time.sleep(RESTART_BACKOFF)
+                    self._restart(i, "failed to start")
+                    continue
+                worker.ready = True
+                worker.threads = reply[2]
+            job = self._jobs.get()
+            if job is None:
+                return
+            image, langs, precision, future, attempt = job
+            if attempt == 1 and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                worker.conn.send((image, langs, precision))
+                reply = self._await_reply(worker, time.time() + self.job_timeout)
+            except (OSError, ValueError):
+                reply = None
+            if reply is None and self._closed:
+                self._finish(future, error=OCRError("OCR pool closed"))
+                return
+            if reply is None:
+                self._restart(i, "crashed" if not worker.process.is_alive() else "hung")
+                if attempt < MAX_ATTEMPTS:
+                    self._jobs.put((image, langs, precision, future, attempt + 1))
+                else:
+                    self._finish(future, error=OCRError("OCR worker crashed"))
+                continue
+            status, value = reply
+            if status == "ok":
+                self._finish(future, result=value)
+            else:
+                self._finish(future, error=OCRError(value))
+
+    def _finish(self, future: Future, result: Optional[str] = None,
+                error: Optional[Exception] = None) -> None:
+        with self._stats_lock:
+            self._stats["failed" if error else "completed"] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+_pool: Optional[OCRPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(start: bool = True) -> Optional[OCRPool]:
+    """
+    Return the process-wide OCR pool (`OCR_WORKERS` workers), or None if
+    disabled — or, with `start=False`, if it has not been started yet.
+    """
+    global _pool
+    if POOL_WORKERS < 1:
+        return None
+    if _pool is None and start:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCRPool(POOL_WORKERS)
+    return _pool
+
+
+# ──────────────────────────────────────────────────────────────
+# Warm-up & readiness (pool or in-process)
+# ──────────────────────────────────────────────────────────────
+
+def start_warmup(langs: Optional[list[str]] = None) -> None:
+    """
+    Start loading OCR models in the background: spawn the worker pool (whose
+    workers warm up on start), or warm the in-process reader if the pool is
+    disabled. Returns immediately.
+    """
+    if POOL_WORKERS >= 1:
+        get_pool()
+    elif ocr_service.reader_status(langs) == "cold":
+        ocr_service.warm_up_async(langs)
+
+
+def thread_report() -> list[dict]:
+    """Effective thread settings of every process running OCR (pool workers or this one)."""
+    pool = get_pool(start=False) if POOL_WORKERS >= 1 else None
+    if pool is not None:
+        return [t for t in pool.stats()["threads"] if t is not None]
+    return [ocr_service.thread_settings()]
+
+
+def thread_summary() -> dict:
+    """
+    OCR `threads` in use and the `llm_cores` left to llama.cpp, for status
+    displays. While pool workers are still starting (no report yet), the
+    OCR thread budget is shown instead.
+    """
+    local = ocr_service.thread_settings()
+    used = sum(t["intra_op"] or t["threads"] for t in thread_report())
+    return {"threads": used or local["threads"], "llm_cores": local["llm_cores"]}
+
+
+def engine_status(langs: Optional[list[str]] = None) -> str:
+    """
+    `"ready"`, `"warming"`, `"cold"` (will load on first use) or `"failed"`
+    for whichever OCR path `extract` calls will take.
+    """
+    if POOL_WORKERS >= 1:
+        pool = get_pool(start=False)
+        if pool is None:
+            return "cold"
+        return "ready" if pool.ready_workers() else "warming"
+    return ocr_service.reader_status(langs)
@@ -5,6 +5,15 @@ Usage:
     from services.ocr_service import extract_text_from_image
     text = extract_text_from_image(uploaded_file_bytes)
 
+    # Several pages — results arrive in input order as they finish
+    from services.ocr_service import extract_text_from_images, join_pages
+    for i, text, error in extract_text_from_images(pages):
+        ...
+
+    # Languages picked per image from its script; boxes and confidences kept
+    from services.ocr_service import ocr_image, AUTO_LANGS
+    result = ocr_image(uploaded_file_bytes, AUTO_LANGS)   # result["langs"], ["blocks"]
+
 Requirements:
     pip install easyocr Pillow
 """
@@ -12,38 +21,529 @@ Requirements:
 from __future__ import annotations
 
 import io
+import json
 import logging
-from typing import Union
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Union
 
 import numpy as np
-from PIL import Image, ImageFilter, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+
+try:
+    import cv2
+except ImportError:  # optional — the PIL pipeline is used instead
+    cv2 = None
+
+from services.ocr_cache_service import get_ocr_cache
 
 logger = logging.getLogger(__name__)
 
 # ──────────────────────────────────────────────────────────────
-# Lazy-loaded EasyOCR reader (heavy init — only created once)
+# Lazy-loaded EasyOCR readers (heavy init — cached, LRU-bounded)
 # ──────────────────────────────────────────────────────────────
-_reader_cache: dict = {}
+
+DEFAULT_LANGS = ["en", "fr"]
+# Opt-in: build the default readers in the background at start-up
+WARMUP = os.environ.get("OCR_WARMUP", "").lower() in ("1", "true", "yes")
+
+# Concurrent `readtext` calls allowed per reader (torch inference is thread-safe;
+# the limit keeps torch's own thread pools from being oversubscribed)
+READER_CONCURRENCY = 2
+
+# Each reader holds its recognizer weights; least recently used readers are
+# dropped beyond these bounds (0 MB = bounded by count only)
+READER_CACHE_SIZE = int(os.environ.get("OCR_READER_CACHE", 3))
+READER_CACHE_MB   = int(os.environ.get("OCR_READER_CACHE_MB", 0))
+SHARE_DETECTOR    = True  # one CRAFT detector for all readers (it is language-independent)
+
+# Recognizer weights: "int8" (dynamic-quantized LSTM / Linear layers) or "fp32".
+# Per-reader overrides via `set_reader_precision`.
+READER_PRECISION  = os.environ.get("OCR_PRECISION", "int8")
+PRECISIONS        = ("int8", "fp32")
+
+_reader_cache: OrderedDict = OrderedDict()  # langs key -> Reader, least recently used first
+_reader_bytes: dict = {}   # langs key -> estimated recognizer bytes
+_reader_precision: dict = {}  # langs key -> precision the reader was built with (effective)
+_precision_overrides: dict = {}  # langs key -> requested precision
+_reader_locks: dict = {}   # per-reader semaphores (READER_CONCURRENCY)
+_reader_init_lock = threading.Lock()  # serializes reader construction
+_reader_lru_lock = threading.Lock()   # guards the LRU order and byte estimates
+_reader_locks_lock = threading.Lock()  # guards `_reader_locks` (never held during a build)
+_shared_detector: Optional[dict] = None  # detector, get_textbox, detect_network of the first reader
+
+
+def _module_bytes(module) -> int:
+    """Estimated weight memory of a torch module (incl. packed int8 weights)."""
+    if module is None:
+        return 0
+    total = 0
+    for value in module.state_dict().values():
+        for t in value if isinstance(value, tuple) else (value,):
+            if hasattr(t, "element_size"):
+                total += t.nelement() * t.element_size()
+    return total
+
+
+def _new_reader(langs: list[str]):
+    """Build an EasyOCR Reader, reusing the shared detector when there is one."""
+    global _shared_detector
+    if _budget is None:
+        apply_thread_budget()
+    import easyocr
+    _size_torch_pools()
+    precision = reader_precision(langs)
+    logger.info("Initializing EasyOCR reader for languages: %s (%s)", langs, precision)
+    # CPU for portability; EasyOCR applies `quantize_dynamic` itself on CPU
+    quantize = precision == "int8"
+    if not SHARE_DETECTOR or _shared_detector is None:
+        reader = easyocr.Reader(langs, gpu=False, quantize=quantize)
+        if SHARE_DETECTOR:
+            # Only the detection parts: holding the reader itself would keep
+            # its recognizer alive after the reader is evicted.
+            _shared_detector = {"detector": reader.detector,
+                                "get_textbox": reader.get_textbox,
+                                "detect_network": reader.detect_network}
+        return reader
+    # Recognizer only, then borrow the detection model and its post-processing.
+    # CRAFT is all convolutions, which dynamic quantization leaves in fp32,
+    # so one detector serves readers of either precision.
+    reader = easyocr.Reader(langs, gpu=False, detector=False, quantize=quantize)
+    for name, value in _shared_detector.items():
+        setattr(reader, name, value)
+    return reader
+
+
+def _evict_readers(keep: tuple) -> None:
+    """
+    Drop least recently used readers beyond the cache bounds, never `keep`
+    nor the `DEFAULT_LANGS` reader (it reads Latin pages and runs every
+    script probe, so losing it would mean rebuilding it for the next page).
+    """
+    budget = READER_CACHE_MB * 1024 * 1024
+    pinned = {keep, tuple(sorted(DEFAULT_LANGS))}
+    while len(_reader_cache) > 1:
+        total = sum(_reader_bytes.values())
+        if len(_reader_cache) <= READER_CACHE_SIZE and (not budget or total <= budget):
+            return
+        key = next((k for k in _reader_cache if k not in pinned), None)
+        if key is None:
+            return
+        _drop_reader(key)
+        logger.info("Evicted EasyOCR reader %s (LRU)", list(key))
+
+
+def _drop_reader(key: tuple) -> None:
+    """Forget the cached reader for `key` (caller holds `_reader_lru_lock`)."""
+    _reader_cache.pop(key, None)
+    _reader_bytes.pop(key, None)
+    _reader_precision.pop(key, None)
+    _reader_state.pop(key, None)
 
 
 def _get_reader(langs: list[str]):
-    """Return a cached EasyOCR Reader for the requested languages."""
+    """Return a cached EasyOCR Reader for the requested languages (LRU-bounded)."""
+    key = tuple(sorted(langs))
+    with _reader_lru_lock:
+        if key in _reader_cache:
+            _reader_cache.move_to_end(key)
+            return _reader_cache[key]
+    with _reader_init_lock:
+        with _reader_lru_lock:
+            if key in _reader_cache:
+                return _reader_cache[key]
+        reader = _new_reader(langs)
+        with _reader_lru_lock:
+            _reader_cache[key] = reader
+            recognizer = getattr(reader, "recognizer", None)
+            _reader_bytes[key] = _module_bytes(recognizer)
+            _reader_precision[key] = _effective_precision(recognizer)
+            _evict_readers(keep=key)
+    return reader
+
+
+def reader_cache_info() -> dict:
+    """
+    Cached readers and their estimated weight memory.
+
+    Returns:
+        `{"readers": [{"langs", "bytes", "precision"}, ...]}` (least
+        recently used first; `precision` is what the recognizer actually
+        runs in), plus `detector_bytes` (counted once, shared),
+        `total_bytes` and the configured `max_readers` / `max_bytes` bounds.
+    """
+    with _reader_lru_lock:
+        readers = [{"langs": list(k), "bytes": _reader_bytes.get(k, 0),
+                    "precision": _reader_precision.get(k)} for k in _reader_cache]
+        shared = _shared_detector if SHARE_DETECTOR else None
+    if shared is not None:
+        detector = _module_bytes(shared["detector"])
+    else:
+        detector = sum(_module_bytes(getattr(r, "detector", None))
+                       for r in list(_reader_cache.values()))
+    return {
+        "readers": readers,
+        "detector_bytes": detector,
+        "total_bytes": detector + sum(r["bytes"] for r in readers),
+        "max_readers": READER_CACHE_SIZE,
+        "max_bytes": READER_CACHE_MB * 1024 * 1024 or None,
+    }
+
+
+def _reader_lock(langs: list[str]) -> threading.Semaphore:
+    """Semaphore bounding concurrent `readtext` calls on the reader for `langs`."""
+    key = tuple(sorted(langs))
+    with _reader_locks_lock:
+        if key not in _reader_locks:
+            _reader_locks[key] = threading.BoundedSemaphore(READER_CONCURRENCY)
+        return _reader_locks[key]
+
+
+# ──────────────────────────────────────────────────────────────
+# CPU thread budget (OCR next to llama.cpp on one host)
+# ──────────────────────────────────────────────────────────────
+
+def _parse_cpus(spec: str) -> list[int]:
+    """CPU list syntax (`"0-3,6"`) to `[0, 1, 2, 3, 6]`."""
+    cpus: set = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        lo, _, hi = part.partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return sorted(cpus)
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        return os.cpu_count() or 1
+
+
+CPU_CORES       = _available_cores()
+# Default split: half the cores for OCR's torch pools (all pool workers
+# together), the other half left to a co-located llama.cpp
+OCR_THREADS     = int(os.environ.get("OCR_THREADS", max(CPU_CORES // 2, 1)))
+INTEROP_THREADS = int(os.environ.get("OCR_INTEROP_THREADS", 1))  # torch inter-op pool
+CPU_AFFINITY    = _parse_cpus(os.environ.get("OCR_CPU_AFFINITY", ""))  # [] = no pinning
+
+_budget: Optional[dict] = None  # what `apply_thread_budget` set in this process
+
+
+def apply_thread_budget(threads: Optional[int] = None, interop: Optional[int] = None,
+                        cpus: Optional[list[int]] = None) -> dict:
+    """
+    Bound this process's OCR threads: pin it to `cpus` (default
+    `CPU_AFFINITY`, if any) and size torch's intra-op (default
+    `OCR_THREADS`) and inter-op (`INTEROP_THREADS`) pools.
+
+    Call before the first reader is built; `_new_reader` does so with the
+    defaults, pool workers with their share. torch is not imported here:
+    the OpenMP / MKL variables are read when it is, and the torch pools
+    are sized with the first reader.
+
+    Returns:
+        `thread_settings()`.
+    """
+    global _budget
+    _budget = {"threads": threads or OCR_THREADS, "interop": interop or INTEROP_THREADS,
+               "torch": False}
+    cpus = CPU_AFFINITY if cpus is None else cpus
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as exc:
+            logger.warning("Could not pin OCR to CPUs %s: %s", cpus, exc)
+    os.environ["OMP_NUM_THREADS"] = str(_budget["threads"])
+    os.environ["MKL_NUM_THREADS"] = str(_budget["threads"])
+    if "torch" in sys.modules:
+        _size_torch_pools()
+    return thread_settings()
+
+
+def _size_torch_pools() -> None:
+    """Apply the budget to torch (once, after it is imported)."""
+    import torch
+    if _budget is None or _budget["torch"]:
+        return
+    torch.set_num_threads(_budget["threads"])
+    try:
+        torch.set_num_interop_threads(_budget["interop"])
+    except RuntimeError:  # only allowed before the first inter-op parallel work
+        logger.warning("torch inter-op threads already fixed at %d",
+                       torch.get_num_interop_threads())
+    _budget["torch"] = True
+
+
+def thread_settings() -> dict:
+    """
+    Effective thread settings of this process: `cores` available, the OCR
+    budget (`threads`, `interop`), what torch actually uses (`intra_op`,
+    `inter_op`; None until torch is loaded), the CPU `affinity` and the
+    `llm_cores` the default split leaves to llama.cpp.
+    """
+    torch = sys.modules.get("torch")
+    loaded = torch is not None and hasattr(torch, "get_num_threads")
+    try:
+        affinity = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        affinity = None
+    return {
+        "cores":     CPU_CORES,
+        "threads":   (_budget or {}).get("threads", OCR_THREADS),
+        "interop":   (_budget or {}).get("interop", INTEROP_THREADS),
+        "intra_op":  torch.get_num_threads() if loaded else None,
+        "inter_op":  torch.get_num_interop_threads() if loaded else None,
+        "affinity":  affinity,
+        "llm_cores": max(CPU_CORES - OCR_THREADS, 0),
+    }
+
+
+# ──────────────────────────────────────────────────────────────
+# Recognizer precision (int8 dynamic quantization vs fp32)
+# ──────────────────────────────────────────────────────────────
+
+# Synthetic lines for `benchmark_precision` (digits, punctuation, accents)
+BENCH_LINES = [
+    "Invoice 2024-117",
+    "Total due: 1,284.50 EUR",
+    "The quick brown fox jumps",
+    "Réunion à 14h30, salle B",
+]
+
+
+def reader_precision(langs: list[str]) -> str:
+    """Precision the reader for `langs` is built with: its override, else `READER_PRECISION`."""
+    return _precision_overrides.get(tuple(sorted(langs)), READER_PRECISION)
+
+
+def set_reader_precision(langs: list[str], precision: Optional[str]) -> None:
+    """
+    Select `"int8"` or `"fp32"` for the reader of `langs` (None = back to
+    `READER_PRECISION`). A cached reader built otherwise is dropped, so the
+    next call rebuilds it. OCR pool workers pick the setting up with their
+    next job (see `apply_precision_settings`).
+
+    Raises:
+        ValueError: For an unknown precision.
+    """
+    if precision is not None and precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+    key = tuple(sorted(langs))
+    with _reader_lru_lock:
+        if precision is None:
+            _precision_overrides.pop(key, None)
+        else:
+            _precision_overrides[key] = precision
+        if key in _reader_cache and _reader_precision.get(key) != reader_precision(langs):
+            _drop_reader(key)
+
+
+def precision_settings() -> dict:
+    """`READER_PRECISION` and the per-reader overrides, to hand to another process."""
+    with _reader_lru_lock:
+        return {"default": READER_PRECISION, "overrides": dict(_precision_overrides)}
+
+
+def apply_precision_settings(settings: dict) -> None:
+    """
+    Adopt another process's `precision_settings()`. Pool workers do this
+    for every job, so `set_reader_precision` in the app reaches them; cached
+    readers whose requested precision changed are dropped.
+    """
+    global READER_PRECISION
+    with _reader_lru_lock:
+        if (settings["default"] == READER_PRECISION
+                and settings["overrides"] == _precision_overrides):
+            return
+        before = {key: reader_precision(list(key)) for key in _reader_cache}
+        READER_PRECISION = settings["default"]
+        _precision_overrides.clear()
+        _precision_overrides.update(settings["overrides"])
+        for key, precision in before.items():
+            if reader_precision(list(key)) != precision:
+                _drop_reader(key)
+
+
+def _effective_precision(module) -> Optional[str]:
+    """
+    `"int8"` if any layer of `module` was dynamically quantized, else
+    `"fp32"` (EasyOCR silently keeps fp32 when quantization fails).
+    """
+    if module is None:
+        return None
+    quantized = any(type(m).__module__.startswith("torch.ao.nn.quantized")
+                    or type(m).__module__.startswith("torch.nn.quantized")
+                    for m in module.modules())
+    return "int8" if quantized else "fp32"
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance (insertions, deletions, substitutions)."""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def _synthetic_line(text: str) -> np.ndarray:
+    """`text` in black on white, roughly the size of a scanned line."""
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:  # Pillow < 10.1: fixed-size bitmap font
+        font = ImageFont.load_default()
+    left, top, right, bottom = font.getbbox(text)
+    img = Image.new("L", (right - left + 32, bottom - top + 24), 255)
+    ImageDraw.Draw(img).text((16 - left, 12 - top), text, fill=0, font=font)
+    return np.asarray(img)
+
+
+def benchmark_precision(langs: list[str] | None = None,
+                        samples: Optional[list[tuple[np.ndarray, str]]] = None,
+                        repeat: int = 3) -> dict:
+    """
+    Compare int8 and fp32 recognition on the same line images.
+
+    Two recognizer-only readers are built (not cached); each reads every
+    sample `repeat` times after one warm-up call.
+
+    Args:
+        langs:   Reader languages (default `DEFAULT_LANGS`).
+        samples: `(grayscale line image, ground truth)` pairs
+                 (default: `BENCH_LINES` rendered by `_synthetic_line`).
+
+    Returns:
+        `{"fp32": {...}, "int8": {...}}` — mean `latency_ms` per line,
+        character error rate `cer` against the ground truth, recognizer
+        `bytes` and the `effective` precision.
+    """
+    import easyocr
+    langs = langs or DEFAULT_LANGS
+    samples = samples or [(_synthetic_line(t), t) for t in BENCH_LINES]
+    report = {}
+    for precision in ("fp32", "int8"):
+        reader = easyocr.Reader(langs, gpu=False, detector=False, verbose=False,
+                                quantize=precision == "int8")
+        reader.recognize(samples[0][0], detail=0)  # first-call allocations
+        errors = chars = 0
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for img, truth in samples:
+                text = " ".join(reader.recognize(img, detail=0)).strip()
+                errors += _edit_distance(text, truth)
+                chars += len(truth)
+        elapsed = time.perf_counter() - t0
+        report[precision] = {
+            "latency_ms": elapsed * 1000 / (repeat * len(samples)),
+            "cer":        errors / max(chars, 1),
+            "bytes":      _module_bytes(reader.recognizer),
+            "effective":  _effective_precision(reader.recognizer),
+        }
+    return report
+
+
+# ──────────────────────────────────────────────────────────────
+# Warm-up (build readers before the first OCR click)
+# ──────────────────────────────────────────────────────────────
+
+_reader_state: dict = {}  # langs key -> "warming" | "ready" | "failed"
+
+
+def _dummy_image() -> np.ndarray:
+    """Tiny grayscale image with a word on it, so detection and recognition both run."""
+    img = Image.new("L", (160, 48), 255)
+    ImageDraw.Draw(img).text((8, 16), "Warm up 123", fill=0)
+    return np.asarray(img)
+
+
+def warm_up(langs: list[str] | None = None) -> bool:
+    """
+    Build the reader for `langs` and run one dummy inference (blocking), so
+    model loading and the first-call allocations happen before a user waits.
+
+    Returns:
+        True if the reader is ready, False if loading failed (logged).
+    """
+    langs = langs or DEFAULT_LANGS
     key = tuple(sorted(langs))
-    if key not in _reader_cache:
-        import easyocr
-        logger.info("Initializing EasyOCR reader for languages: %s", langs)
-        _reader_cache[key] = easyocr.Reader(langs, gpu=False)  # CPU for portability
-    return _reader_cache[key]
+    _reader_state[key] = "warming"
+    t0 = time.time()
+    try:
+        reader = _get_reader(langs)
+        with _reader_lock(langs):
+            reader.readtext(_dummy_image(), detail=1, paragraph=False)
+    except Exception as exc:
+        _reader_state[key] = "failed"
+        logger.warning("EasyOCR warm-up failed for %s: %s", langs, exc)
+        return False
+    _reader_state[key] = "ready"
+    logger.info("EasyOCR reader %s warmed up in %.1fs", langs, time.time() - t0)
+    return True
+
+
+def warm_up_async(langs: list[str] | None = None) -> threading.Thread:
+    """Run `warm_up` on a daemon thread and return it."""
+    key = tuple(sorted(langs or DEFAULT_LANGS))
+    _reader_state[key] = "warming"  # visible before the thread starts
+    thread = threading.Thread(target=warm_up, args=(langs,), name="ocr-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def reader_status(langs: list[str] | None = None) -> str:
+    """`"cold"` (not built), `"warming"`, `"ready"` or `"failed"` for `langs`."""
+    key = tuple(sorted(langs or DEFAULT_LANGS))
+    state = _reader_state.get(key)
+    if state is None:
+        return "ready" if key in _reader_cache else "cold"
+    return state
 
 
 # ──────────────────────────────────────────────────────────────
 # Image pre-processing helpers (improve OCR accuracy)
 # ──────────────────────────────────────────────────────────────
 
-MAX_DIMENSION = 4000  # px — resize extremely large images to save memory/time
+MAX_DIMENSION = 4000  # px — larger images are tiled (TILED) or else downscaled
+# Decode budget per image, checked against the header before any pixel buffer
+# exists: larger JPEGs are decoded at 1/2, 1/4 or 1/8 scale, others are rejected
+MAX_PIXELS    = int(os.environ.get("OCR_MAX_PIXELS", 40_000_000))
+
+
+# "opencv": fused NumPy/OpenCV path (`_preprocess_array`); "pil": `_preprocess_image`
+PREPROCESS_BACKEND = "opencv" if cv2 is not None else "pil"
+
+# PIL's ImageFilter.SHARPEN kernel, so both backends sharpen identically
+_SHARPEN_KERNEL = np.array([[-2, -2, -2], [-2, 32, -2], [-2, -2, -2]], np.float32) / 16
+
+_DIRECT_TO_L = {"1", "RGB", "RGBA", "P", "LA", "CMYK", "YCbCr"}
+
+# EXIF orientation tag → the NumPy view that undoes it (no pixel copy)
+_ORIENT = {
+    2: np.fliplr,
+    3: lambda a: np.rot90(a, 2),
+    4: np.flipud,
+    5: np.transpose,
+    6: lambda a: np.rot90(a, -1),
+    7: lambda a: np.rot90(a, 2).T,
+    8: lambda a: np.rot90(a, 1),
+}
 
 
-def _preprocess_image(img: Image.Image) -> Image.Image:
+def _lap(timings: Optional[dict], stage: str, t0: float) -> float:
+    """Record the time since `t0` as `stage` (ms) and return the new start time."""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (now - t0) * 1000
+    return now
+
+
+def _preprocess_image(img: Image.Image, timings: Optional[dict] = None) -> Image.Image:
     """
     Apply lightweight pre-processing to improve OCR results:
     1. Convert to RGB (handles RGBA / palette images).
@@ -51,29 +551,607 @@ def _preprocess_image(img: Image.Image) -> Image.Image:
     3. Resize if very large.
     4. Convert to grayscale.
     5. Light sharpening.
+
+    Per-stage times (ms) are added to `timings` when given.
     """
+    t = time.perf_counter()
+    img.load()
+    t = _lap(timings, "decode", t)
+
     # 1. Ensure RGB
     if img.mode not in ("RGB", "L"):
         img = img.convert("RGB")
 
     # 2. Auto-orient (phone photos may be rotated)
     img = ImageOps.exif_transpose(img)
+    t = _lap(timings, "orient", t)
 
     # 3. Resize if too large
     w, h = img.size
     if max(w, h) > MAX_DIMENSION:
         ratio = MAX_DIMENSION / max(w, h)
         img = img.resize((int(w * ratio), int(h * ratio)), Image.LANCZOS)
+    t = _lap(timings, "resize", t)
 
     # 4. Grayscale
     img = img.convert("L")
+    t = _lap(timings, "grayscale", t)
 
     # 5. Sharpen
     img = img.filter(ImageFilter.SHARPEN)
+    _lap(timings, "sharpen", t)
 
     return img
 
 
+def _gray_array(img: Image.Image, timings: Optional[dict] = None) -> np.ndarray:
+    """
+    Decode straight to an upright 8-bit grayscale array: JPEGs are decoded
+    to luma only, other modes are converted once, and the EXIF orientation
+    is applied as a view rather than a copy.
+    """
+    t = time.perf_counter()
+    orientation = img.getexif().get(0x0112, 1)
+    if img.format == "JPEG" and img.mode != "L":
+        img.draft("L", img.size)  # decoder emits luma only, no RGB buffer
+    img.load()
+    t = _lap(timings, "decode", t)
+    if img.mode != "L":
+        # Common modes convert to luma in one pass; exotic ones go via RGB like the PIL path
+        img = img.convert("L") if img.mode in _DIRECT_TO_L else img.convert("RGB").convert("L")
+    arr = np.asarray(img)
+    t = _lap(timings, "grayscale", t)
+    flip = _ORIENT.get(orientation)
+    if flip is not None:
+        arr = flip(arr)
+    _lap(timings, "orient", t)
+    return arr
+
+
+def _sharpen(arr: np.ndarray) -> np.ndarray:
+    """PIL's SHARPEN on an 8-bit array (new, C-contiguous output)."""
+    if cv2 is not None:
+        return cv2.filter2D(np.ascontiguousarray(arr), -1, _SHARPEN_KERNEL,
+                            borderType=cv2.BORDER_REPLICATE)
+    return np.asarray(Image.fromarray(np.ascontiguousarray(arr)).filter(ImageFilter.SHARPEN))
+
+
+def _preprocess_array(img: Image.Image, timings: Optional[dict] = None) -> np.ndarray:
+    """
+    Fused NumPy/OpenCV counterpart of `_preprocess_image`, returning the array
+    EasyOCR reads. Grayscale comes first, so resize and sharpen touch one
+    byte per pixel instead of three, and each stage allocates at most one
+    output buffer.
+
+    Per-stage times (ms) are added to `timings` when given.
+    """
+    arr = _gray_array(img, timings)
+    t = time.perf_counter()
+    h, w = arr.shape
+    if max(w, h) > MAX_DIMENSION:
+        ratio = MAX_DIMENSION / max(w, h)
+        arr = cv2.resize(np.ascontiguousarray(arr), (int(w * ratio), int(h * ratio)),
+                         interpolation=cv2.INTER_AREA)
+    t = _lap(timings, "resize", t)
+    arr = _sharpen(arr)
+    _lap(timings, "sharpen", t)
+    return arr
+
+
+def preprocess(img: Image.Image, timings: Optional[dict] = None) -> np.ndarray:
+    """Pre-process `img` with `PREPROCESS_BACKEND` into the array handed to EasyOCR."""
+    if PREPROCESS_BACKEND == "opencv" and cv2 is not None:
+        return _preprocess_array(img, timings)
+    return np.asarray(_preprocess_image(img, timings))
+
+
+def benchmark_preprocess(image: bytes, repeat: int = 3) -> dict:
+    """
+    Time both preprocessing backends on the same encoded image.
+
+    Returns:
+        `{"pil": {...}, "opencv": {...}}` — mean per-stage milliseconds plus
+        `total`, over `repeat` runs (`opencv` is omitted without OpenCV).
+    """
+    report = {}
+    backends = {"pil": lambda im, tm: np.array(_preprocess_image(im, tm))}
+    if cv2 is not None:
+        backends["opencv"] = _preprocess_array
+    for name, run in backends.items():
+        timings: dict = {}
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            run(Image.open(io.BytesIO(image)), timings)
+            _lap(timings, "total", t0)
+        report[name] = {k: v / repeat for k, v in timings.items()}
+    return report
+
+
+# ──────────────────────────────────────────────────────────────
+# Text-presence pre-check (skip EasyOCR on blank images)
+# ──────────────────────────────────────────────────────────────
+
+TEXT_CHECK     = True  # skip detection + recognition on images without text-like edges
+# Minimum share of edge pixels in the busiest block; glyph strokes give a few percent and up
+TEXT_THRESHOLD = float(os.environ.get("OCR_TEXT_THRESHOLD", 0.02))
+EDGE_CONTRAST  = 40    # grey levels between neighbouring pixels that count as an edge
+TEXT_BLOCK     = 32    # px — side of the square blocks edge density is measured over
+
+_text_check_stats = {"checked": 0, "skipped": 0}
+_text_check_lock = threading.Lock()
+
+
+def text_score(arr: np.ndarray) -> float:
+    """
+    Share of strong-edge pixels in the busiest `TEXT_BLOCK`² block of a
+    grayscale image: 0 for blank pages, flat backgrounds and smooth
+    gradients. Pure NumPy on uint8 (max − min never wraps).
+    """
+    counts, b = _edge_blocks(arr)
+    return float(counts.max()) / (b * b) if counts.size else 0.0
+
+
+def _edge_blocks(arr: np.ndarray) -> tuple[np.ndarray, int]:
+    """Strong-edge pixel counts per block (rows × cols) and the block side used."""
+    a = arr[:-1, :-1]
+    right, below = arr[:-1, 1:], arr[1:, :-1]
+    edges = (np.maximum(a, right) - np.minimum(a, right)) > EDGE_CONTRAST
+    edges |= (np.maximum(a, below) - np.minimum(a, below)) > EDGE_CONTRAST
+    h, w = edges.shape
+    b = min(TEXT_BLOCK, h, w)
+    if b < 1:
+        return np.zeros((0, 0), np.int64), 1
+    rows, cols = h // b, w // b
+    return edges[:rows * b, :cols * b].reshape(rows, b, cols, b).sum(axis=(1, 3)), b
+
+
+def _looks_blank(arr: np.ndarray) -> bool:
+    """True if `arr` clearly holds no text (counted in `text_check_stats`)."""
+    if not TEXT_CHECK:
+        return False
+    score = text_score(arr)
+    blank = score < TEXT_THRESHOLD
+    with _text_check_lock:
+        _text_check_stats["checked"] += 1
+        _text_check_stats["skipped"] += blank
+    if blank:
+        logger.info("No text-like edges (score %.4f); skipping OCR.", score)
+    return blank
+
+
+def text_check_stats() -> dict:
+    """`{"checked": n, "skipped": n}` — images pre-checked / skipped in this process."""
+    with _text_check_lock:
+        return dict(_text_check_stats)
+
+
+# ──────────────────────────────────────────────────────────────
+# Script-aware language selection (langs=AUTO_LANGS)
+# ──────────────────────────────────────────────────────────────
+
+AUTO_LANGS = ["auto"]  # pass as `langs` to pick the languages per image
+
+# Script → the smallest reader that reads it (EasyOCR pairs every non-Latin
+# model with English; English and French share one Latin model)
+SCRIPT_LANGS = {
+    "latin":      DEFAULT_LANGS,
+    "arabic":     ["ar", "en"],
+    "cyrillic":   ["ru", "en"],
+    "devanagari": ["hi", "en"],
+    "chinese":    ["ch_sim", "en"],
+    "japanese":   ["ja", "en"],
+    "korean":     ["ko", "en"],
+}
+# Candidate scripts when the Latin probe is unsure (see `probe_languages`)
+AUTO_SCRIPTS     = os.environ.get("OCR_AUTO_SCRIPTS",
+                                  "arabic,chinese,japanese,korean,cyrillic,devanagari").split(",")
+PROBE_SIZE       = 640  # px — side of the crop around the densest text that the probe reads
+PROBE_BOXES      = 8    # largest text boxes of the crop that each candidate recognizer reads
+PROBE_CONFIDENCE = 0.5  # probe score at which a script is accepted without trying the rest
+
+# Unicode ranges counted as letters of each script
+_SCRIPT_RANGES = {
+    "latin":      [(0x41, 0x5A), (0x61, 0x7A), (0xC0, 0x24F)],
+    "arabic":     [(0x600, 0x6FF), (0x750, 0x77F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+    "cyrillic":   [(0x400, 0x52F)],
+    "devanagari": [(0x900, 0x97F)],
+    "chinese":    [(0x3400, 0x4DBF), (0x4E00, 0x9FFF)],
+    "japanese":   [(0x3040, 0x30FF), (0x3400, 0x4DBF), (0x4E00, 0x9FFF)],  # kana + kanji
+    "korean":     [(0x1100, 0x11FF), (0x3130, 0x318F), (0xAC00, 0xD7AF)],
+}
+
+
+def script_shares(text: str) -> dict:
+    """Share of `text`'s letters that belong to each script in `_SCRIPT_RANGES`."""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+    masks = {}
+    for script, ranges in _SCRIPT_RANGES.items():
+        mask = np.zeros(codes.shape, bool)
+        for lo, hi in ranges:
+            mask |= (codes >= lo) & (codes <= hi)
+        masks[script] = mask
+    letters = int(np.logical_or.reduce(list(masks.values())).sum()) if len(codes) else 0
+    if not letters:
+        return {}
+    return {script: int(mask.sum()) / letters for script, mask in masks.items()}
+
+
+def _probe_crop(arr: np.ndarray) -> np.ndarray:
+    """A `PROBE_SIZE` square view of `arr` centred on its densest edge block."""
+    counts, b = _edge_blocks(arr)
+    if not counts.size:
+        return arr
+    row, col = np.unravel_index(int(np.argmax(counts)), counts.shape)
+    h, w = arr.shape[:2]
+    top = min(max(row * b + b // 2 - PROBE_SIZE // 2, 0), max(h - PROBE_SIZE, 0))
+    left = min(max(col * b + b // 2 - PROBE_SIZE // 2, 0), max(w - PROBE_SIZE, 0))
+    return arr[top:top + PROBE_SIZE, left:left + PROBE_SIZE]
+
+
+def _probe(crop: np.ndarray, langs: list[str],
+           boxes: Optional[list] = None) -> tuple[float, str, list]:
+    """
+    Read `crop` with the reader for `langs`; given `boxes` (`[x0, x1, y0, y1]`),
+    only those are recognized, without running the detector again.
+
+    Returns:
+        `(confidence, text, boxes)` — character-weighted confidence, the text
+        read and the `PROBE_BOXES` largest boxes it was read from.
+    """
+    reader = _get_reader(langs)
+    with _reader_lock(langs):
+        if boxes is None:
+            results = reader.readtext(crop, detail=1, paragraph=False)
+        else:
+            results = reader.recognize(crop, horizontal_list=boxes, free_list=[],
+                                       detail=1, paragraph=False)
+    blocks = _blocks(results)
+    chars = sum(len(b["text"]) for b in blocks)
+    if not chars:
+        return 0.0, "", []
+    confidence = sum(b["confidence"] * len(b["text"]) for b in blocks) / chars
+    largest = sorted(blocks, key=lambda b: -(b["bbox"][2] - b["bbox"][0])
+                                           * (b["bbox"][3] - b["bbox"][1]))[:PROBE_BOXES]
+    found = [[int(x0), int(x1), int(y0), int(y1)] for x0, y0, x1, y1 in
+             (b["bbox"] for b in largest)]
+    return confidence, " ".join(b["text"] for b in blocks), found
+
+
+def _candidate_scripts() -> list[str]:
+    """Enabled non-Latin scripts, those with a cached reader first."""
+    scripts = [s.strip() for s in AUTO_SCRIPTS]
+    scripts = [s for s in scripts if s in SCRIPT_LANGS and s != "latin"]
+    with _reader_lru_lock:
+        cached = {s for s in scripts if tuple(sorted(SCRIPT_LANGS[s])) in _reader_cache}
+    return sorted(scripts, key=lambda s: s not in cached)
+
+
+def probe_languages(arr: np.ndarray) -> tuple[list[str], float]:
+    """
+    Pick the reader languages for a pre-processed page.
+
+    The default (Latin) reader reads a crop around the densest text first;
+    if it is confident, that is the answer. Otherwise every enabled
+    candidate script (`AUTO_SCRIPTS`) recognizes the text boxes the Latin
+    pass found — no further detection — and is scored by its confidence
+    times the share of its output in its own script. Scripts whose reader
+    is already cached go first, and the first one scoring
+    `PROBE_CONFIDENCE` is taken without trying the rest, so the pages of a
+    document after the first one cost a single extra recognition pass.
+
+    Returns:
+        `(langs, score)` — the best-scoring languages (`DEFAULT_LANGS` unless
+        a candidate beat the Latin probe) and their probe score.
+    """
+    crop = _probe_crop(arr)
+    try:
+        best_score, _, boxes = _probe(crop, DEFAULT_LANGS)
+    except Exception as exc:
+        raise OCRError(f"EasyOCR failed: {exc}") from exc
+    best, best_script = list(DEFAULT_LANGS), "latin"
+    for script in _candidate_scripts() if boxes and best_score < PROBE_CONFIDENCE else []:
+        langs = SCRIPT_LANGS[script]
+        try:
+            confidence, text, _ = _probe(crop, langs, boxes)
+        except Exception as exc:
+            logger.warning("Script probe %s failed: %s", script, exc)
+            continue
+        score = confidence * script_shares(text).get(script, 0.0)
+        if score > best_score:
+            best, best_score, best_script = list(langs), score, script
+        if best_score >= PROBE_CONFIDENCE:
+            break
+    logger.info("Detected %s script (score %.2f): OCR with %s", best_script, best_score, best)
+    return best, best_score
+
+
+def detect_languages(arr: np.ndarray) -> list[str]:
+    """The languages `probe_languages` picks for a pre-processed page."""
+    return probe_languages(arr)[0]
+
+
+
+# ──────────────────────────────────────────────────────────────
+# Tiled OCR (large images at full resolution)
+# ──────────────────────────────────────────────────────────────
+
+TILED        = True  # OCR images above MAX_DIMENSION in tiles instead of downscaling
+TILE_SIZE    = 2048  # px — below EasyOCR's detector canvas (2560): no internal downscale
+TILE_OVERLAP = 256   # px — must exceed the widest word / tallest line on the page
+TILE_WORKERS = 4     # tiles prepared and recognized concurrently
+EDGE_MARGIN  = 2     # px — boxes this close to an inner tile edge are truncated
+
+
+def tile_grid(width: int, height: int, tile: int = TILE_SIZE,
+              overlap: int = TILE_OVERLAP) -> list[tuple[int, int, int, int]]:
+    """Overlapping `(left, top, right, bottom)` tiles covering a `width`×`height` image."""
+    def starts(n: int) -> list[int]:
+        if n <= tile:
+            return [0]
+        return list(range(0, n - tile, tile - overlap)) + [n - tile]
+
+    return [(x, y, min(x + tile, width), min(y + tile, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def _owner(box: tuple[float, float, float, float], tiles: list, size: tuple[int, int]) -> int:
+    """
+    Index of the tile that reports a detection at `box` (global coordinates):
+    among the tiles that contain it whole (not cut by an inner edge), the one
+    whose centre is closest. Every tile computes the same answer, which is
+    what removes the duplicates in the overlaps.
+    """
+    x0, y0, x1, y1 = box
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    best, best_dist = -1, float("inf")
+    for i, (l, t, r, b) in enumerate(tiles):
+        inside = (
+            (x0 >= l + EDGE_MARGIN or l == 0) and (y0 >= t + EDGE_MARGIN or t == 0)
+            and (x1 <= r - EDGE_MARGIN or r == size[0])
+            and (y1 <= b - EDGE_MARGIN or b == size[1])
+        )
+        if inside:
+            dist = max(abs(cx - (l + r) / 2), abs(cy - (t + b) / 2))
+            if dist < best_dist:
+                best, best_dist = i, dist
+    return best
+
+
+def _cut_edges(box: list[float], tile: tuple, size: tuple[int, int]) -> tuple[bool, bool, bool]:
+    """
+    `(left, right, vertical)`: whether an inner tile edge may cut the box.
+    Horizontally, a box ending within one line height of an inner edge
+    counts as cut, since the seam may fall in the gap before the next word.
+    """
+    l, t, r, b = tile
+    x0, y0, x1, y1 = box
+    reach = max(EDGE_MARGIN, y1 - y0)
+    return (
+        l > 0 and x0 < l + reach,
+        r < size[0] and x1 > r - reach,
+        (t > 0 and y0 < t + EDGE_MARGIN) or (b < size[1] and y1 > b - EDGE_MARGIN),
+    )
+
+
+def _same_line(a: list[float], b: list[float]) -> bool:
+    """Boxes that overlap horizontally and share at least half their height."""
+    if min(a[2], b[2]) <= max(a[0], b[0]):
+        return False
+    overlap = min(a[3], b[3]) - max(a[1], b[1])
+    return overlap >= 0.5 * min(a[3] - a[1], b[3] - b[1])
+
+
+def _tokens(text: str, sep: str) -> list[str]:
+    return text.split() if sep else list(text)
+
+
+def _centres(tokens: list[str], sep: str, x0: float, x1: float) -> list[float]:
+    """Estimated x centre of each token, spreading the characters over `x0..x1`."""
+    total = max(len(sep.join(tokens)), 1)
+    centres, pos = [], 0
+    for token in tokens:
+        centres.append(x0 + (x1 - x0) * (pos + len(token) / 2) / total)
+        pos += len(token) + len(sep)
+    return centres
+
+
+def _join_fragments(left: dict, right: dict) -> dict:
+    """
+    Join the text of one line read by two horizontally adjacent tiles.
+
+    Both tiles read the overlap, so the right text repeats the end of the
+    left one. The longest repeat found at the same estimated position in
+    both fragments is kept once; the partial token at a cut edge may be
+    left out of it. Without a repeat, tokens are split at the middle of the
+    overlap by position.
+    """
+    joined = left["text"] + right["text"]
+    # CJK lines have no spaces: work on characters instead of words
+    sep = "" if " " not in joined and any(ord(c) >= 0x3000 for c in joined) else " "
+    a, b = _tokens(left["text"], sep), _tokens(right["text"], sep)
+    lb, rb = left["bbox"], right["bbox"]
+    ca, cb = _centres(a, sep, lb[0], lb[2]), _centres(b, sep, rb[0], rb[2])
+    overlap = max(min(lb[2], rb[2]) - max(lb[0], rb[0]), 0)
+    tolerance = max(3 * max(lb[3] - lb[1], rb[3] - rb[1]), 0.1 * overlap)
+    la, lbw = [t.lower() for t in a], [t.lower() for t in b]
+    tokens, best = None, 0
+    ends = (len(a), len(a) - 1) if left["cut_right"] else (len(a),)
+    starts = (0, 1) if right["cut_left"] else (0,)
+    for end in ends:
+        for j in starts:
+            for i in range(max(end - (len(b) - j), 0), end):
+                k = end - i
+                if (k > best and la[i:end] == lbw[j:j + k]
+                        and abs(ca[i] - cb[j]) <= tolerance):
+                    tokens, best = a[:end] + b[j + k:], k
+                    break  # smallest i is the longest repeat for this end / start
+    if tokens is None:
+        seam = (max(lb[0], rb[0]) + min(lb[2], rb[2])) / 2
+        tokens = ([t for t, c in zip(a, ca) if c < seam]
+                  + [t for t, c in zip(b, cb) if c >= seam])
+    weight = left["weight"] + right["weight"]
+    return {
+        "text": sep.join(tokens),
+        "bbox": [min(lb[0], rb[0]), min(lb[1], rb[1]), max(lb[2], rb[2]), max(lb[3], rb[3])],
+        "confidence": (left["confidence"] * left["weight"]
+                       + right["confidence"] * right["weight"]) / max(weight, 1),
+        "weight": weight,
+        "cut_left": left["cut_left"],
+        "cut_right": right["cut_right"],
+    }
+
+
+def _stitch_line(members: list[dict], tiles: list) -> dict:
+    """Merge the pieces of one line seen by several tiles into a single block."""
+    # A line inside a horizontal overlap is seen by two tile rows; keep the
+    # row whose centre is nearest.
+    cy = sum((m["bbox"][1] + m["bbox"][3]) / 2 for m in members) / len(members)
+    row = min({(tiles[m["tile"]][1], tiles[m["tile"]][3]) for m in members},
+              key=lambda tb: abs((tb[0] + tb[1]) / 2 - cy))
+    per_tile: dict = {}
+    for m in sorted(members, key=lambda m: m["bbox"][0]):
+        if (tiles[m["tile"]][1], tiles[m["tile"]][3]) == row:
+            per_tile.setdefault(m["tile"], []).append(m)
+    fragments = []
+    for i in sorted(per_tile, key=lambda i: tiles[i][0]):
+        parts = per_tile[i]
+        weight = sum(len(p["text"]) for p in parts)
+        fragments.append({
+            "text": " ".join(p["text"] for p in parts),
+            "bbox": [min(p["bbox"][0] for p in parts), min(p["bbox"][1] for p in parts),
+                     max(p["bbox"][2] for p in parts), max(p["bbox"][3] for p in parts)],
+            "confidence": sum(p["confidence"] * len(p["text"]) for p in parts) / max(weight, 1),
+            "weight": weight,
+            "cut_left": parts[0]["cut_left"],
+            "cut_right": parts[-1]["cut_right"],
+        })
+    line = fragments[0]
+    for fragment in fragments[1:]:
+        line = _join_fragments(line, fragment)
+    return {"text": line["text"], "bbox": line["bbox"], "confidence": line["confidence"]}
+
+
+def _merge_tiles(parts: list[list[dict]], tiles: list, size: tuple[int, int]) -> list[dict]:
+    """
+    Combine per-tile blocks into page blocks.
+
+    Blocks cut by a horizontal seam are dropped (the other tile row sees
+    the line whole). A line cut by a vertical seam is stitched from the
+    fragments of every tile that read part of it, together with the whole
+    blocks those tiles found on it in the overlap. Remaining whole blocks
+    are kept by exactly one tile (see `_owner`).
+    """
+    blocks = []
+    for i, tile_blocks in enumerate(parts):
+        for block in tile_blocks:
+            cut_left, cut_right, vertical = _cut_edges(block["bbox"], tiles[i], size)
+            if not vertical:
+                blocks.append({**block, "tile": i, "cut_left": cut_left, "cut_right": cut_right})
+    parent = list(range(len(blocks)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    cut = [j for j, b in enumerate(blocks) if b["cut_left"] or b["cut_right"]]
+    for j in cut:
+        for k, other in enumerate(blocks):
+            if other["tile"] != blocks[j]["tile"] and _same_line(blocks[j]["bbox"], other["bbox"]):
+                parent[find(j)] = find(k)
+    groups: dict = {}
+    for j in range(len(blocks)):
+        groups.setdefault(find(j), []).append(blocks[j])
+
+    merged = []
+    for members in groups.values():
+        if len(members) > 1 or members[0]["cut_left"] or members[0]["cut_right"]:
+            merged.append(_stitch_line(members, tiles))
+        elif _owner(members[0]["bbox"], tiles, size) == members[0]["tile"]:
+            block = members[0]
+            merged.append({"text": block["text"], "bbox": block["bbox"],
+                           "confidence": block["confidence"]})
+    return merged
+
+
+def _blocks(results, left: int = 0, top: int = 0) -> list[dict]:
+    """`readtext(detail=1)` output as `{"text", "bbox", "confidence"}` blocks in page coordinates."""
+    blocks = []
+    for points, text, conf in results:
+        if not text.strip():
+            continue
+        xs, ys = [float(p[0]) for p in points], [float(p[1]) for p in points]
+        blocks.append({"text": text.strip(), "confidence": float(conf),
+                       "bbox": [left + min(xs), top + min(ys), left + max(xs), top + max(ys)]})
+    return blocks
+
+
+def _reading_order(blocks: list[dict]) -> list[dict]:
+    """
+    Sort blocks into lines (top to bottom, left to right), setting each
+    block's `line` and `order`.
+    """
+    lines: list[dict] = []
+    for block in sorted(blocks, key=lambda b: (b["bbox"][1] + b["bbox"][3]) / 2):
+        box = block["bbox"]
+        cy, h = (box[1] + box[3]) / 2, box[3] - box[1]
+        line = lines[-1] if lines else None
+        if line is not None and abs(cy - line["cy"]) <= 0.5 * max(h, line["h"]):
+            line["blocks"].append(block)
+            n = len(line["blocks"])
+            line["cy"] += (cy - line["cy"]) / n
+            line["h"] = max(line["h"], h)
+        else:
+            lines.append({"cy": cy, "h": h, "blocks": [block]})
+    ordered = []
+    for n, line in enumerate(lines):
+        for block in sorted(line["blocks"], key=lambda b: b["bbox"][0]):
+            block["line"], block["order"] = n, len(ordered)
+            ordered.append(block)
+    return ordered
+
+
+def _lines_text(blocks: list[dict]) -> str:
+    """Join ordered blocks: spaces within a line, newlines between lines."""
+    lines: dict = {}
+    for block in blocks:
+        lines.setdefault(block["line"], []).append(block["text"])
+    return "\n".join(" ".join(words) for words in lines.values())
+
+
+def _ocr_tiled(page: np.ndarray, langs: list[str]) -> list[dict]:
+    """
+    OCR a large grayscale page in overlapping tiles at full resolution.
+
+    Each tile is a view of the page, sharpened and recognized on its own, so
+    EasyOCR's working buffers scale with `TILE_SIZE`, not with the page.
+    Lines cut by a tile edge are stitched back together and detections
+    repeated in an overlap are kept once (see `_merge_tiles`).
+    """
+    size = (page.shape[1], page.shape[0])
+    tiles = tile_grid(*size)
+    reader = _get_reader(langs)
+
+    def read(i: int) -> list[dict]:
+        left, top, right, bottom = tiles[i]
+        tile = _sharpen(page[top:bottom, left:right])
+        if TEXT_CHECK and text_score(tile) < TEXT_THRESHOLD:
+            return []  # blank margin / photo area: no detector pass
+        with _reader_lock(langs):
+            results = reader.readtext(tile, detail=1, paragraph=False)
+        return _blocks(results, left, top)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(min(TILE_WORKERS, len(tiles)), 1)) as pool:
+            parts = list(pool.map(read, range(len(tiles))))
+    except Exception as exc:
+        raise OCRError(f"EasyOCR failed: {exc}") from exc
+    detections = _merge_tiles(parts, tiles, size)
+    logger.info("Tiled OCR: %d tiles, %d text boxes.", len(tiles), len(detections))
+    return detections
+
+
 # ──────────────────────────────────────────────────────────────
 # Main extract function
 # ──────────────────────────────────────────────────────────────
@@ -83,60 +1161,321 @@ class OCRError(Exception):
     pass
 
 
-def extract_text_from_image(
-    source: Union[bytes, io.BytesIO, Image.Image, str],
-    langs: list[str] | None = None,
-) -> str:
-    """
-    Extract text from an image using EasyOCR.
+class ImageTooLargeError(OCRError):
+    """Raised when an image exceeds the `MAX_PIXELS` decode budget."""
+    pass
 
-    Args:
-        source: Image input — raw bytes, BytesIO, PIL Image, or file path.
-        langs:  List of EasyOCR language codes (default: ['en', 'fr']).
-                See https://www.jaided.ai/easyocr/ for all supported languages.
 
-    Returns:
-        Extracted text (may be empty if no text is detected).
+USE_CACHE     = True                   # serve repeated images from the OCR cache
+# Blocks EasyOCR is less sure of than this are dropped before they reach a prompt
+MIN_CONFIDENCE = float(os.environ.get("OCR_MIN_CONFIDENCE", 0.3))
+BATCH_WORKERS = 4                      # images decoded / pre-processed concurrently
+PAGE_MARKER   = "--- Page {n} ---"
 
-    Raises:
-        OCRError: If the image cannot be loaded or OCR fails.
+
+def _load_image(source: Union[bytes, io.BytesIO, Image.Image, str]) -> Image.Image:
     """
-    if langs is None:
-        langs = ["en", "fr"]
+    Open `source` as a PIL image, raising `OCRError` on failure.
 
-    # ── Load the image ──
+    Only the header is read: the decode budget is enforced (and JPEGs are set
+    to decode at reduced scale) before any pixel data is touched.
+    """
+    if isinstance(source, Image.Image):
+        return _limit_decode(source, encoded=False)
+    if not isinstance(source, (bytes, bytearray, io.BytesIO, str)):
+        raise OCRError(f"Unsupported source type: {type(source)}")
     try:
-        if isinstance(source, Image.Image):
-            img = source
-        elif isinstance(source, (bytes, bytearray)):
+        if isinstance(source, (bytes, bytearray)):
             img = Image.open(io.BytesIO(source))
         elif isinstance(source, io.BytesIO):
             source.seek(0)
             img = Image.open(source)
-        elif isinstance(source, str):
-            img = Image.open(source)
         else:
-            raise OCRError(f"Unsupported source type: {type(source)}")
-    except OCRError:
-        raise
+            img = Image.open(source)
+    except Image.DecompressionBombError as exc:
+        raise ImageTooLargeError(f"Image too large: {exc}") from exc
     except Exception as exc:
         raise OCRError(f"Could not open image: {exc}") from exc
+    return _limit_decode(img, encoded=True)
+
+
+def _draft_scale(w: int, h: int) -> int:
+    """
+    JPEG DCT scale to decode a `w`×`h` image at: the smallest of 1, 2, 4, 8
+    that fits `MAX_PIXELS`. Without tiling, pages are downscaled to
+    `MAX_DIMENSION` anyway, so coarser scales are used while they stay above it.
+    """
+    for s in (1, 2, 4):
+        fits = -(-w // s) * -(-h // s) <= MAX_PIXELS
+        coarser = not TILED and max(w, h) // (2 * s) >= MAX_DIMENSION
+        if fits and not coarser:
+            return s
+    return 8
+
+
+def _limit_decode(img: Image.Image, encoded: bool) -> Image.Image:
+    """Check `img`'s header size against `MAX_PIXELS` and set up a JPEG draft."""
+    w, h = img.size
+    if w <= 0 or h <= 0:
+        raise OCRError(f"Invalid image dimensions: {w}×{h}")
+    if encoded and img.format == "JPEG":
+        scale = _draft_scale(w, h)
+        # Luma only, at 1/scale: both pipelines work in grayscale
+        img.draft("L", (max(w // scale, 1), max(h // scale, 1)))
+        if img.size != (w, h):
+            logger.info("Decoding %d×%d JPEG at %d×%d.", w, h, *img.size)
+    if img.width * img.height > MAX_PIXELS:
+        raise ImageTooLargeError(
+            f"Image too large: {w}×{h} px exceeds the {MAX_PIXELS / 1e6:.0f} MP limit"
+        )
+    return img
 
-    # ── Pre-process ──
-    img = _preprocess_image(img)
 
-    # ── Convert to numpy array for EasyOCR ──
-    img_array = np.array(img)
+def _run_ocr(source, langs: list[str]) -> dict:
+    """
+    Load, pre-process and OCR one image.
+
+    Returns:
+        `{"langs": [...], "blocks": [...]}` — the languages actually used
+        (resolved here for `AUTO_LANGS`) and every detected block, in
+        reading order. `unsure=True` is added when no script probe reached
+        `PROBE_CONFIDENCE`.
+    """
+    img = _load_image(source)
+    timings: dict = {}
+    auto = langs == AUTO_LANGS
+
+    # ── Large pages: tiles at full resolution instead of downscaling ──
+    if TILED and max(img.size) > MAX_DIMENSION:
+        try:
+            page = _gray_array(img, timings)  # 1 byte/px from here on
+        except Exception as exc:
+            raise OCRError(f"Could not decode image: {exc}") from exc
+        if _looks_blank(page):
+            return {"langs": [] if auto else langs, "blocks": []}
+        unsure = False
+        if auto:
+            langs, score = probe_languages(_sharpen(_probe_crop(page)))
+            unsure = score < PROBE_CONFIDENCE
+        return {"langs": langs, "blocks": _reading_order(_ocr_tiled(page, langs)),
+                **({"unsure": True} if unsure else {})}
 
-    # ── Run EasyOCR ──
+    # ── Pre-process into the array EasyOCR reads (no extra copy) ──
+    try:
+        img_array = preprocess(img, timings)
+    except Exception as exc:
+        raise OCRError(f"Could not decode image: {exc}") from exc
+    t = time.perf_counter()
+    blank = _looks_blank(img_array)
+    _lap(timings, "text_check", t)
+    logger.debug("Preprocessing (%s): %s", PREPROCESS_BACKEND,
+                 ", ".join(f"{k} {v:.1f} ms" for k, v in timings.items()))
+    if blank:
+        return {"langs": [] if auto else langs, "blocks": []}
+    unsure = False
+    if auto:
+        langs, score = probe_languages(img_array)
+        unsure = score < PROBE_CONFIDENCE
+
+    # ── Run EasyOCR (boxes + confidences, one block per detected word group) ──
     try:
         reader = _get_reader(langs)
-        results = reader.readtext(img_array, detail=0, paragraph=True)
+        with _reader_lock(langs):
+            results = reader.readtext(img_array, detail=1, paragraph=False)
     except Exception as exc:
         raise OCRError(f"EasyOCR failed: {exc}") from exc
 
-    # ── Join detected text blocks ──
-    text = "\n".join(line.strip() for line in results if line.strip())
+    blocks = _reading_order(_blocks(results))
+    logger.info("OCR detected %d text blocks in image.", len(blocks))
+    return {"langs": langs, "blocks": blocks, **({"unsure": True} if unsure else {})}
+
+
+def filter_blocks(blocks: list[dict], min_confidence: Optional[float] = None) -> dict:
+    """
+    Apply the confidence floor to ordered OCR blocks.
 
+    Returns:
+        `{"text", "blocks", "dropped", "dropped_chars"}` — `text` joins the
+        kept `blocks` line by line; `dropped` holds the blocks below
+        `min_confidence` (default `MIN_CONFIDENCE`).
+    """
+    floor = MIN_CONFIDENCE if min_confidence is None else min_confidence
+    kept = [b for b in blocks if b["confidence"] >= floor]
+    dropped = [b for b in blocks if b["confidence"] < floor]
+    text = _lines_text(kept)
+    if dropped:
+        logger.info("Dropped %d OCR blocks below confidence %.2f.", len(dropped), floor)
     logger.info("OCR extracted %d characters from image.", len(text))
-    return text
+    return {"text": text, "blocks": kept, "dropped": dropped,
+            "dropped_chars": sum(len(b["text"]) for b in dropped)}
+
+
+def preprocess_params() -> dict:
+    """Settings that change the OCR output for a given image (part of the cache key)."""
+    params = {"pipeline": PREPROCESS_BACKEND, "max_dimension": MAX_DIMENSION,
+              "max_pixels": MAX_PIXELS, "output": "blocks+langs"}
+    if TILED:
+        params["tiles"] = [TILE_SIZE, TILE_OVERLAP]
+    if TEXT_CHECK:
+        params["text_check"] = [TEXT_THRESHOLD, EDGE_CONTRAST, TEXT_BLOCK]
+    params["precision"] = [READER_PRECISION,
+                           sorted((list(k), v) for k, v in _precision_overrides.items())]
+    return params
+
+
+def _raw_bytes(source) -> Optional[bytes]:
+    """The encoded image bytes of `source`, or None for decoded PIL images."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()
+    if isinstance(source, str):
+        try:
+            with open(source, "rb") as f:
+                return f.read()
+        except OSError:
+            return None  # let _load_image report it
+    return None
+
+
+def cached_ocr(image: bytes, langs: list[str]) -> Optional[dict]:
+    """The `ocr_image` result for these exact image bytes from the OCR cache, or None."""
+    cache = get_ocr_cache() if USE_CACHE else None
+    if cache is None:
+        return None
+    try:
+        _load_image(image)  # header only: a perceptual lookup must not decode a bomb
+    except OCRError:
+        return None
+    hit = cache.get(image, langs, preprocess_params())
+    return _result(json.loads(hit)) if hit is not None else None
+
+
+def _run_ocr_cached(source, langs: list[str]) -> dict:
+    """
+    `_run_ocr` behind the persistent OCR cache (encoded image sources only).
+    All blocks are cached, so the confidence floor can change without re-running OCR.
+    """
+    raw = _raw_bytes(source)
+    img = _load_image(source if raw is None else raw)  # budget checked before any lookup
+    cache = get_ocr_cache() if USE_CACHE and raw is not None else None
+    if cache is not None:
+        hit = cache.get(raw, langs, preprocess_params())
+        if hit is not None:
+            data = json.loads(hit)
+            logger.info("OCR cache hit (%d blocks).", len(data["blocks"]))
+            return data
+    data = _run_ocr(img, langs)
+    # An unsure auto-detection may have picked the wrong reader: read it again next time
+    if data.pop("unsure", False):
+        logger.info("Script detection unsure — OCR result not cached.")
+    elif cache is not None:
+        cache.put(raw, langs, preprocess_params(), json.dumps(data))
+    return data
+
+
+def _result(data: dict, min_confidence: Optional[float] = None) -> dict:
+    """`filter_blocks` over a `_run_ocr` dict, plus the `langs` it was read with."""
+    return {**filter_blocks(data["blocks"], min_confidence), "langs": data["langs"]}
+
+
+def ocr_image(
+    source: Union[bytes, io.BytesIO, Image.Image, str],
+    langs: list[str] | None = None,
+    min_confidence: Optional[float] = None,
+) -> dict:
+    """
+    Structured OCR of one image.
+
+    Args:
+        source, langs:  As for `extract_text_from_image`.
+        min_confidence: Blocks below this EasyOCR confidence are left out of
+                        the text (default `MIN_CONFIDENCE`).
+
+    Returns:
+        The `filter_blocks` dict: `text`, the kept `blocks` (each with
+        `text`, `bbox` as `[x0, y0, x1, y1]`, `confidence`, `line` and
+        reading `order`), the `dropped` blocks and `dropped_chars`, plus
+        the `langs` the image was read with.
+
+    Raises:
+        OCRError: If the image cannot be loaded or OCR fails.
+    """
+    return _result(_run_ocr_cached(source, langs or DEFAULT_LANGS), min_confidence)
+
+
+def extract_text_from_image(
+    source: Union[bytes, io.BytesIO, Image.Image, str],
+    langs: list[str] | None = None,
+) -> str:
+    """
+    Extract text from an image using EasyOCR.
+
+    Args:
+        source: Image input — raw bytes, BytesIO, PIL Image, or file path.
+        langs:  List of EasyOCR language codes (default: ['en', 'fr']), or
+                `AUTO_LANGS` to pick them per image from its script.
+                See https://www.jaided.ai/easyocr/ for all supported languages.
+
+    Returns:
+        Extracted text (may be empty if no text is detected), without blocks
+        below `MIN_CONFIDENCE`. Images given as bytes, BytesIO or a path are
+        served from the OCR cache when the same image was read before with
+        the same languages and preprocessing.
+
+    Raises:
+        OCRError: If the image cannot be loaded or OCR fails.
+    """
+    return ocr_image(source, langs)["text"]
+
+
+def extract_text_from_images(
+    sources: Iterable[Union[bytes, io.BytesIO, Image.Image, str]],
+    langs: list[str] | None = None,
+    workers: int = BATCH_WORKERS,
+    structured: bool = False,
+) -> Iterator[tuple[int, Union[str, dict], Optional[OCRError]]]:
+    """
+    Extract text from several images, reusing the cached reader.
+
+    Images are decoded and pre-processed concurrently; recognition runs on
+    the shared reader. Results are yielded in input order, each one as soon
+    as it and every image before it are done.
+
+    Args:
+        sources: Image inputs (same types as `extract_text_from_image`).
+        langs:   EasyOCR language codes (default: ['en', 'fr']).
+        workers: Images processed concurrently.
+        structured: Yield `ocr_image` dicts instead of plain text.
+
+    Yields:
+        `(index, text, error)` — `error` is None on success, otherwise the
+        `OCRError` for that image (with `text == ""`, or an empty result
+        when `structured`). A failing image never stops the rest of the batch.
+    """
+    langs = langs or DEFAULT_LANGS
+    sources = list(sources)
+    if not sources:
+        return
+    empty = filter_blocks([]) if structured else ""
+    with ThreadPoolExecutor(max_workers=max(min(workers, len(sources)), 1)) as pool:
+        futures = [pool.submit(ocr_image, src, langs) for src in sources]
+        try:
+            for i, future in enumerate(futures):
+                try:
+                    result = future.result()
+                    yield i, result if structured else result["text"], None
+                except OCRError as exc:
+                    yield i, empty, exc
+                except Exception as exc:
+                    yield i, empty, OCRError(f"OCR failed: {exc}")
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def join_pages(texts: list[str]) -> str:
+    """Concatenate per-page texts with `PAGE_MARKER` headers (none for one page)."""
+    if len(texts) == 1:
+        return texts[0]
+    return "\n\n".join(f"{PAGE_MARKER.format(n=i + 1)}\n{t}" for i, t in enumerate(texts))
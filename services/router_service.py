@@ -0,0 +1,221 @@
+"""
+Router Service — Spreads LLM traffic over several llama.cpp servers.
+
+Backends are chosen by least outstanding requests. A request can carry an
+affinity key, which keeps identical prompts on the same backend so its
+prompt cache is reused, unless that backend is clearly busier than the
+others. A backend whose request fails is ejected for `EJECT_COOLDOWN`
+seconds. It is re-admitted when the health monitor sees it online again,
+or when the cooldown expires and a trial request succeeds. If every backend
+is ejected, traffic goes to all of them rather than failing outright.
+
+The router only keeps state; the HTTP calls and retries live in
+`services.llm_service`.
+
+Usage:
+    from services.router_service import get_router
+    router = get_router(["http://10.0.0.1:8080", "http://10.0.0.2:8080"])
+    backend = router.acquire()
+    try:
+        ...  # send the request to backend.url
+    finally:
+        router.release(backend, ok=True)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from typing import Iterable, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+EJECT_AFTER    = 1     # consecutive failed requests before a backend is ejected
+EJECT_COOLDOWN = 10.0  # s — ejected backends get a trial request after this
+AFFINITY_SLACK = 2     # extra in-flight requests tolerated to honor affinity
+
+
+class NoBackendError(requests.exceptions.ConnectionError):
+    """Raised when every backend has been tried and none could serve the request."""
+    pass
+
+
+class Backend:
+    """One llama.cpp server and its routing state."""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0      # requests in flight
+        self.failures = 0         # consecutive failures
+        self.ejected_until = 0.0  # 0 = healthy
+        self.slots: Optional[int] = None  # parallel slots, from health probes
+        self.idle_slots: Optional[set] = None  # idle slot ids, from health probes
+        self.pinned: set = set()  # slots a request of this process is pinned to
+        self.requests = 0
+        self.errors = 0
+
+    def ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            "url": self.url, "outstanding": self.outstanding, "slots": self.slots,
+            "healthy": not self.ejected(now) and self.ejected_until == 0.0,
+            "ejected": self.ejected(now), "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+class BackendRouter:
+    """Thread-safe least-outstanding-requests router with ejection."""
+
+    def __init__(self, urls: Iterable[str], eject_after: int = EJECT_AFTER,
+                 cooldown: float = EJECT_COOLDOWN):
+        self.backends = [Backend(u) for u in urls]
+        if not self.backends:
+            raise ValueError("BackendRouter needs at least one URL")
+        self.eject_after = eject_after
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self) -> tuple[str, ...]:
+        return tuple(b.url for b in self.backends)
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    # ── Selection ──
+
+    @staticmethod
+    def _rank(backend: Backend, key: str) -> bytes:
+        """Rendezvous hash: every key gets a stable preference order of backends."""
+        return hashlib.sha1(f"{key}\x00{backend.url}".encode("utf-8")).digest()
+
+    def acquire(self, exclude: Iterable[str] = (), affinity: Optional[str] = None) -> Backend:
+        """
+        Reserve a backend for one request. Call `release` when it finishes.
+
+        Args:
+            exclude:  URLs already tried for this request.
+            affinity: Optional key (e.g. a prompt hash) that should keep
+                      landing on the same backend.
+
+        Raises:
+            NoBackendError: If every backend is excluded.
+        """
+        excluded = set(exclude)
+        now = time.time()
+        with self._lock:
+            candidates = [b for b in self.backends if b.url not in excluded]
+            if not candidates:
+                raise NoBackendError(f"All {len(self.backends)} LLM backends failed")
+            # Ejected backends past their cooldown are admitted again for a trial
+            healthy = [b for b in candidates if not b.ejected(now)] or candidates
+            chosen = min(healthy, key=lambda b: b.outstanding)
+            if affinity is not None:
+                preferred = max(healthy, key=lambda b: self._rank(b, affinity))
+                if preferred.outstanding <= chosen.outstanding + AFFINITY_SLACK:
+                    chosen = preferred
+            chosen.outstanding += 1
+            chosen.requests += 1
+            return chosen
+
+    def release(self, backend: Backend, ok: bool) -> None:
+        """Finish a request; `ok=False` means the backend itself failed."""
+        with self._lock:
+            backend.outstanding -= 1
+            if ok:
+                if backend.ejected_until:
+                    logger.info("LLM backend %s re-admitted", backend.url)
+                backend.failures = 0
+                backend.ejected_until = 0.0
+                return
+            backend.errors += 1
+            backend.failures += 1
+            if backend.failures >= self.eject_after:
+                backend.ejected_until = time.time() + self.cooldown
+                logger.warning("LLM backend %s ejected for %.0fs", backend.url, self.cooldown)
+
+    # ── Slot pinning ──
+
+    def claim_slot(self, backend: Backend, slot: int) -> int:
+        """
+        Reserve `slot` of `backend` for one request if it is idle, as far as
+        this process knows; otherwise return -1 (let the server choose), since
+        llama.cpp holds a request pinned to a busy slot until that slot frees
+        up. Call `release_slot` when the request finishes.
+        """
+        if slot < 0:
+            return -1
+        with self._lock:
+            busy = slot in backend.pinned or (
+                backend.idle_slots is not None and slot not in backend.idle_slots)
+            if busy:
+                return -1
+            backend.pinned.add(slot)
+            if backend.idle_slots is not None:
+                backend.idle_slots.discard(slot)
+            return slot
+
+    def release_slot(self, backend: Backend, slot: int) -> None:
+        """Hand back a slot reserved by `claim_slot` (no-op for -1)."""
+        if slot < 0:
+            return
+        with self._lock:
+            backend.pinned.discard(slot)
+            if backend.idle_slots is not None:
+                backend.idle_slots.add(slot)
+
+    # ── Health reports ──
+
+    def report_health(self, url: str, online: bool, slots: Optional[int] = None,
+                      idle_slots: Optional[Iterable[int]] = None) -> None:
+        """Record a health-probe result: eject dead backends, re-admit live ones."""
+        now = time.time()
+        with self._lock:
+            for backend in self.backends:
+                if backend.url != url.rstrip("/"):
+                    continue
+                if slots:
+                    backend.slots = slots
+                if idle_slots is not None:
+                    backend.idle_slots = set(idle_slots)
+                if online and backend.ejected_until:
+                    logger.info("LLM backend %s re-admitted (health probe)", backend.url)
+                    backend.failures = 0
+                    backend.ejected_until = 0.0
+                elif not online and not backend.ejected(now):
+                    backend.ejected_until = now + self.cooldown
+
+    def healthy(self) -> list[Backend]:
+        now = time.time()
+        with self._lock:
+            return [b for b in self.backends if not b.ejected(now)]
+
+    def stats(self) -> list[dict]:
+        now = time.time()
+        with self._lock:
+            return [b.as_dict(now) for b in self.backends]
+
+
+_router: Optional[BackendRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router(urls: Iterable[str]) -> BackendRouter:
+    """
+    Return the process-wide router for `urls`, rebuilding it if the configured
+    backend list changed.
+    """
+    global _router
+    wanted = tuple(u.rstrip("/") for u in urls)
+    if _router is None or _router.urls != wanted:
+        with _router_lock:
+            if _router is None or _router.urls != wanted:
+                _router = BackendRouter(wanted)
+    return _router
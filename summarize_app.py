@@ -9,33 +9,43 @@ Palette:  Navy #0B1B3A · Page #F4F7FB · Card #FFFFFF · Accent #8FB2FF
 import streamlit as st
 import requests
 import time
-import re
 import html as html_lib
 
-
-LLAMA_URL = "http://127.0.0.1:8080"
-
-def llama_server_online():
-    try:
-        r = requests.get(LLAMA_URL, timeout=1.5)
-        return r.status_code < 500
-    except Exception:
-        return False
-def simple_fallback_summary(text, max_sentences=4):
-    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-    sentences = [s for s in sentences if s]
-    return " ".join(sentences[:max_sentences])
-
 # ╔══════════════════════════════════════════════════════════════╗
 # ║  1. IMPORTS & CONSTANTS                                     ║
 # ╚══════════════════════════════════════════════════════════════╝
 
 
 
-from services.ocr_service import extract_text_from_image, OCRError
+from services.ocr_service import (
+    extract_text_from_images, join_pages, WARMUP, AUTO_LANGS, SCRIPT_LANGS,
+)
+from services.ocr_pool_service import get_pool, start_warmup, engine_status, thread_summary
+from services.ocr_cache_service import get_ocr_cache
+from services.llm_service import (
+    call_llm, build_system_prompt, estimate_tokens, count_tokens_exact, context_size,
+    coalesce_stats, ContextOverflowError, BackendUnavailableError,
+)
+from services.longdoc_service import summarize_long, needs_chunking, calibrated_counter
+from services.extractive_service import compress, summarize_extractive, COMPRESS_BUDGET
+from services.cache_service import get_cache
+from services.health_service import get_monitor
+
+STREAM_REFRESH = 0.05  # s — min delay between live summary redraws
+
+OCR_LANGUAGES = {
+    "English / French":     SCRIPT_LANGS["latin"],
+    "Auto-detect":          AUTO_LANGS,
+    "Arabic":               SCRIPT_LANGS["arabic"],
+    "Chinese (simplified)": SCRIPT_LANGS["chinese"],
+    "Japanese":             SCRIPT_LANGS["japanese"],
+    "Korean":               SCRIPT_LANGS["korean"],
+    "Russian":              SCRIPT_LANGS["cyrillic"],
+    "Hindi":                SCRIPT_LANGS["devanagari"],
+}
 
-API_URL = "http://127.0.0.1:8080/v1/chat/completions"
-MODEL   = "local-model"
+if WARMUP:
+    start_warmup()  # OCR_WARMUP=1: load OCR models in the background at start-up
 
 # ╔══════════════════════════════════════════════════════════════╗
 # ║  2. PAGE CONFIG                                             ║
@@ -236,7 +246,7 @@ html, body, [data-testid="stAppViewContainer"],
    3.8 — Metrics
    ═══════════════════════════════════════════ */
 .metrics-grid {
-    display: grid; grid-template-columns: repeat(4, 1fr);
+    display: grid; grid-template-columns: repeat(3, 1fr);
     gap: var(--sp-3); margin-bottom: var(--sp-5);
     animation: fadeInUp 0.4s ease-out both;
 }
@@ -878,86 +888,34 @@ for _k, _v in _DEFAULTS.items():
 # ║  5. UTILITY / LLM FUNCTIONS                                 ║
 # ╚══════════════════════════════════════════════════════════════╝
 
-def check_server() -> bool:
-    try:
-        return requests.get("http://127.0.0.1:8080/", timeout=3).status_code == 200
-    except Exception:
-        return False
-
 def count_words(t: str) -> int:
     return len(t.split()) if t else 0
 
 def count_chars(t: str) -> int:
     return len(t) if t else 0
 
-def estimate_tokens(t: str) -> int:
-    return int(count_words(t) * 1.33)
-
-def build_system_prompt(style: str, language: str, extra: str) -> str:
-    if style == "OCR Clean + Summarize":
-        prompt = (
-            "You are an expert AI assistant.\n\n"
-            "The following text was extracted via OCR from an image. "
-            "It may contain spelling errors, broken words, or formatting issues.\n\n"
-            "Your tasks:\n"
-            "1. Correct obvious OCR errors.\n"
-            "2. Remove noise and duplicated fragments.\n"
-            "3. Preserve important names, numbers, and dates.\n"
-            "4. Provide a clear, structured summary.\n\n"
-            "Base your summary strictly on the cleaned text."
-        )
-    else:
-        styles = {
-            "Concise":       "Produce a short, concise summary capturing only the key points.",
-            "Detailed":      "Produce a thorough summary preserving important nuances.",
-            "Bullet Points": "Produce a clear, well-organized bullet-point summary.",
-            "Academic":      "Produce a formal, academic-style summary suitable for scholarly work.",
-            "ELI5":          "Explain the text simply, as if for a five-year-old.",
-        }
-        prompt = f"You are an expert text summarizer.\n{styles.get(style, styles['Concise'])}"
-    if language != "Auto (same as input)":
-        prompt += f"\nWrite the summary in {language}."
-    if extra and extra.strip():
-        prompt += f"\nAdditional instructions: {extra.strip()}"
-    return prompt
-
-def call_llm(text, system_prompt, temperature, max_tokens):
-    payload = {
-        "model": MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user",   "content": f"Summarize the following text:\n\n{text}"},
-        ],
-        "temperature": temperature,
-        "max_tokens":  max_tokens,
-        "stream":      False,
-    }
-    t0 = time.time()
-    resp = requests.post(API_URL, json=payload, timeout=600)
-    elapsed = time.time() - t0
-    resp.raise_for_status()
-    data = resp.json()
-    usage = data.get("usage", {})
-    return {
-        "summary":           data["choices"][0]["message"]["content"],
-        "elapsed":           elapsed,
-        "prompt_tokens":     usage.get("prompt_tokens", 0),
-        "completion_tokens": usage.get("completion_tokens", 0),
-        "total_tokens":      usage.get("total_tokens", 0),
-    }
-
-
 # ╔══════════════════════════════════════════════════════════════╗
 # ║  6. UI COMPONENTS (shared)                                  ║
 # ╚══════════════════════════════════════════════════════════════╝
 
 def render_counters(text: str):
-    w, c, t = count_words(text), count_chars(text), estimate_tokens(text)
+    w, c = count_words(text), count_chars(text)
+    online = get_monitor().status()["online"]
+    exact = count_tokens_exact(text) if online else None
+    t = estimate_tokens(text) if exact is None else exact
+    approx = "≈ " if exact is None else ""
+    n_ctx = context_size() if online else 0
+    ctx = ""
+    if n_ctx and t <= n_ctx:
+        ctx = f'<span class="ctr-pill"><span class="ctr-val">{n_ctx - t:,}</span> context left</span>'
+    elif n_ctx:
+        ctx = f'<span class="ctr-pill"><span class="ctr-val">{t - n_ctx:,}</span> over context — summarized in parts</span>'
     st.markdown(f"""
     <div class="counter-row">
         <span class="ctr-pill"><span class="ctr-val">{w:,}</span> words</span>
         <span class="ctr-pill"><span class="ctr-val">{c:,}</span> chars</span>
-        <span class="ctr-pill">≈ <span class="ctr-val">{t:,}</span> tokens</span>
+        <span class="ctr-pill">{approx}<span class="ctr-val">{t:,}</span> tokens</span>
+        {ctx}
     </div>""", unsafe_allow_html=True)
 
 def render_empty():
@@ -986,20 +944,61 @@ def render_metrics(result, input_text):
     orig = count_words(input_text)
     summ = count_words(result["summary"])
     comp = round(summ / orig * 100, 1) if orig else 0
+    if result.get("extractive"):
+        st.markdown(f"""
+        <div class="metrics-grid">
+            <div class="m-card"><p class="m-val">{result['elapsed'] * 1000:.0f} ms</p><p class="m-lbl">Latency</p></div>
+            <div class="m-card"><p class="m-val">{result['sentences_kept']}/{result['sentences_total']}</p><p class="m-lbl">Sentences Kept</p></div>
+            <div class="m-card"><p class="m-val">{comp}%</p><p class="m-lbl">Compression</p></div>
+        </div>""", unsafe_allow_html=True)
+        return
     st.markdown(f"""
     <div class="metrics-grid">
         <div class="m-card"><p class="m-val">{result['elapsed']:.1f}s</p><p class="m-lbl">Latency</p></div>
+        <div class="m-card"><p class="m-val">{result.get('ttft', result['elapsed']):.2f}s</p><p class="m-lbl">First Token</p></div>
+        <div class="m-card"><p class="m-val">{result.get('tokens_per_sec', 0):.1f}</p><p class="m-lbl">Tokens / s</p></div>
         <div class="m-card"><p class="m-val">{result['prompt_tokens']:,}</p><p class="m-lbl">Input Tokens</p></div>
         <div class="m-card"><p class="m-val">{result['completion_tokens']:,}</p><p class="m-lbl">Output Tokens</p></div>
         <div class="m-card"><p class="m-val">{comp}%</p><p class="m-lbl">Compression</p></div>
     </div>""", unsafe_allow_html=True)
+    pills = []
+    cache = get_cache()
+    if cache is not None:
+        cs = cache.stats()
+        label = "Cache hit" if result.get("cached") else "Cache miss"
+        if result.get("cache_safe"):
+            label += " · deterministic"
+        pills += [f'<span class="ctr-val">{label}</span>',
+                  f'<span class="ctr-val">{cs["hits"]:,}</span> hits',
+                  f'<span class="ctr-val">{cs["misses"]:,}</span> misses',
+                  f'<span class="ctr-val">{cs["evictions"]:,}</span> evictions']
+    flights = coalesce_stats()
+    if result.get("coalesced"):
+        pills.append('<span class="ctr-val">Shared generation</span>')
+    if flights["coalesced"]:
+        pills.append(f'<span class="ctr-val">{flights["coalesced"]:,}</span> coalesced requests')
+    if result.get("prompt_cached_tokens"):
+        pills += [f'<span class="ctr-val">{result["prompt_cached_tokens"]:,}</span> prompt tokens reused',
+                  f'<span class="ctr-val">{result["prompt_saved_ms"]:,.0f} ms</span> prompt eval saved']
+    squeezed = result.get("precompressed")
+    if squeezed:
+        pills += [f'<span class="ctr-val">{squeezed["ratio"] * 100:.0f}%</span> of input sent '
+                  f'({squeezed["sentences_kept"]}/{squeezed["sentences_total"]} sentences)',
+                  f'<span class="ctr-val">{squeezed["tokens_saved"]:,}</span> prompt tokens saved']
+    if pills:
+        spans = "".join(f'<span class="ctr-pill">{p}</span>' for p in pills)
+        st.markdown(f'<div class="counter-row">{spans}</div>', unsafe_allow_html=True)
 
 def render_output(result, input_text):
     render_metrics(result, input_text)
     safe = html_lib.escape(result["summary"]).replace("\n", "<br>")
+    if result.get("extractive"):
+        label = f"✦ Extractive Summary (offline — {result.get('fallback_reason', 'local')})"
+    else:
+        label = "✦ AI-Generated Summary"
     st.markdown(f"""
     <div class="result-card">
-        <div class="result-label">✦ AI-Generated Summary</div>
+        <div class="result-label">{label}</div>
         <div class="result-body">{safe}</div>
     </div>""", unsafe_allow_html=True)
     with st.expander("📋  Copy summary"):
@@ -1015,29 +1014,7 @@ def render_output(result, input_text):
             st.text_area("_s", result["summary"], height=180,
                          disabled=True, label_visibility="collapsed")
 
-def do_summarize(text, server_ok, style, lang, extra, temp, max_tok):
-    if not text or not text.strip():
-        st.warning("Please enter some text to summarize.")
-        return
-    if not server_ok:
-        st.error("Server offline — start llama.cpp at 127.0.0.1:8080.")
-        return
-    system = build_system_prompt(style, lang, extra)
-    bar = st.progress(0, text="Preparing request…")
-    for p in range(0, 25, 5):
-        time.sleep(0.02); bar.progress(p, text="Preparing request…")
-    bar.progress(25, text="Generating summary…")
-    try:
-        result = call_llm(text, system, temp, max_tok)
-    except requests.exceptions.Timeout:
-        bar.empty(); st.error("Timed out — try shorter text or check the server."); return
-    except requests.exceptions.ConnectionError:
-        bar.empty(); st.error("Cannot connect — make sure llama.cpp is running."); return
-    except Exception as e:
-        bar.empty(); st.error(f"Error: {e}"); return
-    for p in range(25, 101, 10):
-        time.sleep(0.012); bar.progress(min(p, 100), text="Finalizing…")
-    bar.empty()
+def store_summary(text, style, result):
     st.session_state.summary_result     = result
     st.session_state.summary_input      = text
     st.session_state.summary_style_used = style
@@ -1050,6 +1027,71 @@ def do_summarize(text, server_ok, style, lang, extra, temp, max_tok):
     })
     st.rerun()
 
+def offline_summary(text, style, reason):
+    """Instant local extractive summary when llama.cpp cannot answer."""
+    result = summarize_extractive(text, style)
+    result["fallback_reason"] = reason
+    store_summary(text, style, result)
+
+def do_summarize(text, server_ok, style, lang, extra, temp, max_tok):
+    if not text or not text.strip():
+        st.warning("Please enter some text to summarize.")
+        return
+    if not server_ok:
+        offline_summary(text, style, "server offline")
+        return
+    system = build_system_prompt(style, lang, extra)
+    status = st.empty()
+    original, precompressed = text, None
+    if st.session_state.get("precompress"):
+        status.caption("Ranking sentences…")
+        precompressed = compress(text, COMPRESS_BUDGET, count=calibrated_counter(text))
+        text = precompressed["text"]
+    status.caption("Generating summary…")
+    live = st.empty()
+    last_draw = [0.0]
+
+    def on_delta(partial):
+        now = time.time()
+        if now - last_draw[0] < STREAM_REFRESH:
+            return
+        last_draw[0] = now
+        safe = html_lib.escape(partial).replace("\n", "<br>")
+        live.markdown(f"""
+        <div class="result-card">
+            <div class="result-label">✦ Generating…</div>
+            <div class="result-body">{safe}▌</div>
+        </div>""", unsafe_allow_html=True)
+
+    def on_progress(done, total):
+        status.caption(f"Summarizing long document — part {done}/{total}…")
+
+    fallback = None
+    try:
+        if needs_chunking(text, system, max_tok):
+            status.caption("Long document — summarizing in parts…")
+            result = summarize_long(text, style, lang, extra, temp, max_tok,
+                                    on_delta=on_delta, on_progress=on_progress)
+        else:
+            result = call_llm(text, system, temp, max_tok, on_delta=on_delta)
+    except ContextOverflowError as e:
+        status.empty(); live.empty(); st.error(str(e)); return
+    except requests.exceptions.Timeout:
+        fallback = "server timed out"
+    except BackendUnavailableError:
+        fallback = "server overloaded"
+    except requests.exceptions.ConnectionError:
+        fallback = "cannot connect to llama.cpp"
+    except Exception as e:
+        status.empty(); live.empty(); st.error(f"Error: {e}"); return
+    status.empty(); live.empty()
+    if fallback:
+        offline_summary(original, style, fallback)
+        return
+    if precompressed and precompressed["compressed"]:
+        result = {**result, "precompressed": precompressed}
+    store_summary(original, style, result)
+
 
 # ╔══════════════════════════════════════════════════════════════╗
 # ║  7. PAGE RENDERERS                                          ║
@@ -1095,7 +1137,7 @@ def render_home(server_ok, summary_style, language, extra_instructions,
             <div class="fc-icon fc-icon-green">📷</div>
             <p class="fc-title">Smart OCR</p>
             <p class="fc-desc">
-                Upload an image and extract text automatically with EasyOCR.
+                Upload one or many images and extract text automatically with EasyOCR.
                 Clean, correct, and summarize — all in one step.
             </p>
         </div>
@@ -1198,32 +1240,75 @@ def render_home(server_ok, summary_style, language, extra_instructions,
             <div class="inner-card"><div class="ic-header">
                 <div class="ic-icon">📷</div>
                 <div><p class="ic-title">Image to Text (OCR)</p>
-                <p class="ic-desc">Upload a photo → extract → edit → summarize.</p></div>
+                <p class="ic-desc">Upload photos or scanned pages → extract → edit → summarize.</p></div>
             </div></div>""", unsafe_allow_html=True)
-            image_file = st.file_uploader(
-                "Upload image",
+            image_files = st.file_uploader(
+                "Upload images",
                 type=["jpg", "jpeg", "png", "webp", "bmp", "tiff"],
                 key="img_upload", label_visibility="collapsed",
+                accept_multiple_files=True,
             )
-            if image_file is not None:
-                st.image(image_file, caption="Uploaded image", use_container_width=True)
-                if st.button("Extract Text (OCR)", key="btn_ocr", use_container_width=True):
+            if image_files:
+                if len(image_files) == 1:
+                    st.image(image_files[0], caption="Uploaded image", use_container_width=True)
+                else:
+                    thumbs = st.columns(min(len(image_files), 4))
+                    for i, f in enumerate(image_files):
+                        thumbs[i % len(thumbs)].image(f, caption=f"Page {i + 1}",
+                                                      use_container_width=True)
+                ocr_langs = OCR_LANGUAGES[st.selectbox(
+                    "Text language", list(OCR_LANGUAGES), key="ocr_lang",
+                    help="Auto-detect reads a small crop of each page with the "
+                         "English / French recognizer and, if it is unsure, with each "
+                         "other script's recognizer; only the best one reads the full page.",
+                )]
+                ocr_state = engine_status()
+                if ocr_state == "warming":
+                    st.caption("⏳ The OCR engine is loading its models in the background — "
+                               "this only happens after a restart.")
+                if st.button("OCR engine warming up…" if ocr_state == "warming"
+                             else "Extract Text (OCR)",
+                             key="btn_ocr", use_container_width=True,
+                             disabled=ocr_state == "warming"):
+                    n = len(image_files)
                     bar = st.progress(0, text="Starting OCR engine…")
-                    for p in range(0, 30, 5):
-                        time.sleep(0.03); bar.progress(p, text="Starting OCR engine…")
-                    bar.progress(30, text="Extracting text…")
+                    pages, failed, dropped, detected = [], [], [], set()
+                    images = [f.getvalue() for f in image_files]
+                    ocr_cache = get_ocr_cache()
+                    def ocr_hits():
+                        cs = ocr_cache.stats() if ocr_cache else {}
+                        return cs.get("hits", 0) + cs.get("perceptual_hits", 0)
+                    hits0 = ocr_hits()
+                    pool = get_pool()
                     try:
-                        extracted = extract_text_from_image(image_file.getvalue())
-                    except OCRError as e:
-                        bar.empty(); st.error(f"OCR Error: {e}"); extracted = ""
+                        for i, result, err in (
+                                pool.extract_many(images, ocr_langs, structured=True) if pool
+                                else extract_text_from_images(images, ocr_langs,
+                                                              structured=True)):
+                            pages.append(result["text"])
+                            detected.update(result.get("langs", []))
+                            dropped.extend(b["text"] for b in result["dropped"])
+                            if err is not None:
+                                failed.append(f"{image_files[i].name}: {err}")
+                            bar.progress((i + 1) / n, text=f"Extracted page {i + 1} of {n}…")
                     except Exception as e:
-                        bar.empty(); st.error(f"Error: {e}"); extracted = ""
-                    for p in range(30, 101, 10):
-                        time.sleep(0.012); bar.progress(min(p, 100), text="Complete!")
+                        st.error(f"Error: {e}")
                     bar.empty()
-                    if extracted and extracted.strip():
+                    for msg in failed:
+                        st.error(f"OCR Error — {msg}")
+                    extracted = join_pages(pages) if any(t.strip() for t in pages) else ""
+                    if extracted:
                         st.session_state.ocr_text = extracted
-                        st.success(f"Extracted {count_words(extracted):,} words")
+                        cached = ocr_hits() - hits0
+                        st.success(f"Extracted {count_words(extracted):,} words"
+                                   + (f" from {n} images" if n > 1 else "")
+                                   + (f" ({cached} from cache)" if cached else ""))
+                        if ocr_langs == AUTO_LANGS and detected:
+                            st.caption(f"Detected languages: {', '.join(sorted(detected))}")
+                        if dropped:
+                            noise = " ".join(dropped)
+                            st.caption(f"Dropped {len(noise):,} low-confidence characters "
+                                       f"(~{estimate_tokens(noise):,} tokens) before summarization.")
                     else:
                         st.session_state.ocr_text = ""
                         st.warning("No text detected — image may be blurry or empty.")
@@ -1538,7 +1623,8 @@ def render_others():
     with st.expander("What file formats are supported?"):
         st.markdown(
             "Currently: **plain text** (.txt), **Markdown** (.md), and **images** "
-            "(JPG, PNG, WebP, BMP, TIFF) via OCR. PDF and DOCX support are on the roadmap."
+            "(JPG, PNG, WebP, BMP, TIFF) via OCR — several pages at once, joined in upload "
+            "order. PDF and DOCX support are on the roadmap."
         )
     with st.expander("How does OCR work?"):
         st.markdown(
@@ -1731,13 +1817,24 @@ if st.session_state.show_pricing:
 
 with st.sidebar:
     st.markdown("### ⚙️  Settings")
-    server_ok = check_server()
+    health = get_monitor().status()
+    server_ok = health["online"]
     if server_ok:
         st.markdown("""<div class="status-chip status-on">
             <span class="status-dot"></span>Server Online</div>""", unsafe_allow_html=True)
+        details = [f"{health['latency'] * 1000:.0f} ms"]
+        if health["slots_total"]:
+            details.append(f"{health['slots_idle']}/{health['slots_total']} slots free")
+        backends = health.get("backends", [])
+        if len(backends) > 1:
+            up = sum(1 for b in backends if b["online"])
+            details.append(f"{up}/{len(backends)} servers")
+        st.caption(" · ".join(details))
     else:
-        st.markdown("""<div class="status-chip status-off">
-            <span class="status-dot"></span>Server Offline</div>""", unsafe_allow_html=True)
+        label = {"unknown": "Checking Server…",
+                 "loading": "Loading Model…"}.get(health["status"], "Server Offline")
+        st.markdown(f"""<div class="status-chip status-off">
+            <span class="status-dot"></span>{label}</div>""", unsafe_allow_html=True)
     st.divider()
     summary_style = st.selectbox(
         "Summary Style",
@@ -1753,14 +1850,20 @@ with st.sidebar:
     temperature = st.slider("Temperature", 0.0, 1.5, 0.3, 0.05,
                             help="Lower = focused, higher = creative.")
     max_tokens = st.slider("Max Tokens", 64, 4096, 1024, 64)
+    st.toggle("Pre-compress long inputs", key="precompress",
+              help=f"Keep only the most central sentences (about {COMPRESS_BUDGET:,} "
+                   "tokens) before sending the text to the model.")
     extra_instructions = st.text_area(
         "Custom Instructions",
         placeholder="e.g. Focus on financial aspects…", height=72,
     )
     st.divider()
-    st.markdown("""<div class="sidebar-foot">
+    ocr_threads = thread_summary()
+    threads_used, llm_cores = ocr_threads["threads"], ocr_threads["llm_cores"]
+    st.markdown(f"""<div class="sidebar-foot">
         <p><strong>SummarizeAI</strong> v1.0</p>
         <p>llama.cpp · 127.0.0.1:8080</p>
+        <p>OCR {threads_used} threads · LLM {llm_cores} cores</p>
         <p>© 2026 · Built with Streamlit</p>
     </div>""", unsafe_allow_html=True)
 
@@ -0,0 +1,233 @@
+"""
+Shared pytest fixtures.
+
+`fake_llama` runs a tiny stand-in for the llama.cpp server (OpenAI-compatible
+chat API plus `/health`, `/slots`, `/props` and `/tokenize`) on a random local
+port and points `services.llm_service` at it; `fake_llamas(n)` does the same
+with several servers on different ports for the multi-backend router. Every
+test also gets its own empty summary cache, OCR cache and backend router, so
+nothing leaks from the user's caches or between tests.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services import llm_service, ocr_service, router_service
+from services.cache_service import SummaryCache
+from services.ocr_cache_service import OCRCache
+
+
+# ──────────────────────────────────────────────
+# Fixtures
+# ──────────────────────────────────────────────
+
+SUMMARY_PIECES = ["The ", "quick ", "summary."]
+
+
+class _FakeLlama(BaseHTTPRequestHandler):
+    """Minimal llama.cpp look-alike: blocking and SSE chat completions."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real server
+
+    def log_message(self, *args):  # keep pytest output quiet
+        pass
+
+    def _send_json(self, obj, status=200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health" and self.server.loading:
+            self._send_json({"error": {"code": 503, "message": "Loading model"}}, status=503)
+            return
+        if self.path == "/slots":
+            self._send_json([{"id": i, "is_processing": i < self.server.busy_slots}
+                             for i in range(2)])
+            return
+        if self.path == "/props":
+            self.server.props_calls += 1
+            if self.server.legacy:
+                self._send_json({"error": "Not Found"}, status=404)
+                return
+            self._send_json({
+                "total_slots": 2,
+                "default_generation_settings": {"n_ctx": self.server.n_ctx},
+            })
+            return
+        self._send_json({"status": "ok"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        if self.path == "/tokenize":
+            # One token per 4 characters — deterministic and script-agnostic
+            self.server.tokenize_calls += 1
+            if self.server.legacy:
+                self._send_json({"error": "Not Found"}, status=404)
+                return
+            content = payload["content"]
+            self._send_json({"tokens": list(range((len(content) + 3) // 4))})
+            return
+        self.server.payloads.append(payload)
+        if self.server.fail_status:
+            self._send_json({"error": {"code": self.server.fail_status}},
+                            status=self.server.fail_status)
+            return
+        with self.server.lock:
+            self.server.active += 1
+            self.server.peak = max(self.server.peak, self.server.active)
+        try:
+            time.sleep(self.server.delay)
+            self._reply(payload)
+        finally:
+            with self.server.lock:
+                self.server.active -= 1
+
+    def _timings(self, payload):
+        """Fake llama.cpp timings; `cache_n` = prefix shared with the slot's last prompt."""
+        prompt = json.dumps(payload["messages"])
+        slot = payload.get("id_slot", -1)
+        previous = self.server.slot_prompts.get(slot, "")
+        shared = 0
+        while shared < min(len(prompt), len(previous)) and prompt[shared] == previous[shared]:
+            shared += 1
+        if payload.get("cache_prompt"):
+            self.server.slot_prompts[slot] = prompt
+        else:
+            shared = 0
+        prompt_n = len(prompt) // 4
+        cache_n = shared // 4
+        return {"cache_n": cache_n, "prompt_n": prompt_n - cache_n,
+                "prompt_ms": 2.0 * (prompt_n - cache_n), "prompt_per_token_ms": 2.0,
+                "predicted_n": 3, "predicted_ms": 30.0}
+
+    def _reply(self, payload):
+        usage = {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+        timings = self._timings(payload)
+        if not payload.get("stream"):
+            self._send_json({
+                "choices": [{"message": {"content": "".join(SUMMARY_PIECES)}}],
+                "usage": usage,
+                "timings": timings,
+            })
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for piece in SUMMARY_PIECES:
+            chunk = {"choices": [{"delta": {"content": piece}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        final = {"choices": [{"delta": {}, "finish_reason": "stop"}], "usage": usage,
+                 "timings": timings}
+        self.wfile.write(f"data: {json.dumps(final)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+@pytest.fixture(autouse=True)
+def summary_cache(monkeypatch, tmp_path):
+    """Give every test its own empty on-disk summary cache."""
+    cache = SummaryCache(str(tmp_path))
+    monkeypatch.setattr(llm_service, "get_cache", lambda: cache)
+    return cache
+
+
+def _start_fake_llama(port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), _FakeLlama)
+    server.payloads = []
+    server.n_ctx = 4096
+    server.tokenize_calls = 0
+    server.props_calls = 0
+    server.legacy = False  # no /props or /tokenize, like older servers
+    server.busy_slots = 0
+    server.loading = False
+    server.fail_status = 0
+    server.delay = 0.0
+    server.lock = threading.Lock()
+    server.active = server.peak = 0
+    server.slot_prompts = {}
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _stop_fake_llama(server: ThreadingHTTPServer) -> None:
+    server.shutdown()
+    server.server_close()
+
+
+class _SizeReader:
+    """Stand-in EasyOCR reader that "reads" the image width (no model download)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def readtext(self, img_array, detail=1, **kwargs):
+        self.calls += 1
+        h, w = img_array.shape[:2]
+        text = f"width {w}"
+        return [([[0, 0], [w, 0], [w, h], [0, h]], text, 0.99)] if detail else [text]
+
+
+@pytest.fixture
+def size_reader(monkeypatch):
+    reader = _SizeReader()
+    monkeypatch.setattr(ocr_service, "_get_reader", lambda langs: reader)
+    monkeypatch.setattr(ocr_service, "TEXT_CHECK", False)  # its test images are blank
+    return reader
+
+
+@pytest.fixture(autouse=True)
+def ocr_cache(monkeypatch, tmp_path):
+    """Give every test its own empty on-disk OCR cache."""
+    cache = OCRCache(str(tmp_path / "ocr"))
+    monkeypatch.setattr(ocr_service, "get_ocr_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def backend_router(monkeypatch):
+    """Start every test with a fresh router and no `LLAMA_URLS` from the environment."""
+    monkeypatch.setattr(router_service, "_router", None)
+    monkeypatch.setattr(llm_service, "LLAMA_URLS", [])
+
+
+@pytest.fixture
+def fake_llama(monkeypatch):
+    server = _start_fake_llama()
+    monkeypatch.setattr(llm_service, "LLAMA_URL", server.url)
+    monkeypatch.setattr(llm_service, "_props_cache", {})
+    monkeypatch.setattr(llm_service, "_failed_at", {})
+    monkeypatch.setattr(llm_service, "_token_cache", OrderedDict())
+    yield server
+    _stop_fake_llama(server)
+
+
+@pytest.fixture
+def fake_llamas(monkeypatch):
+    """Factory: `fake_llamas(n)` starts n servers and routes `llm_service` over them."""
+    servers = []
+
+    def start(n: int) -> list:
+        servers.extend(_start_fake_llama() for _ in range(n))
+        monkeypatch.setattr(llm_service, "LLAMA_URLS", [s.url for s in servers])
+        monkeypatch.setattr(llm_service, "_props_cache", {})
+        monkeypatch.setattr(llm_service, "_failed_at", {})
+        monkeypatch.setattr(llm_service, "_token_cache", OrderedDict())
+        return servers
+
+    yield start
+    for server in servers:
+        if server.socket.fileno() != -1:
+            _stop_fake_llama(server)
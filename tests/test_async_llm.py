@@ -0,0 +1,55 @@
+"""
+Unit tests for the async batch summarization client.
+
+Run:
+    python -m pytest tests/test_async_llm.py -v
+"""
+
+import asyncio
+
+from services.async_llm_service import summarize_as_completed, summarize_many
+
+
+# ──────────────────────────────────────────────
+# Tests — summarize_many
+# ──────────────────────────────────────────────
+
+class TestSummarizeMany:
+    def test_results_are_in_input_order_with_call_llm_shape(self, fake_llama):
+        texts = [f"Document number {i}." for i in range(5)]
+        results = asyncio.run(summarize_many(texts, "Concise", concurrency=2))
+        assert len(results) == 5
+        for result in results:
+            assert result["summary"] == "The quick summary."
+            assert {"elapsed", "ttft", "tokens_per_sec", "prompt_tokens",
+                    "completion_tokens", "total_tokens", "cached"} <= result.keys()
+        # Every item used the shared style prompt
+        assert all("concise summary" in p["messages"][0]["content"]
+                   for p in fake_llama.payloads)
+
+    def test_concurrency_is_bounded(self, fake_llama):
+        fake_llama.delay = 0.1
+        texts = [f"Document number {i}." for i in range(6)]
+        asyncio.run(summarize_many(texts, "Concise", concurrency=3))
+        assert 1 < fake_llama.peak <= 3
+
+    def test_failing_item_is_isolated(self, fake_llama):
+        fake_llama.n_ctx = 256
+        texts = ["Short text.", "x" * 4000, "Another short text."]
+        results = asyncio.run(summarize_many(texts, "Concise", concurrency=2))
+        assert results[0]["summary"] and results[2]["summary"]
+        assert results[1]["summary"] == "" and "context" in results[1]["error"]
+
+    def test_per_item_timeout(self, fake_llama):
+        fake_llama.delay = 0.5
+        results = asyncio.run(summarize_many(["Slow text."], "Concise", timeout=0.1))
+        assert "Timed out" in results[0]["error"]
+
+    def test_as_completed_yields_every_index(self, fake_llama):
+        async def collect():
+            return [i async for i, _ in summarize_as_completed(
+                ["a.", "b.", "c."], "Concise", concurrency=3)]
+        assert sorted(asyncio.run(collect())) == [0, 1, 2]
+
+    def test_empty_batch(self):
+        assert asyncio.run(summarize_many([], "Concise")) == []
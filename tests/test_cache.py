@@ -0,0 +1,83 @@
+"""
+Unit tests for the persistent summary cache.
+
+Run:
+    python -m pytest tests/test_cache.py -v
+"""
+
+import pytest
+
+from services.cache_service import SummaryCache, cache_key
+
+
+# ──────────────────────────────────────────────
+# Fixtures
+# ──────────────────────────────────────────────
+
+@pytest.fixture
+def cache(tmp_path):
+    return SummaryCache(str(tmp_path))
+
+
+def _result(summary: str) -> dict:
+    return {"summary": summary, "elapsed": 2.5, "prompt_tokens": 40,
+            "completion_tokens": 10, "total_tokens": 50}
+
+
+# ──────────────────────────────────────────────
+# Tests — keys
+# ──────────────────────────────────────────────
+
+class TestCacheKey:
+    def test_whitespace_is_normalized(self):
+        assert cache_key("a  b\n c", "sys", 0.3, 512, "m") == cache_key("a b c", "sys", 0.3, 512, "m")
+
+    @pytest.mark.parametrize("changed", [
+        ("other", "sys", 0.3, 512, "m"),
+        ("text", "other", 0.3, 512, "m"),
+        ("text", "sys", 0.4, 512, "m"),
+        ("text", "sys", 0.3, 256, "m"),
+        ("text", "sys", 0.3, 512, "other"),
+    ])
+    def test_every_setting_changes_the_key(self, changed):
+        assert cache_key("text", "sys", 0.3, 512, "m") != cache_key(*changed)
+
+
+# ──────────────────────────────────────────────
+# Tests — SummaryCache
+# ──────────────────────────────────────────────
+
+class TestSummaryCache:
+    def test_roundtrip_keeps_usage_and_counts(self, cache):
+        assert cache.get("k") is None
+        cache.put("k", _result("hello"), deterministic=True)
+        hit = cache.get("k")
+        assert hit["summary"] == "hello" and hit["total_tokens"] == 50
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_persists_across_instances(self, tmp_path):
+        SummaryCache(str(tmp_path)).put("k", _result("kept"), deterministic=False)
+        assert SummaryCache(str(tmp_path)).get("k")["summary"] == "kept"
+
+    def test_nondeterministic_entries_can_be_refused(self, cache):
+        cache.put("k", _result("warm"), deterministic=False)
+        assert cache.get("k", allow_nondeterministic=False) is None
+        assert cache.get("k") is not None
+
+    def test_lru_eviction_by_size(self, tmp_path):
+        entry_size = len(str(_result("x" * 100)))
+        cache = SummaryCache(str(tmp_path), max_bytes=entry_size * 2 + 50)
+        cache.put("a", _result("a" * 100), deterministic=True)
+        cache.put("b", _result("b" * 100), deterministic=True)
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", _result("c" * 100), deterministic=True)
+        assert cache.get("b") is None
+        assert cache.get("a") is not None and cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_age_eviction(self, tmp_path):
+        cache = SummaryCache(str(tmp_path), max_age=-1)
+        cache.put("k", _result("old"), deterministic=True)
+        assert cache.get("k") is None
+        assert cache.stats()["evictions"] >= 1
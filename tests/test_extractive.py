@@ -0,0 +1,137 @@
+"""
+Unit tests for the extractive (sentence-ranking) service.
+
+Run:
+    python -m pytest tests/test_extractive.py -v
+"""
+
+import numpy as np
+
+from services.extractive_service import (
+    compress, mmr_select, rank_sentences, summarize_extractive, summary_length,
+    textrank, tfidf_matrix,
+)
+
+
+# ──────────────────────────────────────────────
+# Fixtures
+# ──────────────────────────────────────────────
+
+_ON_TOPIC = [
+    "The solar panel array produces power for the research station.",
+    "Power from the solar panel array is stored in the station batteries.",
+    "The station batteries keep the research station running at night.",
+    "Engineers inspect the solar panel array and the batteries every week.",
+    "During winter the solar panel array produces less power for the station.",
+]
+_OFF_TOPIC = [
+    "My cousin once adopted a parrot named Gerald.",
+    "Lunch today was a rather bland sandwich.",
+    "Weather forecasts rarely mention umbrellas anymore.",
+]
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+# ──────────────────────────────────────────────
+# Tests — ranking
+# ──────────────────────────────────────────────
+
+class TestRanking:
+    def test_tfidf_rows_are_normalised(self):
+        matrix = tfidf_matrix(_ON_TOPIC + _OFF_TOPIC)
+        norms = np.linalg.norm(matrix, axis=1)
+        assert np.allclose(norms[:len(_ON_TOPIC)], 1.0, atol=1e-5)
+
+    def test_textrank_matches_dense_power_iteration(self):
+        matrix = tfidf_matrix(_ON_TOPIC + _OFF_TOPIC).astype(np.float64)
+        graph = matrix @ matrix.T
+        np.fill_diagonal(graph, 0.0)
+        degree = np.maximum(graph.sum(axis=1), 1e-12)
+        n = len(graph)
+        centrality = matrix @ matrix.mean(axis=0)
+        teleport = centrality / centrality.sum()
+        dense = np.full(n, 1.0 / n)
+        for _ in range(200):
+            dense = 0.15 * teleport + 0.85 * graph @ (dense / degree)
+        assert np.allclose(textrank(matrix), dense, atol=1e-5)
+
+    def test_central_sentences_outrank_digressions(self):
+        scores = rank_sentences(_ON_TOPIC + _OFF_TOPIC)
+        assert scores[:len(_ON_TOPIC)].min() > scores[len(_ON_TOPIC):].max()
+
+
+# ──────────────────────────────────────────────
+# Tests — compress
+# ──────────────────────────────────────────────
+
+class TestCompress:
+    def test_short_text_is_untouched(self):
+        text = " ".join(_ON_TOPIC)
+        result = compress(text, budget=10_000, count=_words)
+        assert result["text"] == text
+        assert not result["compressed"]
+        assert result["ratio"] == 1.0 and result["tokens_saved"] == 0
+
+    def test_trims_to_budget_and_keeps_order(self):
+        sentences = [_OFF_TOPIC[0]] + _ON_TOPIC[:3] + [_OFF_TOPIC[1]] + _ON_TOPIC[3:] + [_OFF_TOPIC[2]]
+        text = " ".join(sentences)
+        result = compress(text, budget=40, count=_words)
+        assert result["compressed"]
+        assert result["tokens_after"] <= 40
+        assert result["tokens_saved"] == _words(text) - result["tokens_after"]
+        kept = [s for s in sentences if s in result["text"]]
+        assert " ".join(kept) == result["text"]
+        assert not any(s in result["text"] for s in _OFF_TOPIC)
+
+    def test_reports_ratio(self):
+        text = " ".join(_ON_TOPIC + _OFF_TOPIC)
+        result = compress(text, budget=30, count=_words)
+        assert result["ratio"] == round(result["tokens_after"] / _words(text), 3)
+        assert result["sentences_total"] == len(_ON_TOPIC) + len(_OFF_TOPIC)
+        assert 0 < result["sentences_kept"] < result["sentences_total"]
+
+
+# ──────────────────────────────────────────────
+# Tests — offline summaries
+# ──────────────────────────────────────────────
+
+class TestSummarizeExtractive:
+    def test_mmr_skips_near_duplicates(self):
+        sentences = [_ON_TOPIC[0], _ON_TOPIC[0], _ON_TOPIC[1], _ON_TOPIC[2]]
+        matrix = tfidf_matrix(sentences)
+        relevance = np.array([1.0, 1.0, 0.8, 0.6])
+        assert mmr_select(matrix, relevance, 2) in ([0, 2], [0, 3])
+
+    def test_length_follows_style(self):
+        assert summary_length("Concise", 100) == 5
+        assert summary_length("Detailed", 100) == 15
+        assert summary_length("ELI5", 3) == 2
+        assert summary_length("Unknown", 1) == 1
+
+    def test_summary_is_in_document_order(self):
+        sentences = [_OFF_TOPIC[0]] + _ON_TOPIC + _OFF_TOPIC[1:]
+        result = summarize_extractive(" ".join(sentences), "Concise")
+        picked = [s for s in sentences if s in result["summary"]]
+        assert result["summary"] == " ".join(picked)
+        assert result["sentences_kept"] == 2
+        assert result["sentences_total"] == len(sentences)
+        assert not any(s in result["summary"] for s in _OFF_TOPIC)
+
+    def test_bullet_points_style(self):
+        result = summarize_extractive(" ".join(_ON_TOPIC * 4), "Bullet Points")
+        lines = result["summary"].split("\n")
+        assert len(lines) == result["sentences_kept"] >= 3
+        assert all(line.startswith("• ") for line in lines)
+
+    def test_result_matches_llm_shape(self):
+        result = summarize_extractive(" ".join(_ON_TOPIC))
+        assert result["extractive"] is True
+        for key in ("summary", "elapsed", "ttft", "tokens_per_sec",
+                    "prompt_tokens", "completion_tokens", "total_tokens"):
+            assert key in result
+
+    def test_empty_text(self):
+        assert summarize_extractive("")["summary"] == ""
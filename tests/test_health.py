@@ -0,0 +1,73 @@
+"""
+Unit tests for the background llama.cpp health monitor.
+
+Run:
+    python -m pytest tests/test_health.py -v
+"""
+
+import time
+
+from services import llm_service
+from services.health_service import HealthMonitor, probe
+
+
+# ──────────────────────────────────────────────
+# Tests — probe
+# ──────────────────────────────────────────────
+
+class TestProbe:
+    def test_online_server_reports_latency_and_slots(self, fake_llama):
+        fake_llama.busy_slots = 1
+        status = probe()
+        assert status["online"] is True
+        assert status["status"] == "ok"
+        assert status["latency"] >= 0
+        assert (status["slots_idle"], status["slots_total"]) == (1, 2)
+        assert status["idle_slots"] == [1]
+
+    def test_loading_model_is_not_online(self, fake_llama):
+        fake_llama.loading = True
+        status = probe()
+        assert status["online"] is False
+        assert status["status"] == "loading"
+
+    def test_unreachable_server_is_offline(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "LLAMA_URL", "http://127.0.0.1:9")
+        status = probe()
+        assert status["online"] is False
+        assert status["status"] == "offline"
+
+
+# ──────────────────────────────────────────────
+# Tests — HealthMonitor
+# ──────────────────────────────────────────────
+
+class TestHealthMonitor:
+    def test_status_is_non_blocking_before_first_probe(self):
+        monitor = HealthMonitor()
+        t0 = time.time()
+        status = monitor.status()
+        assert time.time() - t0 < 0.1
+        assert status["status"] == "unknown" and status["online"] is False
+
+    def test_background_thread_updates_status(self, fake_llama):
+        monitor = HealthMonitor(interval=0.05).start()
+        try:
+            deadline = time.time() + 5
+            while not monitor.status()["online"] and time.time() < deadline:
+                time.sleep(0.02)
+            assert monitor.status()["online"] is True
+            fake_llama.loading = True
+            deadline = time.time() + 5
+            while monitor.status()["online"] and time.time() < deadline:
+                time.sleep(0.02)
+            assert monitor.status()["status"] == "loading"
+        finally:
+            monitor.stop()
+
+    def test_stale_status_counts_as_offline(self, fake_llama):
+        monitor = HealthMonitor(ttl=0.01)
+        monitor.refresh()
+        time.sleep(0.05)
+        status = monitor.status()
+        assert status["stale"] is True and status["online"] is False
@@ -0,0 +1,296 @@
+"""
+Unit tests for the LLM service (llama.cpp client).
+
+Requests go to the `fake_llama` stand-in server (see conftest.py), so no
+real llama.cpp instance is needed.
+
+Run:
+    python -m pytest tests/test_llm.py -v
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from services import llm_service
+from services.llm_service import (
+    ContextOverflowError, call_llm, coalesce_stats, count_tokens, http_request, pool_stats,
+    slot_for,
+)
+
+
+# ──────────────────────────────────────────────
+# Tests — call_llm
+# ──────────────────────────────────────────────
+
+class TestCallLLM:
+    def test_blocking_call_returns_summary_and_usage(self, fake_llama):
+        result = call_llm("Some text.", "You summarize.", 0.3, 128)
+        assert result["summary"] == "The quick summary."
+        assert result["prompt_tokens"] == 12
+        assert result["completion_tokens"] == 3
+        assert result["ttft"] == result["elapsed"]
+        assert fake_llama.payloads[-1]["stream"] is False
+
+    def test_streaming_reports_partial_summaries(self, fake_llama):
+        seen = []
+        result = call_llm("Some text.", "You summarize.", 0.3, 128, on_delta=seen.append)
+        assert seen == ["The ", "The quick ", "The quick summary."]
+        assert result["summary"] == "The quick summary."
+        assert result["completion_tokens"] == 3
+        assert 0 <= result["ttft"] <= result["elapsed"]
+        assert result["tokens_per_sec"] > 0
+        assert fake_llama.payloads[-1]["stream"] is True
+
+    def test_repeat_request_is_served_from_cache(self, fake_llama, summary_cache):
+        first = call_llm("Cached   text.", "You summarize.", 0.0, 128)
+        second = call_llm("Cached text.", "You summarize.", 0.0, 128)
+        assert len(fake_llama.payloads) == 1
+        assert first["cached"] is False and second["cached"] is True
+        assert second["cache_safe"] is True
+        assert second["summary"] == first["summary"]
+        assert second["completion_tokens"] == first["completion_tokens"]
+        assert summary_cache.stats()["hits"] == 1
+
+    def test_sampled_results_are_generated_again(self, fake_llama, summary_cache):
+        first = call_llm("Cached text.", "You summarize.", 0.7, 128)
+        second = call_llm("Cached text.", "You summarize.", 0.7, 128)
+        assert len(fake_llama.payloads) == 2
+        assert first["cached"] is False and second["cached"] is False
+        assert second["cache_safe"] is False
+
+    def test_cache_can_be_bypassed(self, fake_llama):
+        call_llm("Some text.", "You summarize.", 0.3, 128, use_cache=False)
+        call_llm("Some text.", "You summarize.", 0.3, 128, use_cache=False)
+        assert len(fake_llama.payloads) == 2
+
+    def test_connection_error_propagates(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "LLAMA_URL", "http://127.0.0.1:9")
+        with pytest.raises(requests.exceptions.ConnectionError):
+            call_llm("Some text.", "You summarize.", 0.3, 128)
+
+
+# ──────────────────────────────────────────────
+# Tests — shared HTTP client
+# ──────────────────────────────────────────────
+
+class TestPooledClient:
+    def test_keep_alive_reuses_connection(self, fake_llama):
+        url = f"{fake_llama.url}/health"
+        http_request("GET", url, timeout=5)
+        before = pool_stats()
+        for _ in range(3):
+            http_request("GET", url, timeout=5)
+        after = pool_stats()
+        assert after["requests"] - before["requests"] == 3
+        assert after["misses"] == before["misses"]
+        assert after["hits"] - before["hits"] == 3
+
+    def test_connection_refused_is_retried_then_raised(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "POOL_BACKOFF", 0.01)
+        before = pool_stats()["retries"]
+        with pytest.raises(requests.exceptions.ConnectionError):
+            http_request("GET", "http://127.0.0.1:9/", retries=2, timeout=1)
+        assert pool_stats()["retries"] - before == 2
+
+    def test_session_is_shared(self):
+        assert llm_service.get_session() is llm_service.get_session()
+
+
+# ──────────────────────────────────────────────
+# Tests — token counting & context budget
+# ──────────────────────────────────────────────
+
+class TestTokenBudget:
+    def test_count_tokens_uses_server_and_memoizes(self, fake_llama):
+        text = "日本語のテキストです。" * 10
+        assert count_tokens(text) == (len(text) + 3) // 4
+        count_tokens(text)
+        assert fake_llama.tokenize_calls == 1
+
+    def test_offline_falls_back_to_heuristic(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "LLAMA_URL", "http://127.0.0.1:9")
+        monkeypatch.setattr(llm_service, "_token_cache", OrderedDict())
+        monkeypatch.setattr(llm_service, "_failed_at", {})
+        assert count_tokens("one two three") == llm_service.estimate_tokens("one two three")
+
+    def test_missing_endpoints_are_not_asked_again(self, fake_llama):
+        fake_llama.legacy = True
+        for text in ("First call.", "Second call."):
+            assert llm_service.server_props() == {}
+            assert count_tokens(text) == llm_service.estimate_tokens(text)
+        assert (fake_llama.props_calls, fake_llama.tokenize_calls) == (1, 1)
+        fake_llama.legacy = False
+        assert llm_service.server_props(refresh=True)["total_slots"] == 2
+        assert count_tokens("Third call.") == 3
+
+    def test_max_tokens_is_clamped_to_context(self, fake_llama):
+        fake_llama.n_ctx = 512
+        text = "x" * 1200  # ≈ 300 tokens with the fake tokenizer
+        call_llm(text, "You summarize.", 0.3, 4096)
+        sent = fake_llama.payloads[-1]["max_tokens"]
+        assert 16 <= sent < 512 - 300
+
+    def test_oversize_prompt_is_refused_before_sending(self, fake_llama):
+        fake_llama.n_ctx = 256
+        with pytest.raises(ContextOverflowError):
+            call_llm("x" * 4000, "You summarize.", 0.3, 128)
+        assert fake_llama.payloads == []
+
+
+# ──────────────────────────────────────────────
+# Tests — prompt cache reuse
+# ──────────────────────────────────────────────
+
+class TestPromptCache:
+    def test_requests_enable_prompt_cache_and_pin_slot(self, fake_llama):
+        call_llm("A document.", "You summarize.", 0.3, 128)
+        payload = fake_llama.payloads[-1]
+        assert payload["cache_prompt"] is True
+        assert payload["id_slot"] == slot_for("You summarize.")
+        assert 0 <= payload["id_slot"] < 2
+
+    def test_documents_of_one_style_share_its_slot(self, fake_llama):
+        call_llm("First document.", "Style prompt.", 0.3, 128, use_cache=False)
+        call_llm("Second document.", "Style prompt.", 0.3, 128, use_cache=False)
+        assert {p["id_slot"] for p in fake_llama.payloads} == {slot_for("Style prompt.")}
+
+    def test_busy_slot_is_not_pinned(self, fake_llama):
+        fake_llama.delay = 0.3
+        _concurrently(2, lambda i: call_llm(f"Document {i}.", "You summarize.", 0.3, 128,
+                                            use_cache=False))
+        assert sorted(p["id_slot"] for p in fake_llama.payloads) == [-1, slot_for("You summarize.")]
+
+    def test_slot_busy_on_the_server_is_not_pinned(self, fake_llama):
+        router = llm_service.router()
+        router.report_health(fake_llama.url, True, 2, idle_slots=[])
+        call_llm("A document.", "You summarize.", 0.3, 128)
+        assert fake_llama.payloads[-1]["id_slot"] == -1
+        router.report_health(fake_llama.url, True, 2, idle_slots=[0, 1])
+        call_llm("A document.", "You summarize.", 0.3, 128, use_cache=False)
+        assert fake_llama.payloads[-1]["id_slot"] == slot_for("You summarize.")
+
+    def test_rerun_reuses_prompt_and_reports_timings(self, fake_llama):
+        text = "A long document. " * 50
+        first = call_llm(text, "You summarize.", 0.3, 128, use_cache=False)
+        second = call_llm(text, "You summarize.", 0.3, 128, use_cache=False)
+        assert first["prompt_cached_tokens"] == 0
+        assert second["prompt_cached_tokens"] > 0
+        assert second["prompt_eval_ms"] < first["prompt_eval_ms"]
+        assert second["prompt_saved_ms"] > 0
+        assert "predicted_ms" in second["timings"]
+
+    def test_prefix_is_byte_identical_for_same_style(self, fake_llama):
+        call_llm("First document.", "Style prompt.", 0.3, 128, use_cache=False)
+        call_llm("Second document.", "Style prompt.", 0.3, 128, use_cache=False)
+        first, second = (p["messages"] for p in fake_llama.payloads)
+        assert first[0] == second[0]
+
+    def test_batch_callers_can_skip_pinning(self, fake_llama):
+        call_llm("A document.", "You summarize.", 0.3, 128, pin_slot=False)
+        assert fake_llama.payloads[-1]["id_slot"] == -1
+
+
+# ──────────────────────────────────────────────
+# Tests — single-flight coalescing
+# ──────────────────────────────────────────────
+
+def _concurrently(n, fn):
+    barrier = threading.Barrier(n)
+
+    def run(i):
+        barrier.wait()
+        return fn(i)
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(run, range(n)))
+
+
+class _SessionStopped(BaseException):
+    """Stands in for Streamlit's RerunException / StopException."""
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+class TestSingleFlight:
+    def test_identical_concurrent_requests_share_one_generation(self, fake_llama):
+        fake_llama.delay = 0.3
+        before = coalesce_stats()
+        results = _concurrently(
+            4, lambda i: call_llm("Team memo.", "You summarize.", 0.3, 128, use_cache=False))
+        assert len(fake_llama.payloads) == 1
+        assert {r["summary"] for r in results} == {"The quick summary."}
+        assert sum(bool(r.get("coalesced")) for r in results) == 3
+        after = coalesce_stats()
+        assert after["coalesced"] - before["coalesced"] == 3
+        assert after["generations"] - before["generations"] == 1
+        assert after["in_flight"] == 0
+
+    def test_different_settings_are_not_coalesced(self, fake_llama):
+        fake_llama.delay = 0.2
+        _concurrently(2, lambda i: call_llm("Team memo.", "You summarize.", 0.3, 128 + i))
+        assert len(fake_llama.payloads) == 2
+
+    def test_followers_receive_the_stream(self, fake_llama):
+        fake_llama.delay = 0.3
+        seen = [[], []]
+        _concurrently(2, lambda i: call_llm("Team memo.", "You summarize.", 0.3, 128,
+                                            on_delta=seen[i].append))
+        assert len(fake_llama.payloads) == 1
+        assert all(s and s[-1] == "The quick summary." for s in seen)
+
+    def test_leader_error_reaches_followers(self, fake_llama):
+        fake_llama.delay = 0.3
+        fake_llama.fail_status = 400
+
+        def call(i):
+            try:
+                call_llm("Team memo.", "You summarize.", 0.3, 128)
+            except requests.exceptions.HTTPError:
+                return "error"
+
+        assert _concurrently(3, call) == ["error"] * 3
+        assert coalesce_stats()["in_flight"] == 0
+
+    def test_stopped_leader_does_not_stop_followers(self, fake_llama):
+        fake_llama.delay = 0.3
+        joined = coalesce_stats()["coalesced"] + 1
+
+        def stop(partial):
+            _wait_for(lambda: coalesce_stats()["coalesced"] >= joined)
+            raise _SessionStopped()
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(call_llm, "Team memo.", "You summarize.", 0.3, 128,
+                                 on_delta=stop)
+            _wait_for(lambda: coalesce_stats()["in_flight"] == 1)
+            follower = pool.submit(call_llm, "Team memo.", "You summarize.", 0.3, 128)
+            with pytest.raises(_SessionStopped):
+                leader.result(timeout=10)
+            assert follower.result(timeout=10)["summary"] == "The quick summary."
+        assert len(fake_llama.payloads) == 2
+        assert coalesce_stats()["in_flight"] == 0
+
+    def test_failing_leader_callback_does_not_abort_generation(self, fake_llama):
+        fake_llama.delay = 0.3
+
+        def broken(partial):
+            raise ValueError("widget gone")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(call_llm, "Team memo.", "You summarize.", 0.3, 128,
+                                 on_delta=broken)
+            _wait_for(lambda: coalesce_stats()["in_flight"] == 1)
+            follower = pool.submit(call_llm, "Team memo.", "You summarize.", 0.3, 128)
+            assert leader.result(timeout=10)["summary"] == "The quick summary."
+            assert follower.result(timeout=10)["summary"] == "The quick summary."
+        assert len(fake_llama.payloads) == 1
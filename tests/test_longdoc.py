@@ -0,0 +1,124 @@
+"""
+Unit tests for the long-document (map-reduce) service.
+
+Run:
+    python -m pytest tests/test_longdoc.py -v
+"""
+
+import threading
+import time
+
+from services import llm_service
+from services import longdoc_service
+from services.longdoc_service import (
+    CHUNK_TOKENS, chunk_budget, chunk_text, needs_chunking, split_sentences, summarize_long,
+)
+
+
+# ──────────────────────────────────────────────
+# Fixtures
+# ──────────────────────────────────────────────
+
+def _document(n_sentences: int) -> str:
+    return " ".join(f"Sentence number {i} talks about topic {i % 7}." for i in range(n_sentences))
+
+
+class _RecordingLLM:
+    """Stand-in for `call_llm` that records prompts and overlapping calls."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text, system_prompt, temperature, max_tokens, on_delta=None, **kwargs):
+        with self.lock:
+            self.calls.append((text, system_prompt))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        summary = f"summary of {len(text.split())} words"
+        if on_delta:
+            on_delta(summary)
+        return {"summary": summary, "elapsed": self.delay, "ttft": self.delay,
+                "tokens_per_sec": 1.0, "prompt_tokens": 10,
+                "completion_tokens": 5, "total_tokens": 15}
+
+
+# ──────────────────────────────────────────────
+# Tests — chunking
+# ──────────────────────────────────────────────
+
+class TestChunking:
+    def test_split_sentences_latin_and_cjk(self):
+        assert split_sentences("One. Two? Three!") == ["One.", "Two?", "Three!"]
+        assert split_sentences("今日は晴れ。明日は雨！") == ["今日は晴れ。", "明日は雨！"]
+
+    def test_chunks_respect_budget_and_sentence_boundaries(self):
+        text = _document(200)
+        chunks = chunk_text(text, budget=100)
+        assert len(chunks) > 1
+        for chunk in chunks:
+            # Per-sentence counts are summed, so allow rounding slack
+            assert llm_service.estimate_tokens(chunk) <= 105
+            assert chunk.endswith(".")
+        assert " ".join(chunks) == text
+
+    def test_oversized_sentence_is_split(self):
+        text = " ".join(["word"] * 500) + "."
+        chunks = chunk_text(text, budget=50)
+        assert len(chunks) > 1
+        assert all(llm_service.estimate_tokens(c) <= 50 for c in chunks)
+
+    def test_budget_shrinks_to_context_window(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "context_size", lambda: 0)
+        assert chunk_budget() == CHUNK_TOKENS
+        monkeypatch.setattr(llm_service, "context_size", lambda: 1024)
+        assert chunk_budget() < 1024 - 384
+
+    def test_short_text_is_one_chunk(self):
+        assert chunk_text("Just one short sentence.", budget=100) == ["Just one short sentence."]
+
+    def test_chunking_only_when_request_overflows_context(self, monkeypatch):
+        monkeypatch.setattr(longdoc_service, "count_tokens", llm_service.estimate_tokens)
+        text = _document(400)  # several thousand tokens, above CHUNK_TOKENS
+        tokens = llm_service.estimate_tokens(text)
+        assert tokens > CHUNK_TOKENS
+        assert not needs_chunking(text, "Summarize.", max_tokens=1024, n_ctx=32768)
+        assert needs_chunking(text, "Summarize.", max_tokens=1024, n_ctx=tokens + 512)
+        assert needs_chunking(text, n_ctx=0)  # unknown window — chunk above CHUNK_TOKENS
+
+
+# ──────────────────────────────────────────────
+# Tests — summarize_long
+# ──────────────────────────────────────────────
+
+class TestSummarizeLong:
+    def test_map_runs_in_parallel_then_reduces(self, monkeypatch):
+        fake = _RecordingLLM(delay=0.05)
+        monkeypatch.setattr(llm_service, "call_llm", fake)
+        progress = []
+        result = summarize_long(_document(200), "Bullet Points", "French", "", 0.3, 512,
+                                on_progress=lambda d, t: progress.append((d, t)),
+                                parallel=4, budget=200)
+        n = result["chunks"]
+        assert n > 1
+        assert len(fake.calls) == n + 1
+        assert fake.peak > 1
+        assert progress[-1] == (n, n)
+        # Every pass keeps the user's style and language
+        for _, system in fake.calls:
+            assert "bullet-point" in system and "French" in system
+        assert "partial summaries" in fake.calls[-1][1]
+        assert result["total_tokens"] == 15 * (n + 1)
+
+    def test_reduce_streams_to_on_delta(self, monkeypatch):
+        monkeypatch.setattr(llm_service, "call_llm", _RecordingLLM())
+        seen = []
+        summarize_long(_document(100), "Concise", "Auto (same as input)", "", 0.3, 256,
+                       on_delta=seen.append, parallel=2, budget=200)
+        assert len(seen) == 1
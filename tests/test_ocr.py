@@ -6,11 +6,24 @@ Run:
     python -m pytest tests/test_ocr.py -v
 """
 
+import gc
 import io
+import os
+import random
+import struct
+import weakref
+import zlib
+from collections import OrderedDict
+
+import numpy as np
 import pytest
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
-from services.ocr_service import extract_text_from_image, OCRError, _preprocess_image
+from services import ocr_service
+from services.ocr_service import (
+    extract_text_from_image, extract_text_from_images, join_pages, reader_status, warm_up,
+    warm_up_async, ImageTooLargeError, OCRError, _preprocess_image,
+)
 
 
 # ──────────────────────────────────────────────
@@ -57,6 +70,52 @@ class TestPreprocess:
         assert result.mode == "L"
 
 
+# ──────────────────────────────────────────────
+# Tests — fused NumPy/OpenCV preprocessing
+# ──────────────────────────────────────────────
+
+def _oriented_png(orientation: int) -> bytes:
+    img = _make_text_image("Up", size=(60, 40))
+    ImageDraw.Draw(img).rectangle((2, 2, 12, 8), fill="red")
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", exif=exif)
+    return buf.getvalue()
+
+
+class TestFastPreprocess:
+    @pytest.mark.parametrize("orientation", range(1, 9))
+    def test_orientation_matches_pil(self, orientation):
+        raw = _oriented_png(orientation)
+        expected = np.asarray(
+            ImageOps.exif_transpose(Image.open(io.BytesIO(raw)).convert("RGB")).convert("L"))
+        assert np.array_equal(ocr_service._gray_array(Image.open(io.BytesIO(raw))), expected)
+
+    def test_sharpen_matches_pil(self):
+        arr = np.asarray(_make_text_image("Sharp", size=(120, 60)).convert("L"))
+        expected = np.asarray(Image.fromarray(arr).filter(ImageFilter.SHARPEN))
+        diff = np.abs(ocr_service._sharpen(arr).astype(int) - expected.astype(int))
+        assert diff.max() <= 1  # rounding only
+
+    @pytest.mark.parametrize("mode", ["RGBA", "P", "L", "1"])
+    def test_output_is_contiguous_uint8_grayscale(self, mode):
+        img = Image.new("RGB", (100, 80), "blue").convert(mode)
+        arr = ocr_service.preprocess(img)
+        assert arr.shape == (80, 100) and arr.dtype == np.uint8
+        assert arr.flags["C_CONTIGUOUS"]
+
+    def test_large_image_is_resized(self):
+        arr = ocr_service.preprocess(Image.new("RGB", (8000, 6000), "white"))
+        assert max(arr.shape) <= 4000
+
+    def test_benchmark_reports_stages_for_both_backends(self):
+        report = ocr_service.benchmark_preprocess(_image_to_bytes(_make_text_image("Hi")),
+                                                  repeat=1)
+        assert {"decode", "orient", "resize", "grayscale", "sharpen", "total"} <= set(report["pil"])
+        assert set(report["pil"]) == set(report["opencv"])
+
+
 # ──────────────────────────────────────────────
 # Tests — extract_text_from_image
 # ──────────────────────────────────────────────
@@ -95,6 +154,167 @@ class TestExtractText:
             extract_text_from_image(b"not-an-image")
 
 
+# ──────────────────────────────────────────────
+# Tests — structured output
+# ──────────────────────────────────────────────
+
+class _ScriptedReader:
+    """Stand-in reader returning fixed `(box, text, confidence)` detections."""
+
+    def __init__(self, detections):
+        self.detections = detections
+        self.calls = 0
+
+    def readtext(self, img_array, detail=1, **kwargs):
+        self.calls += 1
+        return [([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, conf)
+                for (x0, y0, x1, y1), text, conf in self.detections]
+
+    def recognize(self, img_array, horizontal_list=None, free_list=None, detail=1, **kwargs):
+        return self.readtext(img_array, detail)
+
+
+class TestStructured:
+    DETECTIONS = [
+        ((200, 10, 300, 40), "World", 0.95),
+        ((10, 12, 150, 42), "Hello", 0.90),
+        ((10, 60, 90, 90), "#~%", 0.05),
+        ((100, 60, 200, 90), "again", 0.80),
+    ]
+
+    @pytest.fixture
+    def reader(self, monkeypatch):
+        reader = _ScriptedReader(self.DETECTIONS)
+        monkeypatch.setattr(ocr_service, "_get_reader", lambda langs: reader)
+        return reader
+
+    def test_blocks_carry_boxes_confidence_and_reading_order(self, reader):
+        result = ocr_service.ocr_image(_image_to_bytes(_make_text_image("Hi")), ["en"])
+        assert [b["text"] for b in result["blocks"]] == ["Hello", "World", "again"]
+        assert [b["order"] for b in result["blocks"]] == [0, 1, 3]
+        assert result["blocks"][0]["bbox"] == [10.0, 12.0, 150.0, 42.0]
+        assert result["blocks"][0]["confidence"] == pytest.approx(0.90)
+        assert result["text"] == "Hello World\nagain"
+
+    def test_low_confidence_blocks_are_dropped_and_counted(self, reader):
+        result = ocr_service.ocr_image(_image_to_bytes(_make_text_image("Hi")), ["en"])
+        assert [b["text"] for b in result["dropped"]] == ["#~%"]
+        assert result["dropped_chars"] == 3
+
+    def test_floor_changes_without_rerunning_ocr(self, reader):
+        raw = _image_to_bytes(_make_text_image("Hi"))
+        assert "#~%" in ocr_service.ocr_image(raw, ["en"], min_confidence=0.0)["text"]
+        strict = ocr_service.ocr_image(raw, ["en"], min_confidence=0.85)
+        assert strict["text"] == "Hello World" and reader.calls == 1
+
+    def test_batch_can_yield_structured_results(self, reader):
+        pages = [_image_to_bytes(_make_text_image("Hi")), b"broken"]
+        results = list(extract_text_from_images(pages, langs=["en"], structured=True))
+        assert results[0][1]["dropped_chars"] == 3 and results[0][2] is None
+        assert results[1][1]["text"] == "" and isinstance(results[1][2], OCRError)
+
+
+# ──────────────────────────────────────────────
+# Tests — automatic language selection
+# ──────────────────────────────────────────────
+
+class _ReadersByLangs:
+    """Stand-in readers per language set: `readers[("ar", "en")] = (text, confidence)`."""
+
+    def __init__(self):
+        self.scripted: dict = {}
+        self.used: list = []
+
+    def __setitem__(self, langs, detection):
+        self.scripted[langs] = detection
+
+    def get(self, langs):
+        text, conf = self.scripted.get(tuple(langs), ("", 0.0))
+        self.used.append(tuple(langs))
+        return _ScriptedReader([((10, 10, 200, 40), text, conf)] if text else [])
+
+
+class TestAutoLanguages:
+    @pytest.fixture
+    def readers(self, monkeypatch):
+        readers = _ReadersByLangs()
+        monkeypatch.setattr(ocr_service, "_get_reader", readers.get)
+        monkeypatch.setattr(ocr_service, "_reader_cache", OrderedDict())
+        return readers
+
+    def test_script_shares(self):
+        assert ocr_service.script_shares("Hello world")["latin"] == 1.0
+        assert ocr_service.script_shares("مرحبا بالعالم")["arabic"] == 1.0
+        shares = ocr_service.script_shares("東京 です")
+        assert shares["japanese"] == 1.0 and shares["chinese"] == 0.5
+        assert ocr_service.script_shares("123 !?") == {}
+
+    def test_confident_latin_probe_stops_early(self, readers):
+        readers[("en", "fr")] = ("Invoice total", 0.9)
+        page = ocr_service.preprocess(_make_text_image("Invoice total"))
+        assert ocr_service.detect_languages(page) == ["en", "fr"]
+        assert set(readers.used) == {("en", "fr")}
+
+    def test_arabic_page_gets_the_arabic_reader(self, readers):
+        readers[("en", "fr")] = ("lgJl ~ \\", 0.2)
+        readers[("ar", "en")] = ("مرحبا بالعالم", 0.8)
+        page = ocr_service.preprocess(_make_text_image("Hi"))
+        assert ocr_service.detect_languages(page) == ["ar", "en"]
+        assert readers.used == [("en", "fr"), ("ar", "en")]
+
+    def test_candidates_are_tried_until_one_is_confident(self, readers):
+        readers[("en", "fr")] = ("lgJl ~ \\", 0.2)
+        readers[("ko", "en")] = ("안녕하세요", 0.7)
+        page = ocr_service.preprocess(_make_text_image("Hi"))
+        assert ocr_service.detect_languages(page) == ["ko", "en"]
+        assert readers.used == [("en", "fr"), ("ar", "en"), ("ch_sim", "en"),
+                                ("ja", "en"), ("ko", "en")]
+
+    def test_devanagari_is_a_candidate(self, readers):
+        readers[("en", "fr")] = ("lgJl ~ \\", 0.2)
+        readers[("hi", "en")] = ("नमस्ते दुनिया", 0.7)
+        page = ocr_service.preprocess(_make_text_image("Hi"))
+        assert ocr_service.detect_languages(page) == ["hi", "en"]
+
+    def test_scripts_with_a_cached_reader_go_first(self, readers):
+        ocr_service._reader_cache[("en", "ko")] = object()
+        readers[("en", "fr")] = ("lgJl ~ \\", 0.2)
+        readers[("ko", "en")] = ("안녕하세요", 0.7)
+        page = ocr_service.preprocess(_make_text_image("Hi"))
+        assert ocr_service.detect_languages(page) == ["ko", "en"]
+        assert readers.used == [("en", "fr"), ("ko", "en")]
+
+    def test_unsure_page_keeps_the_default_languages(self, readers):
+        readers[("en", "fr")] = ("lgJl ~ \\", 0.2)  # no candidate does better
+        page = ocr_service.preprocess(_make_text_image("Hi"))
+        langs, score = ocr_service.probe_languages(page)
+        assert langs == ["en", "fr"] and score < ocr_service.PROBE_CONFIDENCE
+        assert len(readers.used) == 1 + len(ocr_service.AUTO_SCRIPTS)
+
+    def test_nothing_to_read_probes_no_candidate(self, readers):
+        page = ocr_service.preprocess(_make_text_image("Hi"))
+        assert ocr_service.detect_languages(page) == ["en", "fr"]
+        assert readers.used == [("en", "fr")]
+
+    def test_auto_result_reports_languages_and_is_cached(self, readers):
+        readers[("en", "fr")] = ("x", 0.1)
+        readers[("ko", "en")] = ("안녕하세요", 0.7)
+        raw = _image_to_bytes(_make_text_image("Hi"))
+        first = ocr_service.ocr_image(raw, ocr_service.AUTO_LANGS)
+        assert first["langs"] == ["ko", "en"] and first["text"] == "안녕하세요"
+        readers.used.clear()
+        assert ocr_service.ocr_image(raw, ocr_service.AUTO_LANGS) == first
+        assert readers.used == []
+
+    def test_unsure_auto_result_is_not_cached(self, readers):
+        readers[("en", "fr")] = ("lgJl ~ \\", 0.2)
+        raw = _image_to_bytes(_make_text_image("Hi"))
+        assert ocr_service.ocr_image(raw, ocr_service.AUTO_LANGS)["langs"] == ["en", "fr"]
+        readers.used.clear()
+        ocr_service.ocr_image(raw, ocr_service.AUTO_LANGS)
+        assert readers.used[0] == ("en", "fr")
+
+
 # ──────────────────────────────────────────────
 # Tests — edge cases
 # ──────────────────────────────────────────────
@@ -111,3 +331,450 @@ class TestEdgeCases:
         img = Image.new("P", (200, 100))
         result = extract_text_from_image(img, langs=["en"])
         assert isinstance(result, str)
+
+
+# ──────────────────────────────────────────────
+# Tests — decode budget
+# ──────────────────────────────────────────────
+
+def _png_header(width: int, height: int) -> bytes:
+    """A PNG whose header claims `width`×`height` but carries no pixel data."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data)))
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr)
+            + chunk(b"IDAT", zlib.compress(b"")) + chunk(b"IEND", b""))
+
+
+class TestDecodeBudget:
+    def test_oversized_header_rejected_before_decode(self):
+        # Decoding would fail on the missing data; the header check comes first
+        with pytest.raises(ImageTooLargeError, match="exceeds"):
+            extract_text_from_image(_png_header(9000, 9000), langs=["en"])
+
+    def test_decompression_bomb_rejected(self):
+        with pytest.raises(ImageTooLargeError):
+            extract_text_from_image(_png_header(20000, 20000), langs=["en"])
+
+    def test_large_jpeg_decoded_at_reduced_scale(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "MAX_PIXELS", 1_000_000)
+        raw = _image_to_bytes(Image.new("RGB", (2000, 1600), "white"), fmt="JPEG")
+        img = ocr_service._load_image(raw)
+        assert img.size == (1000, 800) and img.mode == "L"
+
+    def test_jpeg_drafted_to_max_dimension_without_tiling(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "TILED", False)
+        monkeypatch.setattr(ocr_service, "MAX_DIMENSION", 500)
+        raw = _image_to_bytes(Image.new("RGB", (2000, 1600), "white"), fmt="JPEG")
+        assert ocr_service._load_image(raw).size == (500, 400)
+
+    def test_png_within_budget_is_untouched(self):
+        img = ocr_service._load_image(_image_to_bytes(Image.new("RGB", (600, 400))))
+        assert img.size == (600, 400) and img.mode == "RGB"
+
+
+# ──────────────────────────────────────────────
+# Tests — text-presence pre-check
+# ──────────────────────────────────────────────
+
+def _no_reader(langs):
+    raise AssertionError("EasyOCR should not run on a blank image")
+
+
+class TestTextCheck:
+    def test_text_scores_above_blank_and_gradient(self):
+        text = ocr_service.preprocess(_make_text_image("Hi"))
+        gradient = np.tile(np.linspace(0, 255, 800).astype(np.uint8), (600, 1))
+        assert ocr_service.text_score(text) >= ocr_service.TEXT_THRESHOLD
+        assert ocr_service.text_score(gradient) < ocr_service.TEXT_THRESHOLD
+        assert ocr_service.text_score(np.full((1, 1), 255, np.uint8)) == 0.0
+
+    def test_blank_image_skips_the_reader(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "_get_reader", _no_reader)
+        before = ocr_service.text_check_stats()
+        assert extract_text_from_image(Image.new("RGB", (800, 600), "white")) == ""
+        after = ocr_service.text_check_stats()
+        assert after["skipped"] == before["skipped"] + 1
+        assert after["checked"] == before["checked"] + 1
+
+    def test_blank_large_page_skips_tiling(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "_get_reader", _no_reader)
+        assert extract_text_from_image(Image.new("L", (6000, 4500), 240)) == ""
+
+    def test_threshold_is_configurable(self, size_reader, monkeypatch):
+        monkeypatch.setattr(ocr_service, "TEXT_CHECK", True)
+        monkeypatch.setattr(ocr_service, "TEXT_THRESHOLD", 0.0)
+        img = Image.new("RGB", (600, 100), "white")
+        assert extract_text_from_image(img, langs=["en"]) == "width 600"
+
+
+# ──────────────────────────────────────────────
+# Tests — extract_text_from_images (batch)
+# ──────────────────────────────────────────────
+
+class TestBatch:
+    def test_results_stream_in_input_order(self, size_reader):
+        pages = [_image_to_bytes(Image.new("RGB", (100 + i, 50), "white")) for i in range(6)]
+        results = list(extract_text_from_images(pages, langs=["en"]))
+        assert [i for i, _, _ in results] == list(range(6))
+        assert [t for _, t, _ in results] == [f"width {100 + i}" for i in range(6)]
+        assert size_reader.calls == 6
+
+    def test_bad_page_does_not_stop_the_batch(self, size_reader):
+        good = _image_to_bytes(Image.new("RGB", (120, 50), "white"))
+        results = list(extract_text_from_images([good, b"not-an-image", good]))
+        assert [e is None for _, _, e in results] == [True, False, True]
+        assert isinstance(results[1][2], OCRError) and results[1][1] == ""
+        assert results[2][1] == "width 120"
+
+    def test_empty_batch_yields_nothing(self):
+        assert list(extract_text_from_images([])) == []
+
+    def test_join_pages_adds_markers(self):
+        assert join_pages(["only"]) == "only"
+        joined = join_pages(["first", "second"])
+        assert joined.index("Page 1") < joined.index("first") < joined.index("Page 2")
+
+
+# ──────────────────────────────────────────────
+# Tests — reader cache
+# ──────────────────────────────────────────────
+
+class _FakeEasyReader:
+    """
+    Stand-in for `easyocr.Reader` with small torch modules as weights;
+    `quantize=True` really quantizes the recognizer, which then misreads "0" as "O".
+    """
+
+    truth: dict = {}  # line image width -> its text, for `recognize`
+
+    def __init__(self, langs, gpu=True, detector=True, quantize=True, **kwargs):
+        import torch
+        self.langs = langs
+        self.recognizer = torch.nn.Sequential(torch.nn.Linear(64, 64))  # 64*64*4 + 64*4 bytes
+        if quantize:
+            torch.quantization.quantize_dynamic(self.recognizer, dtype=torch.qint8, inplace=True)
+        self.quantize = quantize
+        self.detector = torch.nn.Linear(128, 128) if detector else None
+        self.get_textbox = object() if detector else None
+        self.detect_network = "craft"
+
+    def recognize(self, img, detail=1, **kwargs):
+        text = self.truth[img.shape[1]]
+        return [text.replace("0", "O") if self.quantize else text]
+
+
+@pytest.fixture
+def fake_easyocr(monkeypatch):
+    import easyocr
+    monkeypatch.setattr(easyocr, "Reader", _FakeEasyReader)
+    monkeypatch.setattr(ocr_service, "_reader_cache", OrderedDict())
+    monkeypatch.setattr(ocr_service, "_reader_bytes", {})
+    monkeypatch.setattr(ocr_service, "_reader_precision", {})
+    monkeypatch.setattr(ocr_service, "_precision_overrides", {})
+    monkeypatch.setattr(ocr_service, "_shared_detector", None)
+
+
+@pytest.mark.usefixtures("fake_easyocr")
+class TestReaderCache:
+    RECOGNIZER_BYTES = 64 * 64 * 4 + 64 * 4
+
+    @pytest.fixture(autouse=True)
+    def fp32(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "READER_PRECISION", "fp32")  # plain byte sizes
+
+    def test_least_recently_used_reader_is_evicted(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "READER_CACHE_SIZE", 2)
+        en = ocr_service._get_reader(["en"])
+        ocr_service._get_reader(["fr"])
+        assert ocr_service._get_reader(["en"]) is en  # now most recent
+        ocr_service._get_reader(["de"])
+        cached = [r["langs"] for r in ocr_service.reader_cache_info()["readers"]]
+        assert cached == [["en"], ["de"]]
+
+    def test_byte_budget_bounds_the_cache(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "READER_CACHE_MB", 1)
+        monkeypatch.setattr(ocr_service, "_module_bytes", lambda m: 600_000 if m else 0)
+        ocr_service._get_reader(["en"])
+        ocr_service._get_reader(["fr"])
+        assert [r["langs"] for r in ocr_service.reader_cache_info()["readers"]] == [["fr"]]
+
+    def test_detector_is_shared(self):
+        en = ocr_service._get_reader(["en"])
+        ar = ocr_service._get_reader(["ar", "en"])
+        assert ar.detector is en.detector and ar.get_textbox is en.get_textbox
+        info = ocr_service.reader_cache_info()
+        assert [r["bytes"] for r in info["readers"]] == [self.RECOGNIZER_BYTES] * 2
+        assert info["detector_bytes"] == 128 * 128 * 4 + 128 * 4
+        assert info["total_bytes"] == info["detector_bytes"] + 2 * self.RECOGNIZER_BYTES
+
+    def test_evicting_the_first_reader_frees_it(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "READER_CACHE_SIZE", 1)
+        first = weakref.ref(ocr_service._get_reader(["en"]))
+        fr = ocr_service._get_reader(["fr"])
+        gc.collect()
+        assert first() is None  # only its detector is kept for sharing
+        assert fr.detector is not None
+        assert ocr_service.reader_cache_info()["detector_bytes"] == 128 * 128 * 4 + 128 * 4
+
+    def test_reader_lock_does_not_wait_for_a_build(self):
+        with ocr_service._reader_init_lock:  # another reader is loading
+            lock = ocr_service._reader_lock(["en"])
+        assert lock.acquire(timeout=1)
+        lock.release()
+
+    def test_default_reader_is_never_evicted(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "READER_CACHE_SIZE", 1)
+        default = ocr_service._get_reader(ocr_service.DEFAULT_LANGS)
+        ocr_service._get_reader(["ar", "en"])
+        ocr_service._get_reader(["ko", "en"])
+        cached = [r["langs"] for r in ocr_service.reader_cache_info()["readers"]]
+        assert cached == [["en", "fr"], ["en", "ko"]]
+        assert ocr_service._get_reader(ocr_service.DEFAULT_LANGS) is default
+
+    def test_evicted_reader_reports_cold(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "READER_CACHE_SIZE", 1)
+        monkeypatch.setattr(ocr_service, "_reader_state", {("en",): "ready"})
+        ocr_service._get_reader(["en"])
+        ocr_service._get_reader(["fr"])
+        assert reader_status(["en"]) == "cold"
+
+
+# ──────────────────────────────────────────────
+# Tests — CPU thread budget
+# ──────────────────────────────────────────────
+
+class TestThreadBudget:
+    @pytest.fixture(autouse=True)
+    def restore(self, monkeypatch):
+        import torch
+        affinity, threads = os.sched_getaffinity(0), torch.get_num_threads()
+        monkeypatch.setenv("OMP_NUM_THREADS", os.environ.get("OMP_NUM_THREADS", ""))
+        monkeypatch.setenv("MKL_NUM_THREADS", os.environ.get("MKL_NUM_THREADS", ""))
+        monkeypatch.setattr(ocr_service, "_budget", None)
+        yield
+        os.sched_setaffinity(0, affinity)
+        torch.set_num_threads(threads)
+
+    def test_cpu_list_parsing(self):
+        assert ocr_service._parse_cpus("0-3, 6") == [0, 1, 2, 3, 6]
+        assert ocr_service._parse_cpus("") == []
+
+    def test_default_split_leaves_cores_to_the_llm(self):
+        settings = ocr_service.thread_settings()
+        assert settings["threads"] == ocr_service.OCR_THREADS >= 1
+        assert settings["llm_cores"] == settings["cores"] - ocr_service.OCR_THREADS
+
+    def test_budget_is_applied_and_reported(self):
+        cpu = sorted(os.sched_getaffinity(0))[0]
+        settings = ocr_service.apply_thread_budget(threads=2, interop=1, cpus=[cpu])
+        assert os.environ["OMP_NUM_THREADS"] == "2"
+        assert settings["affinity"] == [cpu]
+        assert settings["threads"] == 2 and settings["intra_op"] == 2  # torch already loaded
+
+
+# ──────────────────────────────────────────────
+# Tests — recognizer precision
+# ──────────────────────────────────────────────
+
+@pytest.mark.usefixtures("fake_easyocr")
+class TestPrecision:
+    def test_default_reader_is_int8(self):
+        ocr_service._get_reader(["en"])
+        info = ocr_service.reader_cache_info()["readers"][0]
+        assert info["precision"] == "int8"
+        assert info["bytes"] < 64 * 64 * 4  # packed int8 weights
+
+    def test_precision_is_selectable_per_reader(self):
+        int8 = ocr_service._get_reader(["en"])
+        ocr_service.set_reader_precision(["ar", "en"], "fp32")
+        ar = ocr_service._get_reader(["en", "ar"])
+        assert int8.quantize is True and ar.quantize is False
+        assert ocr_service.reader_precision(["ar", "en"]) == "fp32"
+        assert ocr_service.reader_precision(["en"]) == "int8"
+
+    def test_settings_from_another_process_are_adopted(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "READER_PRECISION", "int8")
+        en = ocr_service._get_reader(["en"])
+        fr = ocr_service._get_reader(["fr"])
+        ocr_service.apply_precision_settings({"default": "int8", "overrides": {("fr",): "fp32"}})
+        assert ocr_service._get_reader(["en"]) is en
+        assert ocr_service._get_reader(["fr"]) is not fr
+        assert ocr_service.precision_settings()["overrides"] == {("fr",): "fp32"}
+
+    def test_changing_precision_rebuilds_the_reader(self):
+        first = ocr_service._get_reader(["en"])
+        ocr_service.set_reader_precision(["en"], "fp32")
+        assert ocr_service._get_reader(["en"]) is not first
+        with pytest.raises(ValueError):
+            ocr_service.set_reader_precision(["en"], "int4")
+
+    def test_benchmark_reports_latency_and_cer(self, monkeypatch):
+        samples = [(ocr_service._synthetic_line(t), t) for t in ocr_service.BENCH_LINES]
+        monkeypatch.setattr(_FakeEasyReader, "truth",
+                            {img.shape[1]: t for img, t in samples})
+        report = ocr_service.benchmark_precision(["en"], samples, repeat=1)
+        assert report["fp32"]["cer"] == 0.0 and report["int8"]["cer"] > 0.0
+        assert report["int8"]["effective"] == "int8" and report["fp32"]["effective"] == "fp32"
+        assert report["int8"]["bytes"] < report["fp32"]["bytes"]
+        assert report["fp32"]["latency_ms"] > 0
+
+    def test_edit_distance(self):
+        assert ocr_service._edit_distance("kitten", "sitting") == 3
+        assert ocr_service._edit_distance("", "abc") == 3
+
+
+# ──────────────────────────────────────────────
+# Tests — warm-up
+# ──────────────────────────────────────────────
+
+class TestWarmUp:
+    @pytest.fixture(autouse=True)
+    def fresh_state(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "_reader_state", {})
+        monkeypatch.setattr(ocr_service, "_reader_cache", OrderedDict())
+
+    def test_warm_up_runs_a_dummy_inference(self, size_reader):
+        assert reader_status(["en"]) == "cold"
+        assert warm_up(["en"]) is True
+        assert size_reader.calls == 1
+        assert reader_status(["en"]) == "ready"
+
+    def test_background_warm_up_reports_progress(self, size_reader):
+        thread = warm_up_async(["en"])
+        assert reader_status(["en"]) in ("warming", "ready")
+        thread.join(timeout=10)
+        assert reader_status(["en"]) == "ready"
+
+    def test_failed_warm_up_is_reported(self, monkeypatch):
+        def broken(langs):
+            raise RuntimeError("no model files")
+        monkeypatch.setattr(ocr_service, "_get_reader", broken)
+        assert warm_up(["en"]) is False
+        assert reader_status(["en"]) == "failed"
+
+
+# ──────────────────────────────────────────────
+# Tests — tiled OCR
+# ──────────────────────────────────────────────
+
+class _BlockReader:
+    """Stand-in reader: every dark rectangle is a "word" whose text is its width."""
+
+    def readtext(self, img_array, detail=0, paragraph=False, **kwargs):
+        from scipy import ndimage
+        labels, _ = ndimage.label(img_array < 128)
+        results = []
+        for sl in ndimage.find_objects(labels):
+            y0, y1, x0, x1 = sl[0].start, sl[0].stop, sl[1].start, sl[1].stop
+            box = [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+            results.append((box, str(x1 - x0), 0.9))
+        return results if detail else [r[1] for r in results]
+
+
+def _page_with_words(size, words):
+    img = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(img)
+    for x, y, width in words:
+        draw.rectangle((x, y, x + width - 1, y + 39), fill=0)
+    return img
+
+
+_GLYPHS = "etaoinsh"  # letter i is a bar 12 + 3*i px tall; cells are 20 px wide
+
+
+class _GlyphReader:
+    """
+    Stand-in reader that reads bar "glyphs" like EasyOCR with
+    `paragraph=False`: the words of a line come back as one box, and a box
+    cut by the image edge yields the partial text that is visible.
+    """
+
+    def readtext(self, img_array, detail=1, paragraph=False, **kwargs):
+        dark = img_array < 128
+        rows = np.flatnonzero(dark.any(axis=1))
+        results = []
+        for band in np.split(rows, np.flatnonzero(np.diff(rows) > 1) + 1) if len(rows) else []:
+            y0, y1 = band[0], band[-1] + 1
+            cols = np.flatnonzero(dark[y0:y1].any(axis=0))
+            runs = np.split(cols, np.flatnonzero(np.diff(cols) > 1) + 1)
+            box, text, prev = None, "", None
+            for run in runs:
+                if prev is not None and run[0] - prev > 60:
+                    results.append((box, text, 0.9))
+                    box, text = None, ""
+                elif prev is not None and run[0] - prev > 12:
+                    text += " "
+                height = int(dark[y0:y1, run[0]].sum())
+                text += _GLYPHS[min(max(round((height - 12) / 3), 0), len(_GLYPHS) - 1)]
+                x0 = box[0][0] if box else run[0]
+                box = [[x0, y1 - 40], [run[-1] + 1, y1 - 40], [run[-1] + 1, y1], [x0, y1]]
+                prev = run[-1] + 1
+            if box:
+                results.append((box, text, 0.9))
+        return results
+
+
+def _glyph_line(rnd, width):
+    words, length = [], -1
+    while True:
+        word = "".join(rnd.choice(_GLYPHS) for _ in range(rnd.randint(2, 6)))
+        if (length + 1 + len(word)) * 20 > width:
+            return " ".join(words)
+        words.append(word)
+        length += 1 + len(word)
+
+
+def _page_with_lines(size, lines):
+    img = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(img)
+    for x, y, text in lines:
+        for n, ch in enumerate(text):
+            if ch != " ":
+                h = 12 + 3 * _GLYPHS.index(ch)
+                draw.rectangle((x + 20 * n, y + 40 - h, x + 20 * n + 13, y + 39), fill=0)
+    return img
+
+
+class TestTiled:
+    def test_grid_covers_image_with_overlap(self):
+        tiles = ocr_service.tile_grid(5000, 3000, tile=2048, overlap=256)
+        assert tiles[0][:2] == (0, 0) and tiles[-1][2:] == (5000, 3000)
+        xs = sorted({t[0] for t in tiles})
+        assert all(b - a <= 2048 - 256 for a, b in zip(xs, xs[1:]))
+        assert ocr_service.tile_grid(800, 600) == [(0, 0, 800, 600)]
+
+    def test_small_image_keeps_single_shot_path(self, size_reader):
+        img = Image.new("RGB", (600, 100), "white")
+        assert extract_text_from_image(img, langs=["en"]) == "width 600"
+
+    def test_words_on_seams_are_read_once_in_order(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "_get_reader", lambda langs: _BlockReader())
+        # Words inside tile overlaps (seen whole by two tiles), words cut by a
+        # tile edge (x = 2048, y = 3840), and plain ones
+        words = [(100, 100, 101), (1850, 100, 102), (3700, 100, 103),
+                 (2000, 600, 107), (1900, 1990, 104), (200, 2000, 105),
+                 (600, 3830, 108), (3000, 3900, 106)]
+        page = _page_with_words((4500, 4200), words)
+        text = extract_text_from_image(page, langs=["en"])
+        assert text.split("\n") == ["101 102 103", "107", "105 104", "108", "106"]
+
+    def test_lines_across_seams_are_stitched(self, monkeypatch):
+        monkeypatch.setattr(ocr_service, "_get_reader", lambda langs: _GlyphReader())
+        rnd = random.Random(7)
+        # Tiles of a 6000x3000 page start at x = 0, 1792, 3584, 3952 and
+        # y = 0, 952: one line inside a tile, one across the x = 2048 seam,
+        # and a full-width one inside the horizontal overlap.
+        lines = [(100, 100, _glyph_line(rnd, 1200)),
+                 (1700, 600, _glyph_line(rnd, 600)),
+                 (50, 1200, _glyph_line(rnd, 5900))]
+        page = _page_with_lines((6000, 3000), lines)
+        text = extract_text_from_image(page, langs=["en"])
+        assert text.split("\n") == [line for _, _, line in lines]
+
+    def test_tiling_can_be_disabled(self, size_reader, monkeypatch):
+        monkeypatch.setattr(ocr_service, "TILED", False)
+        page = Image.new("RGB", (8000, 1000), "white")
+        assert extract_text_from_image(page, langs=["en"]) == "width 4000"
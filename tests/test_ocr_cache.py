@@ -0,0 +1,118 @@
+"""
+Unit tests for the persistent OCR result cache.
+
+Run:
+    python -m pytest tests/test_ocr_cache.py -v
+"""
+
+import io
+import random
+import time
+
+from PIL import Image, ImageDraw
+
+from services import ocr_service
+from services.ocr_cache_service import OCRCache, fingerprint
+from services.ocr_service import extract_text_from_image
+
+PARAMS = {"pipeline": "pil", "max_dimension": 4000}
+
+
+def _scan(size=(320, 200), fmt="PNG", **save) -> bytes:
+    """A page with a few dark bars, encoded as `fmt`."""
+    img = Image.new("RGB", (320, 200), "white")
+    draw = ImageDraw.Draw(img)
+    for i, width in enumerate((260, 180, 220, 120)):
+        draw.rectangle((20, 20 + 40 * i, 20 + width, 40 + 40 * i), fill="black")
+    img = img.resize(size)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **save)
+    return buf.getvalue()
+
+
+def _text_page(seed: int, size=(1240, 1754), fmt="PNG", **save) -> bytes:
+    """A page of 50 text lines; every seed uses the same layout, different words."""
+    rnd = random.Random(seed)
+    words = "the of and report quarterly revenue growth market customer data results".split()
+    img = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(50):
+        draw.text((100, 100 + 30 * i), " ".join(rnd.choice(words) for _ in range(14)),
+                  fill="black")
+    img = img.resize(size)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **save)
+    return buf.getvalue()
+
+
+# ──────────────────────────────────────────────
+# Tests — OCRCache
+# ──────────────────────────────────────────────
+
+class TestOCRCache:
+    def test_hit_requires_same_bytes_langs_and_params(self, tmp_path):
+        cache = OCRCache(str(tmp_path))
+        image = _scan()
+        cache.put(image, ["en"], PARAMS, "hello")
+        assert cache.get(image, ["en"], PARAMS) == "hello"
+        assert cache.get(image, ["fr"], PARAMS) is None
+        assert cache.get(image, ["en"], {**PARAMS, "max_dimension": 2000}) is None
+        assert cache.get(_scan(fmt="JPEG"), ["en"], PARAMS) is None
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+    def test_lang_order_does_not_matter(self, tmp_path):
+        cache = OCRCache(str(tmp_path))
+        cache.put(_scan(), ["en", "fr"], PARAMS, "bonjour")
+        assert cache.get(_scan(), ["fr", "en"], PARAMS) == "bonjour"
+
+    def test_lru_eviction_keeps_recent_entries(self, tmp_path):
+        cache = OCRCache(str(tmp_path), max_bytes=250)
+        for i in range(3):
+            cache.put(f"image {i}".encode(), ["en"], PARAMS, "x" * 100)
+            time.sleep(0.01)
+        assert cache.get(b"image 0", ["en"], PARAMS) is None
+        assert cache.get(b"image 2", ["en"], PARAMS) is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_perceptual_mode_matches_reencoded_copies(self, tmp_path):
+        cache = OCRCache(str(tmp_path), perceptual=True)
+        cache.put(_scan(), ["en"], PARAMS, "scan text")
+        assert cache.get(_scan(fmt="JPEG", quality=60), ["en"], PARAMS) == "scan text"
+        assert cache.get(_scan(size=(640, 400)), ["en"], PARAMS) == "scan text"
+        assert cache.stats()["perceptual_hits"] == 2
+        blank = io.BytesIO()
+        Image.new("RGB", (320, 200), "gray").save(blank, format="PNG")
+        assert cache.get(blank.getvalue(), ["en"], PARAMS) is None
+
+    def test_perceptual_mode_tells_same_layout_pages_apart(self, tmp_path):
+        cache = OCRCache(str(tmp_path), perceptual=True)
+        cache.put(_text_page(1), ["en"], PARAMS, "page 1")
+        assert cache.get(_text_page(2), ["en"], PARAMS) is None
+        assert cache.get(_text_page(1, fmt="JPEG", quality=60), ["en"], PARAMS) == "page 1"
+        assert cache.get(_text_page(1, size=(620, 877)), ["en"], PARAMS) == "page 1"
+
+    def test_fingerprint_of_undecodable_bytes_is_none(self):
+        assert fingerprint(b"not-an-image") is None
+        assert fingerprint(_scan())[0] == fingerprint(_scan(fmt="JPEG", quality=90))[0]
+
+
+# ──────────────────────────────────────────────
+# Tests — cache in front of extract_text_from_image
+# ──────────────────────────────────────────────
+
+class TestCachedExtract:
+    def test_repeat_upload_skips_ocr(self, size_reader, ocr_cache):
+        image = _scan()
+        first = extract_text_from_image(image, langs=["en"])
+        t0 = time.perf_counter()
+        second = extract_text_from_image(image, langs=["en"])
+        assert time.perf_counter() - t0 < 0.05
+        assert first == second
+        assert size_reader.calls == 1
+        assert ocr_cache.stats()["hits"] == 1
+
+    def test_cache_can_be_disabled(self, size_reader, monkeypatch):
+        monkeypatch.setattr(ocr_service, "USE_CACHE", False)
+        extract_text_from_image(_scan(), langs=["en"])
+        extract_text_from_image(_scan(), langs=["en"])
+        assert size_reader.calls == 2
@@ -0,0 +1,156 @@
+"""
+Unit tests for the OCR worker pool.
+
+The pool runs small picklable stand-in jobs instead of EasyOCR, so these
+tests exercise the process management without downloading any model.
+
+Run:
+    python -m pytest tests/test_ocr_pool.py -v
+"""
+
+import os
+import time
+
+import pytest
+
+from services import ocr_pool_service, ocr_service
+from services.ocr_pool_service import OCRBusyError, OCRPool, thread_summary
+from services.ocr_service import OCRError
+
+
+# ──────────────────────────────────────────────
+# Stand-in jobs (run inside the worker processes)
+# ──────────────────────────────────────────────
+
+def _echo_job(image: bytes, langs: list[str]) -> str:
+    return f"{image.decode()}:{'+'.join(langs)}:{os.getpid()}"
+
+
+def _slow_job(image: bytes, langs: list[str]) -> str:
+    time.sleep(float(image.decode()))
+    return "done"
+
+
+def _rendezvous_job(image: bytes, langs: list[str]) -> str:
+    """Check in under the directory in `image`, then wait for `langs[0]` jobs to do the same."""
+    folder = image.decode()
+    open(os.path.join(folder, str(os.getpid())), "w").close()
+    deadline = time.time() + 20
+    while len(os.listdir(folder)) < int(langs[0]) and time.time() < deadline:
+        time.sleep(0.01)
+    return f"{os.getpid()}:{len(os.listdir(folder)) >= int(langs[0])}"
+
+
+def _flaky_job(image: bytes, langs: list[str]) -> str:
+    if image == b"crash":
+        os._exit(1)  # simulate a segfault in native code
+    if image == b"bad":
+        raise ValueError("cannot read")
+    return image.decode()
+
+
+def _precision_job(image: bytes, langs: list[str]) -> str:
+    return ocr_service.reader_precision(langs)
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault("warm", False)
+        pool = OCRPool(**kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+# ──────────────────────────────────────────────
+# Tests — OCRPool
+# ──────────────────────────────────────────────
+
+class TestOCRPool:
+    def test_jobs_run_in_worker_processes(self, make_pool):
+        pool = make_pool(workers=2, handler=_echo_job, langs=["en"])
+        text, langs, pid = pool.submit(b"page").result(timeout=30).split(":")
+        assert (text, langs) == ("page", "en")
+        assert int(pid) != os.getpid()
+
+    def test_workers_report_ready_after_start_up(self, make_pool):
+        pool = make_pool(workers=2, handler=_echo_job)
+        deadline = time.time() + 30
+        while pool.ready_workers() < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        assert pool.ready_workers() == 2
+
+    def test_workers_get_a_share_of_the_thread_budget(self, make_pool, monkeypatch):
+        cpus = sorted(os.sched_getaffinity(0))[:2]
+        monkeypatch.setattr(ocr_service, "OCR_THREADS", 4)
+        monkeypatch.setattr(ocr_service, "CPU_AFFINITY", cpus)
+        pool = make_pool(workers=2, handler=_echo_job)
+        deadline = time.time() + 30
+        while pool.ready_workers() < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        threads = pool.stats()["threads"]
+        assert [t["threads"] for t in threads] == [2, 2]
+        expected = [[c] for c in cpus] if len(cpus) == 2 else [cpus, cpus]
+        assert [t["affinity"] for t in threads] == expected
+
+    def test_thread_summary_while_workers_start(self, make_pool, monkeypatch):
+        pool = make_pool(workers=2, handler=_echo_job)
+        monkeypatch.setattr(ocr_pool_service, "POOL_WORKERS", 2)
+        monkeypatch.setattr(ocr_pool_service, "get_pool", lambda start=True: pool)
+        monkeypatch.setattr(pool, "stats", lambda: {"threads": [None, None]})  # none ready yet
+        summary = thread_summary()
+        assert summary["threads"] == ocr_service.thread_settings()["threads"]
+        assert summary["llm_cores"] == ocr_service.thread_settings()["llm_cores"]
+
+    def test_precision_overrides_reach_the_workers(self, make_pool, monkeypatch):
+        monkeypatch.setattr(ocr_service, "_precision_overrides", {})
+        pool = make_pool(workers=1, handler=_precision_job)
+        assert pool.submit(b"", langs=["ar", "en"]).result(timeout=30) == ocr_service.READER_PRECISION
+        ocr_service.set_reader_precision(["ar", "en"], "fp32")
+        assert pool.submit(b"", langs=["ar", "en"]).result(timeout=30) == "fp32"
+        assert pool.submit(b"", langs=["en"]).result(timeout=30) == ocr_service.READER_PRECISION
+
+    def test_extract_many_keeps_input_order(self, make_pool):
+        pool = make_pool(workers=2, handler=_echo_job)
+        results = list(pool.extract_many([str(i).encode() for i in range(7)], langs=["fr"]))
+        assert [i for i, _, _ in results] == list(range(7))
+        assert [t.split(":")[0] for _, t, _ in results] == [str(i) for i in range(7)]
+
+    def test_workers_run_in_parallel(self, make_pool, tmp_path):
+        # Each job waits until all three have started: only concurrent jobs all meet
+        folder = tmp_path / "rendezvous"
+        folder.mkdir()
+        pool = make_pool(workers=3, handler=_rendezvous_job)
+        futures = [pool.submit(str(folder).encode(), langs=["3"]) for _ in range(3)]
+        results = [f.result(timeout=60).split(":") for f in futures]
+        assert all(met == "True" for _, met in results)
+        assert len({pid for pid, _ in results}) == 3
+
+    def test_full_queue_applies_backpressure(self, make_pool):
+        pool = make_pool(workers=1, handler=_slow_job, max_pending=2)
+        pool.submit(b"1")
+        pool.submit(b"1")
+        with pytest.raises(OCRBusyError):
+            pool.submit(b"1", timeout=0.1)
+
+    def test_job_error_is_isolated(self, make_pool):
+        pool = make_pool(workers=1, handler=_flaky_job)
+        with pytest.raises(OCRError, match="cannot read"):
+            pool.submit(b"bad").result(timeout=30)
+        assert pool.submit(b"fine").result(timeout=30) == "fine"
+        assert pool.stats()["restarts"] == 0
+
+    def test_crashed_worker_is_restarted(self, make_pool):
+        pool = make_pool(workers=1, handler=_flaky_job)
+        with pytest.raises(OCRError, match="crashed"):
+            pool.submit(b"crash").result(timeout=60)
+        assert pool.submit(b"after").result(timeout=60) == "after"
+        stats = pool.stats()
+        assert stats["restarts"] == 2  # the crash and its retry
+        assert stats["alive"] == 1
@@ -0,0 +1,127 @@
+"""
+Unit tests for multi-backend routing and failover.
+
+Run:
+    python -m pytest tests/test_router.py -v
+"""
+
+import asyncio
+import time
+
+import pytest
+import requests
+
+from services import llm_service
+from services.async_llm_service import summarize_many
+from services.health_service import HealthMonitor
+from services.llm_service import call_llm
+from services.router_service import BackendRouter, NoBackendError
+
+from tests.conftest import _start_fake_llama, _stop_fake_llama
+
+URLS = ["http://a:8080", "http://b:8080", "http://c:8080"]
+
+
+# ──────────────────────────────────────────────
+# Tests — BackendRouter
+# ──────────────────────────────────────────────
+
+class TestBackendRouter:
+    def test_least_outstanding_spreads_requests(self):
+        router = BackendRouter(URLS)
+        picked = [router.acquire() for _ in range(3)]
+        assert sorted(b.url for b in picked) == sorted(URLS)
+
+    def test_affinity_is_stable(self):
+        router = BackendRouter(URLS)
+        first = router.acquire(affinity="doc-1")
+        router.release(first, ok=True)
+        for _ in range(5):
+            again = router.acquire(affinity="doc-1")
+            router.release(again, ok=True)
+            assert again is first
+
+    def test_failed_backend_is_ejected_then_readmitted(self):
+        router = BackendRouter(URLS[:2], cooldown=60)
+        bad = router.acquire()
+        router.release(bad, ok=False)
+        assert bad not in router.healthy()
+        assert all(router.acquire() is not bad for _ in range(4))
+        router.report_health(bad.url, online=True, slots=4)
+        assert bad in router.healthy() and bad.slots == 4
+
+    def test_cooldown_allows_a_trial_request(self):
+        router = BackendRouter(URLS[:1], cooldown=0.01)
+        backend = router.acquire()
+        router.release(backend, ok=False)
+        time.sleep(0.02)
+        assert router.acquire() is backend
+
+    def test_all_ejected_still_routes(self):
+        router = BackendRouter(URLS[:2], cooldown=60)
+        for _ in range(2):
+            b = router.acquire()
+            router.release(b, ok=False)
+        assert router.healthy() == []
+        assert router.acquire().url in URLS[:2]
+
+    def test_exhausted_candidates_raise(self):
+        router = BackendRouter(URLS[:2])
+        with pytest.raises(NoBackendError):
+            router.acquire(exclude=URLS[:2])
+
+
+# ──────────────────────────────────────────────
+# Tests — failover against live servers
+# ──────────────────────────────────────────────
+
+class TestFailover:
+    def test_batch_is_spread_over_backends(self, fake_llamas):
+        servers = fake_llamas(2)
+        for s in servers:
+            s.delay = 0.2
+        texts = [f"Document number {i}." for i in range(4)]
+        results = asyncio.run(summarize_many(texts, "Concise", concurrency=4))
+        assert all(r["summary"] for r in results)
+        assert all(s.payloads for s in servers)
+
+    def test_dead_backend_fails_over(self, fake_llamas):
+        servers = fake_llamas(2)
+        _stop_fake_llama(servers[0])
+        for i in range(3):
+            # No affinity: ties go to the first (dead) backend
+            result = call_llm(f"Text {i}.", "You summarize.", 0.3, 128,
+                              on_delta=lambda d: None, pin_slot=False)
+            assert result["summary"] == "The quick summary."
+        assert len(servers[1].payloads) == 3
+        dead = next(b for b in llm_service.router().stats() if b["url"] == servers[0].url)
+        assert dead["ejected"] is True
+
+    def test_server_error_fails_over(self, fake_llamas):
+        servers = fake_llamas(2)
+        servers[0].fail_status = 503
+        assert call_llm("Some text.", "You summarize.", 0.3, 128, pin_slot=False)["summary"]
+        assert len(servers[0].payloads) == 1 and len(servers[1].payloads) == 1
+
+    def test_all_backends_down_raises(self, fake_llamas):
+        servers = fake_llamas(2)
+        for s in servers:
+            _stop_fake_llama(s)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            call_llm("Some text.", "You summarize.", 0.3, 128)
+
+    def test_health_monitor_ejects_and_readmits(self, fake_llamas):
+        servers = fake_llamas(2)
+        port = int(servers[0].url.rsplit(":", 1)[1])
+        _stop_fake_llama(servers[0])
+        status = HealthMonitor().refresh()
+        assert status["online"] is True and status["slots_total"] == 2
+        assert [b["online"] for b in status["backends"]] == [False, True]
+        assert [b.url for b in llm_service.router().healthy()] == [servers[1].url]
+
+        restarted = _start_fake_llama(port)
+        try:
+            HealthMonitor().refresh()
+            assert len(llm_service.router().healthy()) == 2
+        finally:
+            _stop_fake_llama(restarted)